@@ -1,6 +1,6 @@
-from fastapi import FastAPI, Depends, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
 from typing import Optional
@@ -12,8 +12,17 @@ from dotenv import load_dotenv
 # Load environment variables FIRST before importing other modules
 load_dotenv()
 
-from middleware.auth import get_current_user, AuthUser
+from middleware.auth import get_current_user, require_admin, require_metrics_access, AuthUser
+from middleware.bulkhead import BULKHEAD_ENABLED, BulkheadMiddleware, get_bulkheads, size_threadpool
+from middleware.compression import CompressionMiddleware, get_response_cache
+from middleware.profiling import ProfilingMiddleware, list_profiles, profile_path
+from middleware.request_context import RequestContextMiddleware
+from middleware.timed_route import TimedRoute
 from routers import faqs, announcements, chat_logs
+from services.jobs import register_jobs
+from services.metrics import get_metrics
+from services.process_pool import PROCESS_POOL_ENABLED, get_cpu_pool
+from services.scheduler import SCHEDULER_ENABLED, get_scheduler
 from services.supabase_service import get_supabase_service
 
 # Configure logging
@@ -23,14 +32,35 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up ClarifyAI API...")
+    if BULKHEAD_ENABLED:
+        size_threadpool()
+    if PROCESS_POOL_ENABLED:
+        get_cpu_pool().start()
+    db = None
     try:
         db = get_supabase_service()
         logger.info("✓ Supabase connection established successfully")
+        db.announcement_store.ensure_loaded()
+        db.faq_catalog.ensure_loaded()
+        # Cached FAQ lists are retired once the catalog has applied a change
+        get_response_cache().track("faqs", db.faq_catalog)
+        db.bus.start()
     except Exception as e:
         logger.error(f"✗ Failed to connect to Supabase: {str(e)}")
         logger.warning("API will start but database operations may fail")
+    scheduler = get_scheduler()
+    if SCHEDULER_ENABLED and db is not None:
+        register_jobs(scheduler, db)
+        scheduler.start()
     yield
     logger.info("Shutting down ClarifyAI API...")
+    # Drain jobs first; they use the bus and stores closed below
+    await scheduler.stop()
+    if db is not None:
+        db.bus.close()
+        db.announcement_store.close()
+        db.announcement_stream.close()
+    get_cpu_pool().close()
 
 app = FastAPI(
     title="ClarifyAI API",
@@ -40,6 +70,14 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan
 )
+app.router.route_class = TimedRoute
+
+# Innermost: compressed cache hits and CORS preflights never take a bulkhead slot
+if BULKHEAD_ENABLED:
+    app.add_middleware(BulkheadMiddleware)
+
+# Added before CORS so it runs inside it and cached bytes never carry CORS headers
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -50,6 +88,11 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+app.add_middleware(RequestContextMiddleware)
+
+# Outermost, so profiles cover every other middleware too
+app.add_middleware(ProfilingMiddleware)
+
 
 
 
@@ -113,7 +156,8 @@ def root():
             "announcements": "/api/v1/announcements",
             "chat-logs": "/api/v1/chat-logs",
             "auth": "/api/v1/auth/me",
-            "health": "/ping"
+            "health": "/ping",
+            "metrics": "/metrics"
         },
         "docs": "/docs",
         "redoc": "/redoc"
@@ -124,6 +168,47 @@ def ping():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", dependencies=[Depends(require_metrics_access)])
+def metrics():
+
+    snapshot = get_metrics().snapshot()
+    try:
+        db = get_supabase_service()
+        snapshot["breakers"] = db.breaker_states()
+        if db.chat_history is not None:
+            snapshot["chat_history"] = db.chat_history.stats()
+    except Exception as e:
+        logger.warning(f"Breaker states unavailable: {str(e)}")
+        snapshot["breakers"] = {}
+    snapshot["scheduler"] = get_scheduler().stats()
+    if BULKHEAD_ENABLED:
+        snapshot["bulkheads"] = {name: bulkhead.stats() for name, bulkhead in get_bulkheads().items()}
+    return snapshot
+
+
+@app.get("/api/v1/admin/profiles", dependencies=[Depends(require_admin)])
+def get_profiles():
+
+    return {"profiles": list_profiles()}
+
+
+@app.get("/api/v1/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: str):
+
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, filename=profile_id)
+
+
+@app.get("/api/v1/admin/chat-logs/rematch", dependencies=[Depends(require_admin)])
+def rematch_chat_logs(limit: int = Query(5000, ge=1, le=50000), changed_only: bool = True):
+
+    logs = get_supabase_service().rematch_chat_logs(limit=limit)
+    changed = [log for log in logs if str(log.get("matched_faq_id")) != str(log.get("best_faq_id"))]
+    return {"rescored": len(logs), "changed": len(changed), "logs": changed if changed_only else logs}
+
+
 @app.get("/api/v1/auth/me", response_model=UserInfoResponse)
 def get_me(current_user: AuthUser = Depends(get_current_user)):
 
@@ -1,17 +1,29 @@
 from typing import Optional
+import ipaddress
 import os
 
 from dotenv import load_dotenv
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
 
+from middleware.request_context import timed
+
 # Load environment variables
 load_dotenv()
 
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET") or os.getenv("SUPABASE_SERVICE_KEY")
 
+# Users allowed to reach operator tooling, in addition to service_role tokens
+ADMIN_USER_IDS = {user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+# Networks (CIDRs) whose clients may read /metrics without a token, e.g. the scraper's
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv("METRICS_ALLOWED_NETWORKS", "").split(",") if network.strip()
+]
+
 
 class AuthUser(BaseModel):
     id: str
@@ -22,6 +34,11 @@ class AuthUser(BaseModel):
 
 def verify_supabase_token(token: str) -> AuthUser:
     """Verify Supabase JWT using shared secret; return user claims."""
+    with timed("auth"):
+        return _decode_token(token)
+
+
+def _decode_token(token: str) -> AuthUser:
     if not SUPABASE_JWT_SECRET:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="JWT secret not configured")
     try:
@@ -47,3 +64,33 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_
     return verify_supabase_token(token)
 
 
+
+
+def is_admin(user: AuthUser) -> bool:
+    return user.role == "service_role" or user.id in ADMIN_USER_IDS
+
+
+def require_admin(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+def require_metrics_access(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+) -> None:
+    """Allow clients from METRICS_ALLOWED_NETWORKS; anyone else must be an admin."""
+    if _client_allowed(request.client.host if request.client else None):
+        return
+    require_admin(get_current_user(credentials))
+
+
+def _client_allowed(host: Optional[str]) -> bool:
+    if not host or not METRICS_ALLOWED_NETWORKS:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_NETWORKS)
@@ -0,0 +1,238 @@
+"""
+Bulkheads: separate concurrency limits per group of routes.
+
+Sync handlers and dependencies all run in one shared threadpool, so a
+burst of slow requests of one kind (a slow Supabase write, an admin
+import) can take every thread and leave cheap reads and health checks
+queued behind them. Each request is therefore assigned to a route
+group and must take one of that group's slots before it reaches the
+app:
+
+    health  /, /ping, /metrics and the API docs
+    chat    chat logs and the authenticated user routes
+    admin   FAQ and announcement writes and /api/v1/admin routes
+    public  every other route, including read-only POSTs such as
+            /api/v1/faqs/batch-get and /api/v1/faqs/duplicates
+
+A request holds one threadpool thread at a time, so with the threadpool
+sized to at least the sum of the group limits (``size_threadpool``,
+called from the lifespan) no group can take threads from another. Its
+Supabase round trips run on the UpstreamCaller pool of its group, sized
+to the group's limit, so groups do not share upstream threads either.
+Requests beyond a group's limit wait in that group's queue only; the
+time they wait is reported per group (``bulkhead.<group>.queue``) and
+as the "queue" step of Server-Timing. A request that cannot get a slot
+within BULKHEAD_QUEUE_TIMEOUT_MS (or its remaining deadline) is
+answered 503 instead of waiting any longer.
+
+Long-lived streams are exempt: they are async, hold no thread and are
+capped by their own subscriber limit.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import anyio.to_thread
+
+from middleware.request_context import current_request_context, record_timing, remaining_time
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+BULKHEAD_ENABLED = os.getenv("BULKHEAD_ENABLED", "true").lower() in ("1", "true", "yes")
+BULKHEAD_LIMITS: Dict[str, int] = {
+    "health": int(os.getenv("BULKHEAD_HEALTH_LIMIT", "4")),
+    "public": int(os.getenv("BULKHEAD_PUBLIC_LIMIT", "24")),
+    "chat": int(os.getenv("BULKHEAD_CHAT_LIMIT", "16")),
+    "admin": int(os.getenv("BULKHEAD_ADMIN_LIMIT", "6")),
+}
+BULKHEAD_QUEUE_TIMEOUT_MS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_MS", "2000"))
+# Threads beyond the group limits, for threadpool work outside of requests
+BULKHEAD_SPARE_THREADS = int(os.getenv("BULKHEAD_SPARE_THREADS", "8"))
+
+_HEALTH_PATHS = ("/", "/ping", "/metrics", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect")
+_CHAT_PREFIXES = ("/api/v1/chat-logs", "/api/v1/auth/", "/api/v1/protected/")
+_EXEMPT_PATHS = ("/api/v1/announcements/stream",)
+# Content writes, by method and full path
+_ADMIN_ROUTES = (
+    ("POST", re.compile(r"/api/v1/(faqs|announcements)")),
+    ("PUT", re.compile(r"/api/v1/(faqs|announcements)/[^/]+")),
+    ("DELETE", re.compile(r"/api/v1/(faqs|announcements)/[^/]+")),
+)
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """
+    Return the bulkhead group of a request, or None if it is exempt.
+
+    Args:
+        method: HTTP method
+        path: Request path
+
+    Returns:
+        "health", "chat", "admin", "public" or None
+    """
+    if path in _EXEMPT_PATHS or method == "OPTIONS":
+        return None
+    if path in _HEALTH_PATHS:
+        return "health"
+    if path.startswith(_CHAT_PREFIXES):
+        return "chat"
+    if path.startswith("/api/v1/admin/"):
+        return "admin"
+    for route_method, pattern in _ADMIN_ROUTES:
+        if method == route_method and pattern.fullmatch(path):
+            return "admin"
+    return "public"
+
+
+class Bulkhead:
+    """
+    A concurrency limit with a FIFO queue, for use on one event loop.
+
+    A released slot is handed straight to the oldest waiter, so queued
+    requests are served in arrival order.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        """
+        Take a slot, waiting at most timeout seconds.
+
+        Returns:
+            True when a slot was taken (release it afterwards), False on timeout
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if timeout <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # asyncio.wait never cancels the waiter, so a slot handed over can't be lost
+            await asyncio.wait((waiter,), timeout=timeout)
+        except BaseException:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if waiter.done():
+            return True
+        self._waiters.remove(waiter)
+        return False
+
+    def release(self) -> None:
+        if self._waiters:
+            # The slot passes to the oldest waiter; active stays the same
+            self._waiters.popleft().set_result(None)
+        else:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "waiting": len(self._waiters)}
+
+
+class BulkheadMiddleware:
+    """
+    Pure ASGI middleware admitting each request through its group's bulkhead.
+
+    Added before CompressionMiddleware so it sits inside it: responses
+    served from the compressed response cache never take a slot.
+    """
+
+    def __init__(self, app, bulkheads: Optional[Dict[str, Bulkhead]] = None, queue_timeout_ms: float = BULKHEAD_QUEUE_TIMEOUT_MS):
+        self.app = app
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.bulkheads = bulkheads if bulkheads is not None else get_bulkheads()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope.get("method", "GET"), scope["path"])
+        bulkhead = self.bulkheads.get(group) if group is not None else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        context = current_request_context()
+        if context is not None:
+            # Picks the group's upstream pool for the request's Supabase calls
+            context.route_group = group
+        started = time.perf_counter()
+        admitted = await bulkhead.acquire(min(self.queue_timeout, remaining_time()))
+        waited = time.perf_counter() - started
+        get_metrics().observe(f"bulkhead.{group}.queue", waited)
+        record_timing("queue", waited)
+        if not admitted:
+            get_metrics().incr(f"bulkhead.{group}.rejected")
+            logger.warning(f"Rejected {scope.get('method')} {scope['path']}: {group} bulkhead full for {waited * 1000:.0f} ms")
+            await _send_overloaded(send, group)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
+
+
+async def _send_overloaded(send, group: str) -> None:
+    body = json.dumps({"detail": f"Too many {group} requests in progress, retry later"}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def size_threadpool() -> int:
+    """
+    Grow the shared threadpool to cover every group's limit at once.
+
+    Must run on the event loop (e.g. in the lifespan).
+
+    Returns:
+        The threadpool size
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    needed = sum(bulkhead.limit for bulkhead in get_bulkheads().values()) + BULKHEAD_SPARE_THREADS
+    if limiter.total_tokens < needed:
+        limiter.total_tokens = needed
+    logger.info(f"Threadpool sized to {limiter.total_tokens} threads for bulkheads {BULKHEAD_LIMITS}")
+    return limiter.total_tokens
+
+
+# Singleton instance
+_bulkheads: Optional[Dict[str, Bulkhead]] = None
+
+
+def get_bulkheads() -> Dict[str, Bulkhead]:
+    """
+    Get or create the bulkhead of every route group.
+
+    Returns:
+        Bulkheads keyed by group name
+    """
+    global _bulkheads
+    if _bulkheads is None:
+        _bulkheads = {name: Bulkhead(name, limit) for name, limit in BULKHEAD_LIMITS.items()}
+    return _bulkheads
@@ -0,0 +1,315 @@
+"""
+Response compression with a cache of precompressed list payloads.
+
+Negotiates brotli (when the ``brotli`` package is installed) or gzip
+from Accept-Encoding and compresses JSON/text responses of known
+length. Responses to hot public list routes are additionally stored as
+compressed bytes, keyed by path, query string, encoding and the content
+version of the data they were built from, so repeated requests are
+answered without touching the handler or spending compression CPU.
+
+Content versions are bumped whenever the data changes in any worker.
+For namespaces served from an in-memory catalog (faqs), the bump comes
+from a catalog listener once the change has been applied, since a
+response rebuilt between a bus event and its (possibly background)
+application would be cached under the new version with the old
+content. Other namespaces, and faqs while the catalog is not loaded,
+are bumped straight from the cache invalidation bus.
+"""
+
+import gzip
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+from middleware.request_context import current_request_context
+from services.invalidation import get_invalidation_bus
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# View counts change without a write event, so entries also expire
+COMPRESSION_CACHE_TTL_SECONDS = float(os.getenv("COMPRESSION_CACHE_TTL_SECONDS", "30"))
+
+# Public GET routes whose responses may be cached, with the data namespace they depend on
+CACHEABLE_ROUTES: List[Tuple[str, bool, str]] = [
+    # (path, is_prefix, namespace)
+    ("/api/v1/faqs", False, "faqs"),
+    ("/api/v1/faqs/category/", True, "faqs"),
+]
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content coding from an Accept-Encoding header.
+
+    Returns:
+        "br", "gzip" or None for identity
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    def allowed(coding: str) -> bool:
+        return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body with the given content coding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressedResponseCache:
+    """
+    Byte-bounded LRU of compressed responses.
+
+    Each namespace has a local content version that is bumped whenever
+    the invalidation bus reports a change; entries built from an older
+    version are never served again and are dropped on the next bump.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES, ttl: float = COMPRESSION_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[float, int, list, bytes]]" = OrderedDict()
+        self._size = 0
+        self._versions: Dict[str, int] = {}
+        # Namespaces bumped by a catalog listener -> whether that catalog is loaded
+        self._tracked: Dict[str, Callable[[], bool]] = {}
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def track(self, namespace: str, catalog: Any) -> None:
+        """Bump namespace from the listener path of catalog instead of the bus."""
+        self._tracked[namespace] = lambda: catalog.loaded
+        catalog.add_listener(_CatalogBump(self, namespace))
+
+    def on_event(self, namespace: str) -> None:
+        """Invalidation bus callback; left to the catalog listener while it is loaded."""
+        tracked = self._tracked.get(namespace)
+        if tracked is None or not tracked():
+            self.bump(namespace)
+
+    def bump(self, namespace: str) -> None:
+        """Retire every cached response built from namespace."""
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                self._size -= len(self._entries.pop(key)[3])
+
+    def get(self, key: tuple) -> Optional[Tuple[int, list, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, status, headers, body = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._size -= len(body)
+                return None
+            self._entries.move_to_end(key)
+            return status, headers, body
+
+    def put(self, key: tuple, status: int, headers: list, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key[3] != self._versions.get(key[0], 0):
+                # Content changed while the response was being built
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[3])
+            self._entries[key] = (time.monotonic(), status, headers, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[3])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size}
+
+
+class _CatalogBump:
+    """
+    Catalog listener retiring a namespace after each content change.
+
+    It has no ``reweight`` hook: view count changes are not passed to it
+    and cached lists keep the old counts until COMPRESSION_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, cache: CompressedResponseCache, namespace: str):
+        self.cache = cache
+        self.namespace = namespace
+
+    def rebuild(self, rows: List[Dict[str, Any]]) -> None:
+        self.cache.bump(self.namespace)
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        self.cache.bump(self.namespace)
+
+    def remove(self, faq_id: str) -> None:
+        self.cache.bump(self.namespace)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses and caching hot lists.
+
+    Must be added before CORSMiddleware so it sits inside it: cached
+    bytes then never carry another request's CORS headers.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, cache: Optional[CompressedResponseCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache or get_response_cache()
+        bus = get_invalidation_bus()
+        for namespace in {route[2] for route in CACHEABLE_ROUTES}:
+            bus.subscribe(namespace, lambda key, op, payload, namespace=namespace: self.cache.on_event(namespace))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = None
+        namespace = self._cacheable_namespace(scope)
+        if namespace is not None:
+            cache_key = (namespace, scope["path"], scope.get("query_string", b""), self.cache.version(namespace), encoding)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                get_metrics().incr("compression.cache_hits")
+                status, headers, body = cached
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            get_metrics().incr("compression.cache_misses")
+
+        await self._compress_response(scope, receive, send, encoding, cache_key)
+
+    def _cacheable_namespace(self, scope) -> Optional[str]:
+        if scope.get("method") != "GET":
+            return None
+        path = scope["path"]
+        for route, is_prefix, namespace in CACHEABLE_ROUTES:
+            if path == route or (is_prefix and path.startswith(route)):
+                return namespace
+        return None
+
+    async def _compress_response(self, scope, receive, send, encoding: str, cache_key: Optional[tuple]) -> None:
+        start_message = None
+        parts: List[bytes] = []
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    b"content-encoding" in headers
+                    or b"content-length" not in headers
+                    or int(headers[b"content-length"]) < self.minimum_size
+                    or not content_type.startswith(_COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            started = time.perf_counter()
+            body = compress(b"".join(parts), encoding)
+            get_metrics().observe(f"compression.{encoding}", time.perf_counter() - started)
+
+            headers = []
+            vary = [b"Accept-Encoding"]
+            for name, value in start_message.get("headers", []):
+                if name.lower() == b"vary":
+                    vary.insert(0, value)
+                elif name.lower() != b"content-length":
+                    headers.append((name, value))
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            headers.append((b"vary", b", ".join(vary)))
+            await send({"type": "http.response.start", "status": start_message["status"], "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+            context = current_request_context()
+            is_stale = context is not None and bool(context.stale_sources)
+            if cache_key is not None and start_message["status"] == 200 and not is_stale:
+                self.cache.put(cache_key, start_message["status"], headers, body)
+
+        await self.app(scope, receive, send_compressed)
+
+
+# Singleton instance
+_response_cache: Optional[CompressedResponseCache] = None
+
+
+def get_response_cache() -> CompressedResponseCache:
+    """
+    Get or create the singleton CompressedResponseCache instance.
+
+    Returns:
+        CompressedResponseCache instance
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = CompressedResponseCache()
+    return _response_cache
@@ -0,0 +1,260 @@
+"""
+On-demand statistical profiling of single requests.
+
+A request is profiled when an admin sends the ``X-Profile`` header
+(value ``speedscope`` or ``collapsed``), or when it is picked by
+PROFILING_SAMPLE_RATE. While it runs, a sampler thread records the
+Python stacks of the event loop thread and of the threadpool workers
+every PROFILING_INTERVAL_MS, so time spent in validation, JSON
+encoding, JWT decoding and Supabase calls shows up side by side.
+Idle threads are dropped; other requests running at the same moment
+are not, so profile on a quiet instance when precision matters.
+
+Profiles are written to PROFILING_OUTPUT_DIR as speedscope JSON or
+collapsed stacks (flamegraph.pl / speedscope input). Header-triggered
+requests get an ``X-Profile-Id`` response header naming the file,
+which admins download from ``/api/v1/admin/profiles/{profile_id}``.
+
+With PROFILING_ENABLED unset the middleware forwards every request
+untouched.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from middleware.auth import is_admin, verify_supabase_token
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "1"))
+PROFILING_FORMAT = os.getenv("PROFILING_FORMAT", "speedscope")
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR") or os.path.join(tempfile.gettempdir(), "clarifyai-profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+FORMATS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+# Innermost frames of a thread that is waiting rather than working
+_IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker")}
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Frame = Tuple[str, str, int]  # (name, file, line)
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_APP_ROOT):
+        return os.path.relpath(filename, _APP_ROOT)
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker != -1:
+        return filename[marker + len("site-packages") + 1:]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """Samples the stacks of every busy thread until stopped."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Dict[Tuple[Frame, ...], int] = {}
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_qualname, _short_path(code.co_filename), frame.f_lineno))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append((f"thread {names.get(ident, ident)}", "", 0))
+                key = tuple(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+
+def to_collapsed(samples: Dict[Tuple[Frame, ...], int]) -> str:
+    """Brendan Gregg's collapsed format: ``frame;frame;frame count`` per line."""
+    lines = []
+    for stack, count in samples.items():
+        frames = [name if not path else f"{name} ({path}:{line})" for name, path, line in stack]
+        lines.append(f"{';'.join(frame.replace(';', ':') for frame in frames)} {count}")
+    return "\n".join(sorted(lines)) + "\n"
+
+
+def to_speedscope(samples: Dict[Tuple[Frame, ...], int], name: str, interval_ms: float) -> Dict:
+    """A sampled profile in the speedscope file format."""
+    frames: List[Dict] = []
+    index: Dict[Frame, int] = {}
+    stacks, weights = [], []
+    for stack, count in samples.items():
+        indices = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frame_name, path, line = frame
+                frames.append({"name": frame_name, "file": path, "line": line} if path else {"name": frame_name})
+            indices.append(index[frame])
+        stacks.append(indices)
+        weights.append(count * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stacks,
+            "weights": weights,
+        }],
+        "exporter": "clarifyai request profiler",
+    }
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Path of a stored profile, or None for unknown (or unsafe) ids."""
+    if not re.fullmatch(r"[\w.-]+", profile_id) or profile_id not in list_profiles():
+        return None
+    return os.path.join(PROFILING_OUTPUT_DIR, profile_id)
+
+
+def list_profiles() -> List[str]:
+    """Stored profile ids, newest first."""
+    try:
+        names = [name for name in os.listdir(PROFILING_OUTPUT_DIR) if name.endswith(tuple(FORMATS.values()))]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware deciding per request whether to profile it.
+
+    The decision costs one header lookup (plus a JWT check when the
+    profile header is present) and a random draw when sampling is on.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILING_ENABLED, sample_rate: float = PROFILING_SAMPLE_RATE):
+        self.app = app
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._active = threading.BoundedSemaphore(PROFILING_MAX_CONCURRENT)
+        if enabled:
+            os.makedirs(PROFILING_OUTPUT_DIR, exist_ok=True)
+            logger.info(f"Request profiling enabled (sample rate {sample_rate}, output {PROFILING_OUTPUT_DIR})")
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = _requested_format(scope)
+        if requested is not None:
+            fmt, expose = requested, True
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            fmt, expose = PROFILING_FORMAT, False
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        if fmt not in FORMATS or not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = _profile_id(scope, fmt)
+        status_code = 0
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if expose:
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode("latin-1")))
+                    message["headers"] = headers
+            await send(message)
+
+        sampler = StackSampler(PROFILING_INTERVAL_MS / 1000.0)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            self._active.release()
+            self._store(profile_id, fmt, scope, status_code, sampler)
+
+    def _store(self, profile_id: str, fmt: str, scope, status_code: int, sampler: StackSampler) -> None:
+        name = f"{scope['method']} {scope['path']} -> {status_code} in {sampler.elapsed * 1000:.1f} ms"
+        try:
+            with open(os.path.join(PROFILING_OUTPUT_DIR, profile_id), "w") as handle:
+                if fmt == "speedscope":
+                    json.dump(to_speedscope(sampler.samples, name, PROFILING_INTERVAL_MS), handle)
+                else:
+                    handle.write(to_collapsed(sampler.samples))
+            for stale in list_profiles()[PROFILING_MAX_FILES:]:
+                os.remove(os.path.join(PROFILING_OUTPUT_DIR, stale))
+        except OSError as e:
+            logger.error(f"Failed to store profile {profile_id}: {str(e)}")
+            return
+        get_metrics().incr("profiling.captured")
+        logger.info(f"Profiled {name} ({sum(sampler.samples.values())} samples): {profile_id}")
+
+
+def _requested_format(scope) -> Optional[str]:
+    """The profile format asked for by an admin, or None."""
+    wanted, authorization = None, None
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            wanted = value.decode("latin-1").strip().lower() or PROFILING_FORMAT
+        elif name == b"authorization":
+            authorization = value.decode("latin-1")
+    if wanted is None or not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        user = verify_supabase_token(authorization[7:].strip())
+    except HTTPException:
+        return None
+    return wanted if is_admin(user) else None
+
+
+def _profile_id(scope, fmt: str) -> str:
+    slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_")[:60] or "root"
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    return f"{stamp}-{random.getrandbits(24):06x}-{scope['method'].lower()}-{slug}{FORMATS[fmt]}"
@@ -0,0 +1,222 @@
+"""
+Per-request context shared between middleware, routes and services.
+
+The middleware installs a fresh RequestContext in a ContextVar for every
+HTTP request. FastAPI copies the context into the threadpool that runs
+sync handlers, so services can record facts about the request (such as
+having served stale data) and the middleware turns them into response
+headers.
+
+Each request also carries a deadline. Services read it through
+remaining_time() so every upstream call made on behalf of the request
+shares a single time budget.
+
+Time spent in Supabase calls, auth and response serialization is added
+up per request with record_timing()/timed() and reported in a
+Server-Timing header and a structured log line, which makes repeated
+round trips within one request visible.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STALE_HEADER = "X-Data-Stale"
+TIMEOUT_HEADER = "x-request-timeout-ms"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+# Budget for a whole request, and for upstream calls made outside of one
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "10000"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+REQUEST_TIMING_LOG = os.getenv("REQUEST_TIMING_LOG", "true").lower() == "true"
+
+# Prefix of per-operation timings that are also summed into a "db" total
+DB_TIMING_PREFIX = "db."
+
+
+class RequestContext:
+    """Mutable state collected while a single request is processed."""
+
+    def __init__(self, budget_seconds: float = REQUEST_DEADLINE_MS / 1000.0):
+        self.stale_sources: Set[str] = set()
+        self.deadline: float = time.monotonic() + budget_seconds
+        self.started: float = time.perf_counter()
+        # name -> [count, seconds]; written from threadpool workers too
+        self.timings: Dict[str, List[float]] = {}
+        self.endpoint_finished: Optional[float] = None
+        # Bulkhead group, set when the request is admitted
+        self.route_group: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.timings.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def totals(self) -> Dict[str, List[float]]:
+        """Recorded timings plus the "db" sum of all per-operation entries."""
+        with self._lock:
+            totals = {name: list(entry) for name, entry in self.timings.items()}
+        db = [0, 0.0]
+        for name, (count, seconds) in totals.items():
+            if name.startswith(DB_TIMING_PREFIX):
+                db[0] += count
+                db[1] += seconds
+        if db[0]:
+            totals["db"] = db
+        return totals
+
+
+_current_context: ContextVar[Optional[RequestContext]] = ContextVar(
+    "request_context", default=None
+)
+
+
+def current_request_context() -> Optional[RequestContext]:
+    """Return the context of the request being handled, or None outside a request."""
+    return _current_context.get()
+
+
+def remaining_time() -> float:
+    """
+    Return the seconds left in the current request's budget.
+
+    Outside of a request (background jobs, scripts) the full default
+    budget is returned so upstream calls are still bounded.
+    """
+    context = _current_context.get()
+    if context is None:
+        return REQUEST_DEADLINE_MS / 1000.0
+    return context.deadline - time.monotonic()
+
+
+def mark_stale(source: str) -> None:
+    """Record that data from source was served from the last known good copy."""
+    context = _current_context.get()
+    if context is not None:
+        context.stale_sources.add(source)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add one timed step to the current request, if there is one."""
+    context = _current_context.get()
+    if context is not None:
+        context.record(name, seconds)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Time the enclosed block as one step of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+
+def server_timing(context: RequestContext) -> str:
+    """
+    Format a context's timings as a Server-Timing header value.
+
+    Example: ``total;dur=12.4, db;dur=8.1;desc="3 calls", db.faqs.get;dur=2.0;desc="1 call", auth;dur=0.3``
+    """
+    entries = [f"total;dur={(time.perf_counter() - context.started) * 1000:.1f}"]
+    totals = context.totals()
+    for name in sorted(totals, key=lambda name: (name.startswith(DB_TIMING_PREFIX), name != "db", name)):
+        count, seconds = totals[name]
+        calls = f"{int(count)} call" + ("s" if count != 1 else "")
+        entries.append(f'{name};dur={seconds * 1000:.1f};desc="{calls}"')
+    return ", ".join(entries)
+
+
+def log_request_timing(scope, status_code: int, context: RequestContext) -> None:
+    """Emit one structured log line with the per-request totals."""
+    totals = context.totals()
+    fields: Dict[str, Any] = {
+        "method": scope.get("method"),
+        "path": scope.get("path"),
+        "status": status_code,
+        "total_ms": round((time.perf_counter() - context.started) * 1000, 2),
+        "db_calls": int(totals.get("db", [0, 0.0])[0]),
+        "db_ms": round(totals.get("db", [0, 0.0])[1] * 1000, 2),
+        "auth_ms": round(totals.get("auth", [0, 0.0])[1] * 1000, 2),
+        "serialize_ms": round(totals.get("serialize", [0, 0.0])[1] * 1000, 2),
+        "db_ops": {
+            name[len(DB_TIMING_PREFIX):]: int(count)
+            for name, (count, _) in totals.items() if name.startswith(DB_TIMING_PREFIX)
+        },
+    }
+    logger.info(
+        " ".join(f"{key}={value}" for key, value in fields.items() if key != "db_ops")
+        + "".join(f" db.{op}={count}" for op, count in fields["db_ops"].items()),
+        extra={"request_timing": fields},
+    )
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that creates a RequestContext per HTTP request
+    and adds context-derived headers to the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(_request_budget(scope))
+        token = _current_context.set(context)
+        status_code = 500
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers: List = list(message.get("headers", []))
+                if context.stale_sources:
+                    headers.append((
+                        STALE_HEADER.lower().encode("latin-1"),
+                        ", ".join(sorted(context.stale_sources)).encode("latin-1"),
+                    ))
+                if SERVER_TIMING_ENABLED:
+                    headers.append((
+                        SERVER_TIMING_HEADER.lower().encode("latin-1"),
+                        server_timing(context).encode("latin-1"),
+                    ))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_context.reset(token)
+            if REQUEST_TIMING_LOG:
+                log_request_timing(scope, status_code, context)
+
+
+def _request_budget(scope) -> float:
+    """
+    Return the time budget for a request in seconds.
+
+    Clients may ask for a tighter budget with the X-Request-Timeout-Ms
+    header; they can never extend the server default.
+    """
+    budget_ms = REQUEST_DEADLINE_MS
+    for name, value in scope.get("headers", []):
+        if name == TIMEOUT_HEADER.encode("latin-1"):
+            try:
+                budget_ms = min(budget_ms, max(0.0, float(value.decode("latin-1"))))
+            except ValueError:
+                pass
+            break
+    return budget_ms / 1000.0
@@ -0,0 +1,63 @@
+"""
+Route class that times response serialization.
+
+FastAPI validates the endpoint's return value against the response
+model, encodes it and renders JSON after the endpoint returns. The
+route marks when the endpoint finished and records the time until the
+Response object exists as the request's "serialize" step.
+"""
+
+import asyncio
+import functools
+import time
+from typing import Callable
+
+from fastapi.routing import APIRoute
+
+from middleware.request_context import current_request_context, record_timing
+
+
+def _mark_finished(call: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _set_finished()
+        return async_endpoint
+
+    @functools.wraps(call)
+    def endpoint(*args, **kwargs):
+        try:
+            return call(*args, **kwargs)
+        finally:
+            _set_finished()
+    return endpoint
+
+
+def _set_finished() -> None:
+    context = current_request_context()
+    if context is not None:
+        context.endpoint_finished = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute recording serialization time in the request context."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Wrapped after dependency analysis, so the endpoint signature is untouched
+        self.dependant.call = _mark_finished(self.dependant.call)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            context = current_request_context()
+            if context is not None and context.endpoint_finished is not None:
+                record_timing("serialize", time.perf_counter() - context.endpoint_finished)
+            return response
+
+        return timed_handler
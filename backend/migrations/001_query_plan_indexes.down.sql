@@ -0,0 +1,20 @@
+-- ============================================================================
+-- Revert migration 001: restore the original single-column indexes
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/001_query_plan_indexes.down.sql
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_is_active ON faqs(is_active);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_category ON faqs(category);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_created_at ON faqs(created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_is_active ON announcements(is_active);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_date ON announcements(date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_category ON announcements(category);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_priority ON announcements(priority);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_active_created;
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_active_category_created;
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_updated;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_active_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_active_category_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_active_priority_date;
@@ -0,0 +1,50 @@
+-- ============================================================================
+-- Migration 001: composite and partial indexes for the API's queries
+-- ============================================================================
+-- Every list query of SupabaseService filters is_active = TRUE and orders by
+-- created_at or date, which the single-column indexes of the original
+-- schema could not serve together: Postgres picked one of them and sorted
+-- or filtered the rest. These indexes match each query's filter and order,
+-- and the partial ones skip inactive rows entirely.
+--
+-- Builds CONCURRENTLY, so writes continue while it runs. Apply statement by
+-- statement outside a transaction, e.g.
+--     psql "$DATABASE_URL" -f migrations/001_query_plan_indexes.sql
+-- Revert with 001_query_plan_indexes.down.sql. Measure with
+-- scripts/explain_indexes.py. New installs get these from setup_database.sql.
+-- ============================================================================
+
+-- get_all_faqs: is_active ORDER BY created_at DESC LIMIT n
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_active_created
+    ON faqs(created_at DESC) WHERE is_active = TRUE;
+
+-- get_all_faqs(category): is_active AND category = ? ORDER BY created_at DESC LIMIT n
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_active_category_created
+    ON faqs(category, created_at DESC) WHERE is_active = TRUE;
+
+-- FAQ snapshot catch-up: updated_at >= ? ORDER BY updated_at, id (inactive rows included)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_updated
+    ON faqs(updated_at, id);
+
+-- get_all_announcements, announcement store load and expiry:
+-- is_active AND date >= ? (or < ?) ORDER BY date LIMIT n
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_active_date
+    ON announcements(date) WHERE is_active = TRUE;
+
+-- get_all_announcements(category): is_active AND category = ? AND date >= ? ORDER BY date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_active_category_date
+    ON announcements(category, date) WHERE is_active = TRUE;
+
+-- get_all_announcements(priority): is_active AND priority = ? AND date >= ? ORDER BY date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_active_priority_date
+    ON announcements(priority, date) WHERE is_active = TRUE;
+
+-- Superseded: no query filters on these alone, and is_active is too
+-- unselective to be worth an index of its own
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_is_active;
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_category;
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_is_active;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_category;
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_priority;
@@ -0,0 +1,11 @@
+-- ============================================================================
+-- Revert migration 002: drop full-text FAQ search
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/002_faq_full_text_search.down.sql
+-- Set FAQ_SEARCH_BACKEND=memory first.
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS search_faqs(TEXT, TEXT, INTEGER);
+DROP INDEX CONCURRENTLY IF EXISTS idx_faqs_search;
+ALTER TABLE faqs DROP COLUMN IF EXISTS search_vector;
+DROP FUNCTION IF EXISTS faq_search_document(TEXT, TEXT, TEXT[]);
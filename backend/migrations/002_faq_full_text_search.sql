@@ -0,0 +1,67 @@
+-- ============================================================================
+-- Migration 002: full-text FAQ search in Postgres
+-- ============================================================================
+-- Adds the generated search_vector column over question, tags and answer,
+-- its GIN index and the search_faqs() ranked search function used when
+-- FAQ_SEARCH_BACKEND=postgres. The function and column definitions are
+-- those of setup_database.sql.
+--
+-- Adding a stored generated column rewrites faqs under an ACCESS EXCLUSIVE
+-- lock (seconds for 100k FAQs); run it off-peak. The index then builds
+-- CONCURRENTLY, so apply statement by statement outside a transaction:
+--     psql "$DATABASE_URL" -f migrations/002_faq_full_text_search.sql
+-- Revert with 002_faq_full_text_search.down.sql. Compare against the
+-- substring search with scripts/bench_full_text_search.py.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION faq_search_document(question TEXT, answer TEXT, tags TEXT[])
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('english', COALESCE(question, '')), 'A')
+        || setweight(to_tsvector('english', COALESCE(array_to_string(tags, ' '), '')), 'B')
+        || setweight(to_tsvector('english', COALESCE(answer, '')), 'C');
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (faq_search_document(question, answer, tags)) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_faqs_search ON faqs USING GIN(search_vector);
+
+CREATE OR REPLACE FUNCTION search_faqs(
+    search_query TEXT,
+    category_filter TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE (
+    id UUID,
+    question TEXT,
+    answer TEXT,
+    category TEXT,
+    tags TEXT[],
+    is_active BOOLEAN,
+    created_by TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    view_count INTEGER,
+    rank REAL,
+    question_highlight TEXT,
+    answer_highlight TEXT
+) AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', search_query) AS q
+    ), ranked AS (
+        SELECT f.*, ts_rank(f.search_vector, query.q) AS rank
+        FROM faqs f, query
+        WHERE f.search_vector @@ query.q
+          AND f.is_active = TRUE
+          AND (category_filter IS NULL OR f.category = category_filter)
+        ORDER BY rank DESC, f.view_count DESC
+        LIMIT result_limit
+    )
+    SELECT
+        r.id, r.question, r.answer, r.category, r.tags, r.is_active,
+        r.created_by, r.created_at, r.updated_at, r.view_count, r.rank,
+        ts_headline('english', r.question, query.q, 'HighlightAll=true, StartSel=<mark>, StopSel=</mark>'),
+        ts_headline('english', r.answer, query.q, 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10')
+    FROM ranked r, query
+    ORDER BY r.rank DESC, r.view_count DESC;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,8 @@
+-- ============================================================================
+-- Revert migration 003: drop atomic FAQ view counting
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/003_faq_view_increments.down.sql
+-- Deploy an API version that does not call increment_faq_views() first.
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS increment_faq_views(UUID[]);
@@ -0,0 +1,16 @@
+-- ============================================================================
+-- Migration 003: atomic FAQ view counting
+-- ============================================================================
+-- Adds increment_faq_views(), which the API calls to count views instead
+-- of writing back a view_count it read earlier (concurrent views of the
+-- same FAQ were lost). The definition is that of setup_database.sql.
+--     psql "$DATABASE_URL" -f migrations/003_faq_view_increments.sql
+-- Revert with 003_faq_view_increments.down.sql.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION increment_faq_views(faq_ids UUID[])
+RETURNS SETOF faqs AS $$
+    UPDATE faqs SET view_count = view_count + 1
+    WHERE id = ANY(faq_ids)
+    RETURNING *;
+$$ LANGUAGE sql;
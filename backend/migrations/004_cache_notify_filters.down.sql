@@ -0,0 +1,31 @@
+-- ============================================================================
+-- Revert migration 004: notify on every FAQ write again
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/004_cache_notify_filters.down.sql
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', row_id)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_faqs_update_cache_invalidation ON faqs;
+DROP TRIGGER IF EXISTS notify_faqs_cache_invalidation ON faqs;
+
+CREATE TRIGGER notify_faqs_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON faqs
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
@@ -0,0 +1,48 @@
+-- ============================================================================
+-- Migration 004: filtered cache invalidation NOTIFYs
+-- ============================================================================
+-- Adds the origin of API writes to the cache_invalidation payload and
+-- stops FAQ updates that change no cached column (view counts) from
+-- notifying. The definitions are those of setup_database.sql. Only
+-- needed with CACHE_BUS_PG_NOTIFY=true.
+--     psql "$DATABASE_URL" -f migrations/004_cache_notify_filters.sql
+-- Revert with 004_cache_notify_filters.down.sql.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_id,
+            'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_faqs_cache_invalidation ON faqs;
+DROP TRIGGER IF EXISTS notify_faqs_update_cache_invalidation ON faqs;
+
+CREATE TRIGGER notify_faqs_cache_invalidation
+    AFTER INSERT OR DELETE ON faqs
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
+
+CREATE TRIGGER notify_faqs_update_cache_invalidation
+    AFTER UPDATE ON faqs
+    FOR EACH ROW
+    WHEN ((OLD.question, OLD.answer, OLD.category, OLD.tags, OLD.is_active)
+          IS DISTINCT FROM (NEW.question, NEW.answer, NEW.category, NEW.tags, NEW.is_active))
+    EXECUTE FUNCTION notify_cache_invalidation();
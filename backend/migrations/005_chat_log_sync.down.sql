@@ -0,0 +1,14 @@
+-- ============================================================================
+-- Revert migration 005: drop chat log updated_at
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/005_chat_log_sync.down.sql
+-- Revert 007 first, and deploy an API version without GET
+-- /api/v1/chat-logs/sync (which orders by updated_at).
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_logs_user_id ON chat_logs(user_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_logs_user_updated;
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_logs_user_created;
+DROP TRIGGER IF EXISTS update_chat_logs_updated_at ON chat_logs;
+ALTER TABLE chat_logs DROP COLUMN IF EXISTS updated_at;
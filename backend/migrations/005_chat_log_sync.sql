@@ -0,0 +1,38 @@
+-- ============================================================================
+-- Migration 005: chat log updated_at for history sync
+-- ============================================================================
+-- Adds chat_logs.updated_at, moved by a BEFORE UPDATE trigger, so feedback
+-- changes pass the watermark of GET /api/v1/chat-logs/sync, and the
+-- per-user indexes that history reads and the sync query range-scan. The
+-- definitions are those of setup_database.sql.
+--
+-- Existing logs get their own created_at as updated_at (the column is
+-- added without a default, so the backfill does not stamp one shared
+-- NOW()); the trigger is created after the backfill for the same reason.
+-- The backfill rewrites every log: run it off-peak. The indexes build
+-- CONCURRENTLY, so apply statement by statement outside a transaction:
+--     psql "$DATABASE_URL" -f migrations/005_chat_log_sync.sql
+-- Revert with 005_chat_log_sync.down.sql.
+-- ============================================================================
+
+ALTER TABLE chat_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+UPDATE chat_logs SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE chat_logs ALTER COLUMN updated_at SET DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS update_chat_logs_updated_at ON chat_logs;
+
+CREATE TRIGGER update_chat_logs_updated_at
+    BEFORE UPDATE ON chat_logs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Per-user history, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_logs_user_created
+    ON chat_logs(user_id, created_at DESC);
+
+-- Per-user delta sync: (updated_at, id) > watermark
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_logs_user_updated
+    ON chat_logs(user_id, updated_at, id);
+
+-- Prefix of idx_chat_logs_user_created
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_logs_user_id;
@@ -0,0 +1,12 @@
+-- ============================================================================
+-- Revert migration 006: drop the chat log archive and rollups
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/006_chat_log_archive.down.sql
+-- Revert 007 first and set CHAT_LOG_RETENTION_DAYS=0. Archived logs and
+-- rollups are deleted with their tables: copy them elsewhere first (or
+-- back into chat_logs) if they are still needed.
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS archive_chat_logs(TIMESTAMPTZ, INTEGER);
+DROP TABLE IF EXISTS chat_log_rollups;
+DROP TABLE IF EXISTS chat_logs_archive;
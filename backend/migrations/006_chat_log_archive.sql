@@ -0,0 +1,94 @@
+-- ============================================================================
+-- Migration 006: chat log archive and daily rollups
+-- ============================================================================
+-- Adds chat_logs_archive, chat_log_rollups and archive_chat_logs(), which
+-- the API's scheduler calls in batches to move logs older than
+-- CHAT_LOG_RETENTION_DAYS out of chat_logs. The definitions are those of
+-- setup_database.sql, except that archive_chat_logs() gains its cache
+-- invalidation NOTIFY in 007. Apply after 005 (the archive copies
+-- updated_at), before setting CHAT_LOG_RETENTION_DAYS:
+--     psql "$DATABASE_URL" -f migrations/006_chat_log_archive.sql
+-- Revert with 006_chat_log_archive.down.sql.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS chat_logs_archive (
+    id UUID PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    matched_faq_id UUID,
+    confidence DECIMAL(3, 2),
+    was_helpful BOOLEAN,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Archived history per user, newest first
+CREATE INDEX IF NOT EXISTS idx_chat_logs_archive_user_created ON chat_logs_archive(user_id, created_at DESC);
+
+ALTER TABLE chat_logs_archive ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own archived chat logs" ON chat_logs_archive;
+
+CREATE POLICY "Users can view their own archived chat logs" ON chat_logs_archive
+    FOR SELECT USING (auth.uid()::text = user_id);
+
+-- Questions per day (UTC) and matched FAQ; NULL matched_faq_id counts unmatched questions
+CREATE TABLE IF NOT EXISTS chat_log_rollups (
+    day DATE NOT NULL,
+    matched_faq_id UUID,
+    questions INTEGER NOT NULL DEFAULT 0,
+    helpful INTEGER NOT NULL DEFAULT 0,
+    unhelpful INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT chat_log_rollups_day_faq UNIQUE NULLS NOT DISTINCT (day, matched_faq_id)
+);
+
+-- Service role only
+ALTER TABLE chat_log_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Move up to batch_size logs created before cutoff; returns the number moved.
+-- SKIP LOCKED leaves logs being written (e.g. feedback) for the next batch.
+CREATE OR REPLACE FUNCTION archive_chat_logs(cutoff TIMESTAMPTZ, batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM chat_logs
+        WHERE created_at < cutoff
+        ORDER BY created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM chat_logs c USING batch WHERE c.id = batch.id
+        RETURNING c.*
+    ), archived AS (
+        INSERT INTO chat_logs_archive (id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at)
+        SELECT id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at FROM removed
+        ON CONFLICT (id) DO NOTHING
+    ), rolled_up AS (
+        INSERT INTO chat_log_rollups AS r
+            (day, matched_faq_id, questions, helpful, unhelpful, confidence_sum, confidence_count)
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::DATE,
+            matched_faq_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE was_helpful),
+            COUNT(*) FILTER (WHERE NOT was_helpful),
+            COALESCE(SUM(confidence), 0),
+            COUNT(confidence)
+        FROM removed
+        GROUP BY 1, 2
+        ON CONFLICT ON CONSTRAINT chat_log_rollups_day_faq DO UPDATE SET
+            questions = r.questions + EXCLUDED.questions,
+            helpful = r.helpful + EXCLUDED.helpful,
+            unhelpful = r.unhelpful + EXCLUDED.unhelpful,
+            confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+            confidence_count = r.confidence_count + EXCLUDED.confidence_count
+    )
+    SELECT COUNT(*) INTO moved FROM removed;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,74 @@
+-- ============================================================================
+-- Revert migration 007: drop chat log cache invalidation NOTIFYs
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/007_chat_log_notify.down.sql
+-- Restores the definitions of migrations 004 and 006.
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS notify_chat_logs_cache_invalidation ON chat_logs;
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id;
+    ELSE
+        row_id := NEW.id;
+    END IF;
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_id,
+            'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION archive_chat_logs(cutoff TIMESTAMPTZ, batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM chat_logs
+        WHERE created_at < cutoff
+        ORDER BY created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM chat_logs c USING batch WHERE c.id = batch.id
+        RETURNING c.*
+    ), archived AS (
+        INSERT INTO chat_logs_archive (id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at)
+        SELECT id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at FROM removed
+        ON CONFLICT (id) DO NOTHING
+    ), rolled_up AS (
+        INSERT INTO chat_log_rollups AS r
+            (day, matched_faq_id, questions, helpful, unhelpful, confidence_sum, confidence_count)
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::DATE,
+            matched_faq_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE was_helpful),
+            COUNT(*) FILTER (WHERE NOT was_helpful),
+            COALESCE(SUM(confidence), 0),
+            COUNT(confidence)
+        FROM removed
+        GROUP BY 1, 2
+        ON CONFLICT ON CONSTRAINT chat_log_rollups_day_faq DO UPDATE SET
+            questions = r.questions + EXCLUDED.questions,
+            helpful = r.helpful + EXCLUDED.helpful,
+            unhelpful = r.unhelpful + EXCLUDED.unhelpful,
+            confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+            confidence_count = r.confidence_count + EXCLUDED.confidence_count
+    )
+    SELECT COUNT(*) INTO moved FROM removed;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,101 @@
+-- ============================================================================
+-- Migration 007: chat log cache invalidation NOTIFYs
+-- ============================================================================
+-- Notifies chat log inserts and updates keyed by user ID, and makes
+-- archive_chat_logs() notify a flush of cached chat histories, so the
+-- per-user history caches of every host see writes made elsewhere. The
+-- definitions are those of setup_database.sql. Apply after 006; only
+-- needed with CACHE_BUS_PG_NOTIFY=true.
+--     psql "$DATABASE_URL" -f migrations/007_chat_log_notify.sql
+-- Revert with 007_chat_log_notify.down.sql.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed RECORD;
+    row_key TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    IF TG_TABLE_NAME = 'chat_logs' THEN
+        row_key := changed.user_id;
+    ELSE
+        row_key := changed.id::text;
+    END IF;
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_key,
+            'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_chat_logs_cache_invalidation ON chat_logs;
+
+CREATE TRIGGER notify_chat_logs_cache_invalidation
+    AFTER INSERT OR UPDATE ON chat_logs
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
+
+CREATE OR REPLACE FUNCTION archive_chat_logs(cutoff TIMESTAMPTZ, batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM chat_logs
+        WHERE created_at < cutoff
+        ORDER BY created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM chat_logs c USING batch WHERE c.id = batch.id
+        RETURNING c.*
+    ), archived AS (
+        INSERT INTO chat_logs_archive (id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at)
+        SELECT id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at FROM removed
+        ON CONFLICT (id) DO NOTHING
+    ), rolled_up AS (
+        INSERT INTO chat_log_rollups AS r
+            (day, matched_faq_id, questions, helpful, unhelpful, confidence_sum, confidence_count)
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::DATE,
+            matched_faq_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE was_helpful),
+            COUNT(*) FILTER (WHERE NOT was_helpful),
+            COALESCE(SUM(confidence), 0),
+            COUNT(confidence)
+        FROM removed
+        GROUP BY 1, 2
+        ON CONFLICT ON CONSTRAINT chat_log_rollups_day_faq DO UPDATE SET
+            questions = r.questions + EXCLUDED.questions,
+            helpful = r.helpful + EXCLUDED.helpful,
+            unhelpful = r.unhelpful + EXCLUDED.unhelpful,
+            confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+            confidence_count = r.confidence_count + EXCLUDED.confidence_count
+    )
+    SELECT COUNT(*) INTO moved FROM removed;
+    IF moved > 0 THEN
+        -- Cached chat histories on every host may hold the moved logs
+        PERFORM pg_notify(
+            'cache_invalidation',
+            json_build_object(
+                'table', 'chat_logs',
+                'op', 'FLUSH',
+                'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+            )::text
+        );
+    END IF;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,19 @@
+-- ============================================================================
+-- Revert migration 008: return whole faqs rows from increment_faq_views()
+-- ============================================================================
+--     psql "$DATABASE_URL" -f migrations/008_faq_view_columns.down.sql
+-- Restores the definition of migration 003.
+-- ============================================================================
+
+BEGIN;
+
+DROP FUNCTION IF EXISTS increment_faq_views(UUID[]);
+
+CREATE FUNCTION increment_faq_views(faq_ids UUID[])
+RETURNS SETOF faqs AS $$
+    UPDATE faqs SET view_count = view_count + 1
+    WHERE id = ANY(faq_ids)
+    RETURNING *;
+$$ LANGUAGE sql;
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- ============================================================================
+-- Migration 008: increment_faq_views() without search_vector
+-- ============================================================================
+-- increment_faq_views() returned SETOF faqs, so every view shipped the
+-- generated search_vector tsvector back to the API, which never reads it.
+-- It now returns the API's FAQ columns only. A function's return type
+-- cannot be changed in place, so it is dropped and recreated in one
+-- transaction. The definition is that of setup_database.sql. Apply after 003:
+--     psql "$DATABASE_URL" -f migrations/008_faq_view_columns.sql
+-- Revert with 008_faq_view_columns.down.sql.
+-- ============================================================================
+
+BEGIN;
+
+DROP FUNCTION IF EXISTS increment_faq_views(UUID[]);
+
+CREATE FUNCTION increment_faq_views(faq_ids UUID[])
+RETURNS TABLE (
+    id UUID,
+    question TEXT,
+    answer TEXT,
+    category TEXT,
+    tags TEXT[],
+    is_active BOOLEAN,
+    created_by TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    view_count INTEGER
+) AS $$
+    UPDATE faqs SET view_count = faqs.view_count + 1
+    WHERE faqs.id = ANY(faq_ids)
+    RETURNING faqs.id, faqs.question, faqs.answer, faqs.category, faqs.tags, faqs.is_active,
+        faqs.created_by, faqs.created_at, faqs.updated_at, faqs.view_count;
+$$ LANGUAGE sql;
+
+COMMIT;
@@ -7,7 +7,7 @@ serialization, and type safety for API requests and responses.
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 from enum import Enum
 
@@ -55,6 +55,12 @@ class AnnouncementCategory(str, Enum):
     HOLIDAYS = "holidays"
 
 
+class ListView(str, Enum):
+    """Shapes a list endpoint can return."""
+    FULL = "full"
+    SUMMARY = "summary"
+
+
 # ============================================================================
 # FAQ Models
 # ============================================================================
@@ -146,6 +152,123 @@ class FAQResponse(FAQBase):
         }
 
 
+class FAQSearchResult(FAQResponse):
+    """
+    Model for FAQ list results, with ranking details for full-text searches.
+
+    Additional attributes:
+        rank: Full-text rank (set by the postgres search backend only)
+        highlights: ``question`` and ``answer`` excerpts with the matched
+            words in ``<mark>`` tags (postgres search backend only)
+    """
+    rank: Optional[float] = Field(None, description="Full-text search rank")
+    highlights: Optional[Dict[str, str]] = Field(None, description="Excerpts with matches in <mark> tags")
+
+
+class FAQSuggestion(BaseModel):
+    """
+    Model for typeahead suggestions.
+
+    Attributes:
+        id: FAQ identifier
+        question: FAQ question text
+        category: FAQ category
+        view_count: Number of times FAQ was viewed
+    """
+    id: UUID = Field(..., description="Unique FAQ identifier")
+    question: str = Field(..., description="FAQ question")
+    category: FAQCategory = Field(..., description="FAQ category")
+    view_count: int = Field(default=0, ge=0, description="View count")
+
+
+class FAQDuplicateCheck(BaseModel):
+    """
+    Model for checking a draft FAQ against existing ones.
+
+    Attributes:
+        question: Draft question
+        answer: Draft answer
+        exclude_id: ID of the FAQ being edited, if any
+    """
+    question: str = Field(..., min_length=5, max_length=500, description="FAQ question")
+    answer: str = Field("", max_length=5000, description="FAQ answer")
+    exclude_id: Optional[UUID] = Field(None, description="FAQ to leave out of the results")
+
+
+class FAQDuplicate(BaseModel):
+    """
+    Model for a likely near-duplicate FAQ.
+
+    Attributes:
+        id: FAQ identifier
+        question: FAQ question text
+        category: FAQ category
+        similarity: Estimated Jaccard similarity (0.0 to 1.0)
+    """
+    id: UUID = Field(..., description="Unique FAQ identifier")
+    question: str = Field(..., description="FAQ question")
+    category: FAQCategory = Field(..., description="FAQ category")
+    similarity: float = Field(..., ge=0.0, le=1.0, description="Estimated similarity")
+
+
+# Upper bound on IDs per batch-get request
+FAQ_BATCH_MAX_IDS = 500
+
+
+class FAQBatchGet(BaseModel):
+    """
+    Model for resolving several FAQs at once.
+
+    Attributes:
+        ids: FAQ identifiers, in the order results should be returned
+        increment_views: Count this lookup as a view of each found FAQ
+    """
+    ids: List[UUID] = Field(..., min_length=1, max_length=FAQ_BATCH_MAX_IDS, description="FAQ IDs")
+    increment_views: bool = Field(False, description="Increment view counts of found FAQs")
+
+
+class FAQBatchGetResponse(BaseModel):
+    """
+    Model for the result of a batch get.
+
+    Attributes:
+        faqs: Found FAQs, in request order
+        missing: Requested IDs that do not exist
+    """
+    faqs: List[FAQResponse] = Field(default_factory=list, description="Found FAQs")
+    missing: List[UUID] = Field(default_factory=list, description="IDs not found")
+
+
+# Columns selectable through ``fields=`` on the FAQ list routes
+FAQ_FIELDS = (
+    "id", "question", "answer", "category", "tags", "is_active",
+    "created_by", "created_at", "updated_at", "view_count",
+)
+# Columns of the ``view=summary`` FAQ list
+FAQ_SUMMARY_FIELDS = ("id", "question", "category", "tags", "view_count", "updated_at")
+
+
+class FAQSummary(BaseModel):
+    """
+    Slim model for FAQ list views.
+
+    Only the selected columns are set; unset ones are left out of the
+    response. ``answer`` may be truncated to a snippet.
+    """
+    id: UUID = Field(..., description="Unique FAQ identifier")
+    question: Optional[str] = Field(None, description="FAQ question")
+    answer: Optional[str] = Field(None, description="FAQ answer or snippet")
+    category: Optional[FAQCategory] = Field(None, description="FAQ category")
+    tags: Optional[List[str]] = Field(None, description="Searchable tags")
+    is_active: Optional[bool] = Field(None, description="Active status")
+    created_by: Optional[str] = Field(None, description="User ID of creator")
+    created_at: Optional[datetime] = Field(None, description="Creation timestamp")
+    updated_at: Optional[datetime] = Field(None, description="Last update timestamp")
+    view_count: Optional[int] = Field(None, description="View count")
+    rank: Optional[float] = Field(None, description="Full-text search rank")
+    highlights: Optional[Dict[str, str]] = Field(None, description="Excerpts with matches in <mark> tags")
+
+
 # ============================================================================
 # Announcement Models
 # ============================================================================
@@ -224,6 +347,34 @@ class AnnouncementResponse(AnnouncementBase):
         }
 
 
+# Columns selectable through ``fields=`` on the announcement list routes
+ANNOUNCEMENT_FIELDS = (
+    "id", "title", "description", "category", "date", "priority",
+    "created_by", "created_at", "updated_at", "is_active",
+)
+# Columns of the ``view=summary`` announcement list
+ANNOUNCEMENT_SUMMARY_FIELDS = ("id", "title", "category", "date", "priority")
+
+
+class AnnouncementSummary(BaseModel):
+    """
+    Slim model for announcement list views.
+
+    Only the selected columns are set; unset ones are left out of the
+    response. ``description`` may be truncated to a snippet.
+    """
+    id: UUID = Field(..., description="Unique announcement identifier")
+    title: Optional[str] = Field(None, description="Announcement title")
+    description: Optional[str] = Field(None, description="Description or snippet")
+    category: Optional[AnnouncementCategory] = Field(None, description="Announcement category")
+    date: Optional[datetime] = Field(None, description="Event/announcement date")
+    priority: Optional[Priority] = Field(None, description="Priority level")
+    created_by: Optional[str] = Field(None, description="User ID of creator")
+    created_at: Optional[datetime] = Field(None, description="Creation timestamp")
+    updated_at: Optional[datetime] = Field(None, description="Last update timestamp")
+    is_active: Optional[bool] = Field(None, description="Active status")
+
+
 # ============================================================================
 # Chat Log Models
 # ============================================================================
@@ -251,10 +402,12 @@ class ChatLogResponse(ChatLogCreate):
     Additional attributes:
         id: Unique identifier (UUID)
         created_at: Timestamp of the chat
+        updated_at: Timestamp of the last feedback change
         was_helpful: Optional feedback on whether response was helpful
     """
     id: UUID = Field(..., description="Unique chat log identifier")
     created_at: datetime = Field(..., description="Chat timestamp")
+    updated_at: Optional[datetime] = Field(None, description="Last change timestamp")
     was_helpful: Optional[bool] = Field(None, description="User feedback on helpfulness")
 
     class Config:
@@ -270,3 +423,17 @@ class ChatLogResponse(ChatLogCreate):
                 "was_helpful": True
             }
         }
+
+
+class ChatLogSyncResponse(BaseModel):
+    """
+    Model for one page of incremental chat history.
+
+    Attributes:
+        logs: Logs created or changed after the requested watermark, oldest change first
+        watermark: Value to pass as ``since`` on the next sync
+        has_more: True when further changes are waiting beyond this page
+    """
+    logs: List[ChatLogResponse] = Field(default_factory=list, description="New or changed chat logs")
+    watermark: Optional[str] = Field(None, description="Watermark for the next sync")
+    has_more: bool = Field(False, description="More changes are available")
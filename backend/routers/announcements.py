@@ -1,20 +1,30 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from middleware.auth import get_current_user, AuthUser
+from middleware.timed_route import TimedRoute
 from models.database import (
     AnnouncementCreate,
     AnnouncementUpdate,
     AnnouncementResponse,
-    AnnouncementCategory
+    AnnouncementSummary,
+    AnnouncementCategory,
+    ListView,
+    Priority,
+    ANNOUNCEMENT_FIELDS,
+    ANNOUNCEMENT_SUMMARY_FIELDS
 )
+from routers.list_views import resolve_columns, slim_response
+from services.announcement_stream import TooManySubscribers
 from services.supabase_service import get_supabase_service, SupabaseService
 
 router = APIRouter(
     prefix="/announcements",
     tags=["Announcements"],
+    route_class=TimedRoute,
     responses={
         404: {"description": "Announcement not found"},
         401: {"description": "Unauthorized"},
@@ -28,25 +38,80 @@ router = APIRouter(
     response_model=List[AnnouncementResponse],
     status_code=status.HTTP_200_OK,
     summary="List all active announcements",
-    description="Retrieve all active announcements with optional filtering."
+    description=(
+        "Retrieve all active announcements with optional filtering. "
+        "`view=summary` or `fields=` return only some columns (see AnnouncementSummary)."
+    )
 )
 def list_announcements(
     upcoming_only: bool = Query(True, description="Show only upcoming announcements"),
     category: Optional[str] = Query(None, description="Filter by category"),
+    priority: Optional[Priority] = Query(None, description="Filter by priority"),
     limit: int = Query(50, ge=1, le=200, description="Maximum number of results"),
+    view: ListView = Query(ListView.FULL, description="full, or summary without descriptions"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,date"),
+    snippet: int = Query(0, ge=0, le=1000, description="Truncate descriptions to this many characters (summary view includes them only when set)"),
     db: SupabaseService = Depends(get_supabase_service)
-) -> List[AnnouncementResponse]:
-    announcements = db.get_all_announcements(limit=limit, upcoming_only=upcoming_only)
-    
-    if category and announcements:
-        announcements = [
-            ann for ann in announcements
-            if ann.get("category") == category
-        ]
+) -> Union[List[AnnouncementResponse], Response]:
+    columns = resolve_columns(view, fields, ANNOUNCEMENT_FIELDS, ANNOUNCEMENT_SUMMARY_FIELDS, "description", snippet)
+    announcements = db.get_all_announcements(
+        limit=limit,
+        upcoming_only=upcoming_only,
+        category=category,
+        priority=priority.value if priority else None,
+        columns=columns
+    )
     
+    if columns is not None:
+        return slim_response(AnnouncementSummary, announcements, "description", snippet)
     return [AnnouncementResponse(**ann) for ann in announcements]
 
 
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Stream announcement changes",
+    description="Server-sent events for announcements being created, updated or deleted."
+)
+async def stream_announcements(
+    request: Request,
+    category: Optional[AnnouncementCategory] = Query(None, description="Only push this category"),
+    priority: Optional[Priority] = Query(None, description="Only push this priority"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event (or send Last-Event-ID)"),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> StreamingResponse:
+    """
+    Subscribe to announcement changes.
+
+    Events are ``created`` and ``updated`` (with the announcement and an
+    ``urgent`` flag for urgent or emergency ones), ``deleted`` (with the
+    ID) and ``resync``, after which the client should refetch the list.
+    Comment lines are sent as heartbeats while nothing changes.
+    Reconnecting EventSource clients resume via Last-Event-ID.
+
+    Raises:
+    - 503: Too many open streams on this server
+    """
+    try:
+        frames = await db.announcement_stream.subscribe(
+            last_event_id=request.headers.get("last-event-id") or last_event_id,
+            category=category.value if category else None,
+            priority=priority.value if priority else None
+        )
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open announcement streams, retry later"
+        )
+
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get(
     "/{announcement_id}",
     response_model=AnnouncementResponse,
@@ -110,7 +175,7 @@ def update_announcement(
     current_user: AuthUser = Depends(get_current_user),
     db: SupabaseService = Depends(get_supabase_service)
 ) -> AnnouncementResponse:
-    existing_announcement = db.get_announcement_by_id(str(announcement_id))
+    existing_announcement = db.get_announcement_by_id(str(announcement_id), fresh=True)
     if not existing_announcement:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -160,7 +225,7 @@ def delete_announcement(
     current_user: AuthUser = Depends(get_current_user),
     db: SupabaseService = Depends(get_supabase_service)
 ) -> dict:
-    existing_announcement = db.get_announcement_by_id(str(announcement_id))
+    existing_announcement = db.get_announcement_by_id(str(announcement_id), fresh=True)
     if not existing_announcement:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -189,18 +254,27 @@ def delete_announcement(
     response_model=List[AnnouncementResponse],
     status_code=status.HTTP_200_OK,
     summary="Get announcements by category",
-    description="Retrieve all active announcements in a specific category."
+    description=(
+        "Retrieve all active announcements in a specific category. "
+        "`view=summary` or `fields=` return only some columns (see AnnouncementSummary)."
+    )
 )
 def get_announcements_by_category(
     category: AnnouncementCategory,
     limit: int = Query(50, ge=1, le=200, description="Maximum number of results"),
+    view: ListView = Query(ListView.FULL, description="full, or summary without descriptions"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,date"),
+    snippet: int = Query(0, ge=0, le=1000, description="Truncate descriptions to this many characters (summary view includes them only when set)"),
     db: SupabaseService = Depends(get_supabase_service)
-) -> List[AnnouncementResponse]:
-    announcements = db.get_all_announcements(limit=limit, upcoming_only=False)
-    
-    announcements = [
-        ann for ann in announcements
-        if ann.get("category") == category.value
-    ]
+) -> Union[List[AnnouncementResponse], Response]:
+    columns = resolve_columns(view, fields, ANNOUNCEMENT_FIELDS, ANNOUNCEMENT_SUMMARY_FIELDS, "description", snippet)
+    announcements = db.get_all_announcements(
+        limit=limit,
+        upcoming_only=False,
+        category=category.value,
+        columns=columns
+    )
     
+    if columns is not None:
+        return slim_response(AnnouncementSummary, announcements, "description", snippet)
     return [AnnouncementResponse(**ann) for ann in announcements]
@@ -5,20 +5,24 @@ This module provides REST API endpoints for chat logging and analytics,
 allowing users to track their chat history and provide feedback.
 """
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 
 from middleware.auth import get_current_user, AuthUser
-from models.database import ChatLogCreate, ChatLogResponse
+from middleware.timed_route import TimedRoute
+from models.database import ChatLogCreate, ChatLogResponse, ChatLogSyncResponse
+from services.announcement_store import parse_timestamp
 from services.supabase_service import get_supabase_service, SupabaseService
 
 # Create router with tags for OpenAPI documentation
 router = APIRouter(
     prefix="/chat-logs",
     tags=["Chat Logs"],
+    route_class=TimedRoute,
     responses={
         404: {"description": "Chat log not found"},
         401: {"description": "Unauthorized"},
@@ -115,6 +119,105 @@ def get_my_chat_history(
     return [ChatLogResponse(**log) for log in logs]
 
 
+@router.get(
+    "/my-history/archive",
+    response_model=List[ChatLogResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Get current user's archived chat history",
+    description="Retrieve the authenticated user's chat logs moved to the archive by the retention job, newest first."
+)
+def get_my_archived_chat_history(
+    before: Optional[datetime] = Query(None, description="Only logs created before this time (created_at of the last log of the previous page)"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of logs to return"),
+    current_user: AuthUser = Depends(get_current_user),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> List[ChatLogResponse]:
+    """
+    Get the current user's archived chat history.
+
+    Requires authentication.
+    Logs older than the retention period are no longer returned by
+    /my-history or /sync; they are read from the archive on demand.
+    Page backwards by passing the created_at of the last log as
+    ``before``.
+
+    Query Parameters:
+    - before: Upper bound (exclusive) on created_at
+    - limit: Maximum number of logs to return (1-200, default: 50)
+
+    Returns:
+    - List of archived chat log objects, newest first
+
+    Raises:
+    - 401: Unauthorized (no valid token)
+    - 500: Archive query failed
+    """
+    logs = db.get_user_archived_chat_logs(
+        current_user.id, before=before.isoformat() if before else None, limit=limit
+    )
+    if logs is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve archived chat history"
+        )
+
+    return [ChatLogResponse(**log) for log in logs]
+
+
+@router.get(
+    "/sync",
+    response_model=ChatLogSyncResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Sync current user's chat history",
+    description="Retrieve only the chat logs created or changed since the watermark of the previous sync."
+)
+def sync_my_chat_history(
+    since: Optional[str] = Query(None, description="Watermark returned by the previous sync"),
+    limit: int = Query(200, ge=1, le=500, description="Maximum number of logs to return"),
+    current_user: AuthUser = Depends(get_current_user),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> ChatLogSyncResponse:
+    """
+    Get the current user's chat logs changed since a watermark.
+
+    Requires authentication.
+    Clients store the returned watermark and send it back as ``since``;
+    without it the whole history is returned, oldest change first, in
+    pages. While ``has_more`` is true the next page is available
+    immediately.
+
+    Query Parameters:
+    - since: Watermark of the previous sync (omit for a full sync)
+    - limit: Maximum number of logs to return (1-500, default: 200)
+
+    Returns:
+    - New or changed logs, the next watermark and whether more are waiting
+
+    Raises:
+    - 400: Malformed watermark
+    - 401: Unauthorized (no valid token)
+    - 500: Sync failed
+    """
+    since_time, since_id = _parse_watermark(since) if since else (None, None)
+
+    result = db.get_user_chat_log_changes(current_user.id, since_time, since_id, limit=limit)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to sync chat history"
+        )
+    logs, has_more = result
+
+    watermark = since
+    if logs:
+        watermark = f"{logs[-1]['updated_at']}|{logs[-1]['id']}"
+    return ChatLogSyncResponse(
+        logs=[ChatLogResponse(**log) for log in logs],
+        watermark=watermark,
+        has_more=has_more
+    )
+
+
 @router.put(
     "/{log_id}/feedback",
     response_model=ChatLogResponse,
@@ -149,14 +252,8 @@ def update_chat_feedback(
     - 404: Chat log not found
     - 500: Update failed
     """
-    # Get the existing chat log
-    existing_logs = db.get_user_chat_logs(current_user.id, limit=1000)
-    existing_log = None
-    
-    for log in existing_logs:
-        if str(log.get("id")) == str(log_id):
-            existing_log = log
-            break
+    # Get the existing chat log (from the user's cached history when it is there)
+    existing_log = db.get_user_chat_log(current_user.id, str(log_id))
     
     if not existing_log:
         raise HTTPException(
@@ -172,20 +269,26 @@ def update_chat_feedback(
         )
     
     # Update the feedback
-    try:
-        response = db.client.table("chat_logs").update({
-            "was_helpful": feedback.was_helpful
-        }).eq("id", str(log_id)).execute()
-        
-        if response.data and len(response.data) > 0:
-            return ChatLogResponse(**response.data[0])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update feedback"
-            )
-    except Exception as e:
+    updated_log = db.update_chat_feedback(str(log_id), feedback.was_helpful)
+    
+    if not updated_log:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to update feedback: {str(e)}"
+            detail="Failed to update feedback"
+        )
+    
+    return ChatLogResponse(**updated_log)
+
+
+def _parse_watermark(since: str) -> Tuple[str, str]:
+    """Split a sync watermark into its updated_at and log ID parts."""
+    since_time, _, since_id = since.rpartition("|")
+    try:
+        parse_timestamp(since_time)
+        UUID(since_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync watermark"
         )
+    return since_time, since_id
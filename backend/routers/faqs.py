@@ -1,20 +1,33 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from middleware.auth import get_current_user, AuthUser
+from middleware.timed_route import TimedRoute
 from models.database import (
     FAQCreate,
     FAQUpdate,
     FAQResponse,
-    FAQCategory
+    FAQSearchResult,
+    FAQSuggestion,
+    FAQDuplicate,
+    FAQDuplicateCheck,
+    FAQBatchGet,
+    FAQBatchGetResponse,
+    FAQSummary,
+    FAQCategory,
+    ListView,
+    FAQ_FIELDS,
+    FAQ_SUMMARY_FIELDS
 )
+from routers.list_views import resolve_columns, slim_response
 from services.supabase_service import get_supabase_service, SupabaseService
 
 router = APIRouter(
     prefix="/faqs",
     tags=["FAQs"],
+    route_class=TimedRoute,
     responses={
         404: {"description": "FAQ not found"},
         401: {"description": "Unauthorized"},
@@ -25,29 +38,49 @@ router = APIRouter(
 
 @router.get(
     "",
-    response_model=List[FAQResponse],
+    response_model=List[FAQSearchResult],
     status_code=status.HTTP_200_OK,
     summary="List all active FAQs",
-    description="Retrieve all active FAQs with optional filtering by category and search term."
+    description=(
+        "Retrieve all active FAQs with optional filtering by category and search term. "
+        "`view=summary` or `fields=` return only some columns (see FAQSummary). "
+        "With the postgres search backend, search results carry `rank` and `highlights`."
+    )
 )
 def list_faqs(
     category: Optional[str] = Query(None, description="Filter by category"),
-    search: Optional[str] = Query(None, description="Search in questions and answers"),
+    search: Optional[str] = Query(None, description="Search in questions, answers and tags (typo tolerant)"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of results"),
+    view: ListView = Query(ListView.FULL, description="full, or summary without answers"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,question"),
+    snippet: int = Query(0, ge=0, le=1000, description="Truncate answers to this many characters (summary view includes them only when set)"),
     db: SupabaseService = Depends(get_supabase_service)
-) -> List[FAQResponse]:
-    faqs = db.get_all_faqs(category=category, limit=limit)
-    
-    if search and faqs:
-        search_lower = search.lower()
-        faqs = [
-            faq for faq in faqs
-            if search_lower in faq.get("question", "").lower() or
-               search_lower in faq.get("answer", "").lower() or
-               search_lower in " ".join(faq.get("tags", [])).lower()
-        ]
+) -> Union[List[FAQSearchResult], Response]:
+    columns = resolve_columns(view, fields, FAQ_FIELDS, FAQ_SUMMARY_FIELDS, "answer", snippet)
+
+    if search:
+        faqs = db.search_faqs(search, category=category, limit=limit, columns=columns)
+    else:
+        faqs = db.get_all_faqs(category=category, limit=limit, columns=columns)
     
-    return [FAQResponse(**faq) for faq in faqs]
+    if columns is not None:
+        return slim_response(FAQSummary, faqs, "answer", snippet)
+    return [FAQSearchResult(**faq) for faq in faqs]
+
+
+@router.get(
+    "/suggest",
+    response_model=List[FAQSuggestion],
+    status_code=status.HTTP_200_OK,
+    summary="Suggest FAQs while typing",
+    description="Return the most viewed FAQs whose question or tags complete the typed text."
+)
+def suggest_faqs(
+    q: str = Query(..., min_length=1, max_length=200, description="Text typed so far"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions"),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> List[FAQSuggestion]:
+    return [FAQSuggestion(**faq) for faq in db.suggest_faqs(q, limit=limit)]
 
 
 @router.get(
@@ -79,10 +112,11 @@ def get_faq(
     response_model=FAQResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Create new FAQ",
-    description="Create a new FAQ entry. Requires authentication."
+    description="Create a new FAQ entry. Requires authentication. Likely near-duplicates are listed in the X-Possible-Duplicates header."
 )
 def create_faq(
     faq_data: FAQCreate,
+    response: Response,
     current_user: AuthUser = Depends(get_current_user),
     db: SupabaseService = Depends(get_supabase_service)
 ) -> FAQResponse:
@@ -95,23 +129,73 @@ def create_faq(
             detail="Failed to create FAQ. Please try again."
         )
     
+    _flag_duplicates(response, created_faq, db)
     return FAQResponse(**created_faq)
 
 
+@router.post(
+    "/duplicates",
+    response_model=List[FAQDuplicate],
+    status_code=status.HTTP_200_OK,
+    summary="Find near-duplicate FAQs",
+    description="Check a draft question and answer against existing FAQs before saving. Requires authentication."
+)
+def find_duplicate_faqs(
+    draft: FAQDuplicateCheck,
+    current_user: AuthUser = Depends(get_current_user),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> List[FAQDuplicate]:
+    exclude_id = str(draft.exclude_id) if draft.exclude_id else None
+    duplicates = db.find_duplicate_faqs(draft.question, draft.answer, exclude_id=exclude_id)
+    return [FAQDuplicate(**faq) for faq in duplicates]
+
+
+@router.post(
+    "/batch-get",
+    response_model=FAQBatchGetResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get several FAQs by ID",
+    description="Resolve up to 500 FAQ IDs in one request. Results keep the request order; unknown IDs are listed as missing."
+)
+def batch_get_faqs(
+    request: FAQBatchGet,
+    db: SupabaseService = Depends(get_supabase_service)
+) -> FAQBatchGetResponse:
+    # Duplicates are resolved once, at their first position
+    faq_ids = list(dict.fromkeys(str(faq_id) for faq_id in request.ids))
+    found = db.get_faqs_by_ids(faq_ids)
+
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="FAQs are temporarily unavailable. Please try again."
+        )
+
+    faqs = [found[faq_id] for faq_id in faq_ids if faq_id in found]
+    if request.increment_views:
+        db.increment_views_of(faqs)
+
+    return FAQBatchGetResponse(
+        faqs=[FAQResponse(**faq) for faq in faqs],
+        missing=[faq_id for faq_id in faq_ids if faq_id not in found]
+    )
+
+
 @router.put(
     "/{faq_id}",
     response_model=FAQResponse,
     status_code=status.HTTP_200_OK,
     summary="Update FAQ",
-    description="Update an existing FAQ. Only the creator can update."
+    description="Update an existing FAQ. Only the creator can update. Likely near-duplicates are listed in the X-Possible-Duplicates header."
 )
 def update_faq(
     faq_id: UUID,
     faq_data: FAQUpdate,
+    response: Response,
     current_user: AuthUser = Depends(get_current_user),
     db: SupabaseService = Depends(get_supabase_service)
 ) -> FAQResponse:
-    existing_faq = db.get_faq_by_id(str(faq_id))
+    existing_faq = db.get_faq_by_id(str(faq_id), fresh=True)
     if not existing_faq:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -140,6 +224,8 @@ def update_faq(
             detail="Failed to update FAQ. Please try again."
         )
     
+    if "question" in faq_dict or "answer" in faq_dict:
+        _flag_duplicates(response, updated_faq, db)
     return FAQResponse(**updated_faq)
 
 
@@ -154,7 +240,7 @@ def delete_faq(
     current_user: AuthUser = Depends(get_current_user),
     db: SupabaseService = Depends(get_supabase_service)
 ) -> dict:
-    existing_faq = db.get_faq_by_id(str(faq_id))
+    existing_faq = db.get_faq_by_id(str(faq_id), fresh=True)
     if not existing_faq:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,13 +269,33 @@ def delete_faq(
     response_model=List[FAQResponse],
     status_code=status.HTTP_200_OK,
     summary="Get FAQs by category",
-    description="Retrieve all active FAQs in a specific category."
+    description=(
+        "Retrieve all active FAQs in a specific category. "
+        "`view=summary` or `fields=` return only some columns (see FAQSummary)."
+    )
 )
 def get_faqs_by_category(
     category: FAQCategory,
     limit: int = Query(100, ge=1, le=500, description="Maximum number of results"),
+    view: ListView = Query(ListView.FULL, description="full, or summary without answers"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,question"),
+    snippet: int = Query(0, ge=0, le=1000, description="Truncate answers to this many characters (summary view includes them only when set)"),
     db: SupabaseService = Depends(get_supabase_service)
-) -> List[FAQResponse]:
-    faqs = db.get_all_faqs(category=category.value, limit=limit)
+) -> Union[List[FAQResponse], Response]:
+    columns = resolve_columns(view, fields, FAQ_FIELDS, FAQ_SUMMARY_FIELDS, "answer", snippet)
+    faqs = db.get_all_faqs(category=category.value, limit=limit, columns=columns)
     
+    if columns is not None:
+        return slim_response(FAQSummary, faqs, "answer", snippet)
     return [FAQResponse(**faq) for faq in faqs]
+
+
+def _flag_duplicates(response: Response, faq: dict, db: SupabaseService) -> None:
+    """List likely near-duplicates of a saved FAQ in the X-Possible-Duplicates header."""
+    duplicates = db.find_duplicate_faqs(
+        faq.get("question", ""),
+        faq.get("answer", ""),
+        exclude_id=str(faq.get("id"))
+    )
+    if duplicates:
+        response.headers["X-Possible-Duplicates"] = ",".join(str(dup["id"]) for dup in duplicates)
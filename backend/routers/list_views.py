@@ -0,0 +1,103 @@
+"""
+Sparse field selection and summary mode for the list routes.
+
+``fields=id,question`` returns only the named columns and
+``view=summary`` a preset of the columns list UIs render. Either way
+the column list is pushed down to the PostgREST select, so long
+answers and descriptions are never fetched, and the rows are
+validated against slim models and serialized straight to JSON instead
+of going through the full response model.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, TypeAdapter
+
+from models.database import ListView
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+
+def resolve_columns(
+    view: ListView,
+    fields: Optional[str],
+    allowed: Sequence[str],
+    summary: Sequence[str],
+    snippet_field: str,
+    snippet: int
+) -> Optional[List[str]]:
+    """
+    Columns a list request asks for.
+
+    Args:
+        view: Requested list view
+        fields: Comma-separated columns from the ``fields`` parameter
+        allowed: Columns that may be selected
+        summary: Columns of the summary view
+        snippet_field: Long text column that snippets are cut from
+        snippet: Snippet length; the summary view includes snippet_field only when positive
+
+    Returns:
+        Column names (always starting with ``id``), or None for the full view
+
+    Raises:
+        HTTPException: 400 when fields names unknown columns
+    """
+    if fields is not None:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+            )
+        return list(dict.fromkeys(["id", *requested]))
+
+    if view == ListView.SUMMARY:
+        return list(summary) + ([snippet_field] if snippet > 0 else [])
+
+    return None
+
+
+def truncate(text: Optional[str], length: int) -> Optional[str]:
+    """Cut text to at most length characters, at a word boundary where possible."""
+    if text is None or length <= 0 or len(text) <= length:
+        return text
+    cut = text[:length]
+    space = cut.rfind(" ")
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def slim_response(
+    model: Type[BaseModel],
+    rows: List[Dict[str, Any]],
+    snippet_field: str,
+    snippet: int
+) -> Response:
+    """
+    Serialize projected rows with a slim model.
+
+    Args:
+        model: Slim response model; columns missing from the rows are left out
+        rows: Rows holding only the selected columns
+        snippet_field: Long text column to truncate
+        snippet: Snippet length (0 keeps the full text)
+
+    Returns:
+        JSON response
+    """
+    if snippet > 0:
+        # Copied: rows may be shared with the last known good read cache
+        rows = [
+            {**row, snippet_field: truncate(row[snippet_field], snippet)} if snippet_field in row else row
+            for row in rows
+        ]
+
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(List[model])
+    items = [model.model_validate(row) for row in rows]
+    return Response(content=adapter.dump_json(items, exclude_unset=True), media_type="application/json")
@@ -0,0 +1,110 @@
+"""
+Benchmark compact FAQ records against PostgREST row dicts.
+
+Decodes N synthetic FAQs from JSON (as they arrive from PostgREST) and
+reports the memory held by the list of dicts and by the equivalent
+CompactFAQ records, the time to filter each by category and by tag, and
+the cost of producing FAQResponse models from each.
+
+Usage:
+    python scripts/bench_compact_store.py --faqs 10000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import FAQResponse  # noqa: E402
+from scripts.bench_fuzzy_search import _synthetic_faqs  # noqa: E402
+from services.compact_store import FAQ_CATEGORIES, CompactFAQ  # noqa: E402
+
+_CATEGORIES = ["academics", "admissions", "hostel", "library", "general", "placement"]
+
+
+def _rows_json(count: int, seed: int) -> str:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = _synthetic_faqs(count, seed)
+    for row in rows:
+        created = start + timedelta(seconds=rng.randint(0, 60 * 86400), microseconds=rng.randint(0, 999999))
+        row.update(
+            category=rng.choice(_CATEGORIES),
+            created_by=f"user-{rng.randint(1, 20)}",
+            created_at=created.isoformat(),
+            updated_at=(created + timedelta(days=rng.randint(0, 30))).isoformat(),
+        )
+    return json.dumps(rows)
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return value, held
+
+
+def _timed(function, repeat: int) -> float:
+    """Median milliseconds per call."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", type=int, default=10000, help="Number of synthetic FAQs")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per timing")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payload = _rows_json(args.faqs, args.seed)
+    rows, dict_bytes = _measure(lambda: json.loads(payload))
+    # Records are built from rows already decoded, so only the records are counted
+    records, compact_bytes = _measure(lambda: [CompactFAQ(row) for row in rows])
+    text_bytes = sum(len(row["question"]) + len(row["answer"]) for row in rows)
+
+    print(f"{args.faqs} FAQs, {text_bytes / 1e6:.2f} MB of question and answer text")
+    print(f"row dicts:      {dict_bytes / 1e6:7.2f} MB ({dict_bytes / args.faqs:.0f} B/FAQ)")
+    print(f"compact FAQs:   {compact_bytes / 1e6:7.2f} MB ({compact_bytes / args.faqs:.0f} B/FAQ)")
+    print(f"per 10k FAQs:   {dict_bytes / args.faqs * 1e4 / 1e6:.2f} MB -> {compact_bytes / args.faqs * 1e4 / 1e6:.2f} MB")
+
+    category, tag = "hostel", rows[0]["tags"][0]
+    code = FAQ_CATEGORIES.find(category)
+    checks = [
+        ("filter by category", lambda: [row for row in rows if row["category"] == category],
+         lambda: [record for record in records if record.category == code]),
+        ("filter by tag", lambda: [row for row in rows if tag in row["tags"]],
+         lambda: [record for record in records if tag in record.tags]),
+    ]
+    for name, by_dict, by_record in checks:
+        assert len(by_dict()) == len(by_record())
+        print(f"{name:<19} dicts {_timed(by_dict, args.repeat):6.2f} ms, "
+              f"compact {_timed(by_record, args.repeat):6.2f} ms ({len(by_dict())} matches)")
+
+    sample_rows, sample_records = rows[:1000], records[:1000]
+    from_dicts = _timed(lambda: [FAQResponse(**row) for row in sample_rows], args.repeat)
+    from_records = _timed(lambda: [record.to_response() for record in sample_records], args.repeat)
+    print(f"1000 FAQResponse   dicts {from_dicts:6.2f} ms, compact {from_records:6.2f} ms")
+    to_rows = _timed(lambda: [record.to_row() for record in sample_records], args.repeat)
+    print(f"1000 to_row()      {to_rows:6.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark bytes on the wire and server CPU for large FAQ list responses.
+
+Drives the ASGI app in-process with a synthetic FAQ corpus (no Supabase
+needed) and reports, per content coding, the response size and the CPU
+time spent per request with the compressed-response cache cold (every
+request compresses) and warm (every request is a cache hit).
+
+Usage:
+    python scripts/bench_compression.py --faqs 500 --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+
+import main  # noqa: E402
+from middleware import compression  # noqa: E402
+from services.supabase_service import get_supabase_service  # noqa: E402
+
+
+class _ListOnlyService:
+    """Stand-in service answering list reads from a fixed corpus."""
+
+    def __init__(self, count: int, answer_words: int):
+        now = datetime.utcnow().isoformat()
+        self.faqs = [
+            {
+                "id": str(uuid.uuid4()),
+                "question": f"How do I find information about campus topic number {i}?",
+                "answer": " ".join(f"word{(i * 7 + j) % 997}" for j in range(answer_words)),
+                "category": "general",
+                "tags": ["campus", f"topic{i % 50}"],
+                "is_active": True,
+                "created_by": "benchmark",
+                "created_at": now,
+                "updated_at": now,
+                "view_count": i,
+            }
+            for i in range(count)
+        ]
+
+    def get_all_faqs(self, category=None, limit=100, **kwargs):
+        return self.faqs[:limit]
+
+
+async def _request(app, path: str, query: str, accept_encoding: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench"), (b"accept-encoding", accept_encoding.encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+        "root_path": "",
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+
+def _find_cache(app):
+    layer = app.middleware_stack
+    while layer is not None:
+        if isinstance(layer, compression.CompressionMiddleware):
+            return layer.cache
+        layer = getattr(layer, "app", None)
+    raise RuntimeError("CompressionMiddleware not installed")
+
+
+async def _run(args) -> None:
+    service = _ListOnlyService(args.faqs, args.answer_words)
+    main.app.dependency_overrides[get_supabase_service] = lambda: service
+    app = main.app
+    query = f"limit={args.faqs}"
+    await _request(app, "/api/v1/faqs", query, "identity")  # build middleware stack
+    cache = _find_cache(app)
+
+    codings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    print(f"{args.faqs} FAQs, {args.requests} requests per row")
+    print(f"{'coding':<10}{'cache':<7}{'bytes':>12}{'cpu ms/req':>14}{'wall ms/req':>14}")
+    for coding in codings:
+        for mode in ("cold", "warm"):
+            if mode == "warm" and coding == "identity":
+                continue
+            size = 0
+            await _request(app, "/api/v1/faqs", query, coding)
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for _ in range(args.requests):
+                if mode == "cold":
+                    cache.bump("faqs")
+                size = await _request(app, "/api/v1/faqs", query, coding)
+            cpu = (time.process_time() - cpu_start) / args.requests * 1000
+            wall = (time.perf_counter() - wall_start) / args.requests * 1000
+            print(f"{coding:<10}{mode if coding != 'identity' else '-':<7}{size:>12}{cpu:>14.3f}{wall:>14.3f}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", type=int, default=500, help="Number of FAQs in the list response")
+    parser.add_argument("--answer-words", type=int, default=120, help="Words per FAQ answer")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per measurement")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,139 @@
+"""
+Benchmark the typo-tolerant FAQ index on a synthetic corpus.
+
+Builds a FuzzyIndex over N generated FAQs and reports build time,
+memory held by the index (tracemalloc and the index's own estimate),
+incremental update cost and query latency for misspelled queries.
+
+Usage:
+    python scripts/bench_fuzzy_search.py --faqs 20000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fuzzy_index import FuzzyIndex  # noqa: E402
+
+_SUBJECTS = [
+    "hostel", "library", "scholarship", "admission", "examination", "canteen", "transport",
+    "placement", "laboratory", "attendance", "semester", "registration", "hackathon",
+    "counselling", "internship", "sports", "parking", "wifi", "fees", "timetable",
+]
+_VERBS = ["apply", "pay", "find", "register", "book", "contact", "check", "renew", "cancel", "submit"]
+_NOUNS = ["deadline", "timings", "form", "office", "portal", "refund", "certificate", "schedule", "room", "card"]
+_CATEGORIES = ["admissions", "academics", "hostel", "library", "exams", "general"]
+
+
+def _vocabulary(size: int, rng: random.Random):
+    syllables = ["ca", "mpu", "reg", "is", "tra", "tion", "lib", "ra", "ry", "hos", "tel", "sem", "es", "ter",
+                 "ad", "mis", "sion", "lab", "or", "at", "ex", "am", "fee", "port", "al", "dep", "art", "ment"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _synthetic_faqs(count: int, seed: int):
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(5000, rng)
+    # Zipf-like word frequencies, as in real answer text
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    faqs = []
+    for i in range(count):
+        subject, verb, noun = rng.choice(_SUBJECTS), rng.choice(_VERBS), rng.choice(_NOUNS)
+        topic = rng.choice(vocabulary)
+        faqs.append({
+            "id": str(uuid.uuid4()),
+            "question": f"How do I {verb} the {subject} {noun} for {topic}?",
+            "answer": " ".join(rng.choices(vocabulary, weights=weights, k=40)),
+            "category": rng.choice(_CATEGORIES),
+            "tags": [subject, noun],
+            "is_active": True,
+            "view_count": rng.randint(0, 1000),
+        })
+    return faqs
+
+
+def _misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(("drop", "swap", "replace"))
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", type=int, default=20000, help="Number of synthetic FAQs")
+    parser.add_argument("--queries", type=int, default=2000, help="Number of misspelled queries")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    faqs = _synthetic_faqs(args.faqs, args.seed)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    index = FuzzyIndex()
+    index.rebuild(faqs)
+    build_seconds = time.perf_counter() - started
+    traced = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    stats = index.stats()
+    print(f"{args.faqs} FAQs indexed in {build_seconds * 1000:.0f} ms")
+    print(
+        f"vocabulary {stats['vocabulary']}, postings {stats['postings']}, "
+        f"delete keys {stats['deletes']}"
+    )
+    print(f"memory: tracemalloc {traced / 1e6:.1f} MB, index estimate {stats['approx_bytes'] / 1e6:.1f} MB")
+
+    update_latencies = []
+    for faq in rng.sample(faqs, min(500, len(faqs))):
+        edited = dict(faq, question=faq["question"] + " updated")
+        started = time.perf_counter()
+        index.upsert(edited)
+        update_latencies.append((time.perf_counter() - started) * 1000)
+    print(f"incremental upsert: p50 {statistics.median(update_latencies):.3f} ms")
+
+    queries = []
+    for _ in range(args.queries):
+        faq = rng.choice(faqs)
+        words = [w for w in faq["question"].rstrip("?").split()[3:] if w.isalpha()]
+        queries.append(" ".join(_misspell(w, rng) for w in words))
+
+    latencies = []
+    hits = 0
+    for query in queries:
+        started = time.perf_counter()
+        results = index.search(query, limit=args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += bool(results)
+    latencies.sort()
+    print(
+        f"{len(queries)} typo queries: p50 {statistics.median(latencies):.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms, "
+        f"{hits / len(queries):.1%} returned results"
+    )
+    questions = {faq["id"]: faq["question"] for faq in faqs}
+    print(f"example: {queries[0]!r} -> {questions[index.search(queries[0], limit=1)[0][0]]!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
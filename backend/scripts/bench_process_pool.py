@@ -0,0 +1,122 @@
+"""
+Benchmark inline against process pool execution of FAQ index builds and batch scoring.
+
+For a synthetic FAQ set, measures the fuzzy index build done inline and
+in the process pool (returned as a snapshot and restored from it), and
+the scoring of a batch of misspelled questions inline and split across
+the pool. While each runs, a thread standing in for request handling
+ticks every millisecond; the longest gap between its ticks shows how
+long the work kept the GIL from everything else in the worker.
+
+Usage:
+    python scripts/bench_process_pool.py --faqs 20000 --questions 5000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_fuzzy_search import _misspell, _synthetic_faqs  # noqa: E402
+from services.fuzzy_index import FuzzyIndex  # noqa: E402
+from services.process_pool import CPUPool, build_index_snapshot  # noqa: E402
+
+
+class _Ticker:
+    """Measures the longest stall of a thread that wants to run every millisecond."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self.longest = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(0.001):
+            now = time.perf_counter()
+            self.longest = max(self.longest, now - last)
+            last = now
+
+
+def _timed(function):
+    with _Ticker() as ticker:
+        started = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - started
+    return value, elapsed, ticker.longest
+
+
+def _report(name: str, elapsed: float, stall: float) -> None:
+    print(f"{name:<34} {elapsed * 1000:9.0f} ms   longest request-thread stall {stall * 1000:7.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", type=int, default=20000, help="Number of synthetic FAQs")
+    parser.add_argument("--questions", type=int, default=5000, help="Questions in the scoring batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Pool processes")
+    parser.add_argument("--limit", type=int, default=5, help="Matches per question")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    faqs = _synthetic_faqs(args.faqs, args.seed)
+    questions = []
+    for _ in range(args.questions):
+        words = [w for w in rng.choice(faqs)["question"].rstrip("?").split()[3:] if w.isalpha()]
+        questions.append(" ".join(_misspell(w, rng) for w in words))
+    directory = tempfile.mkdtemp(prefix="faq-pool-")
+    print(f"{args.faqs} FAQs, {args.questions} questions, {args.workers} pool processes, {os.cpu_count()} CPUs")
+
+    inline = FuzzyIndex()
+    _, elapsed, stall = _timed(lambda: inline.rebuild(faqs))
+    _report("index build, inline", elapsed, stall)
+
+    pool = CPUPool(workers=args.workers, directory=directory)
+    pool.start()
+    try:
+        # Spawning the processes and importing the app is paid once per pool
+        _, elapsed, stall = _timed(lambda: pool.run(build_index_snapshot, directory, faqs[:10]))
+        _report("pool warm-up (first task)", elapsed, stall)
+
+        offloaded = FuzzyIndex()
+        snapshot, elapsed, stall = _timed(lambda: pool.build_index_snapshot(faqs))
+        _, restore_elapsed, _ = _timed(lambda: offloaded.restore(snapshot))
+        _report("index build, pool + snapshot", elapsed, stall)
+        print(f"{'  restore from snapshot':<34} {restore_elapsed * 1000:9.2f} ms")
+
+        expected, elapsed, stall = _timed(
+            lambda: [inline.search(question, limit=args.limit) for question in questions]
+        )
+        _report("batch scoring, inline", elapsed, stall)
+        # The first batch also maps and restores the snapshot in every process
+        for attempt in ("first", "repeat"):
+            scored, elapsed, stall = _timed(lambda: pool.score(snapshot.path, questions, args.limit))
+            _report(f"batch scoring, pool ({attempt})", elapsed, stall)
+    finally:
+        pool.close()
+
+    # Equal scores may tie-break differently between the two indexes
+    mismatches = sum(
+        [round(score, 6) for _, score in a] != [round(score, 6) for _, score in b]
+        for a, b in zip(expected, scored)
+    )
+    print(f"{mismatches} of {len(questions)} questions scored differently")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark per-keystroke FAQ suggestion latency.
+
+Builds a SuggestIndex over N synthetic FAQs (the corpus from
+bench_fuzzy_search.py) and replays typing sampled questions one
+character at a time, reporting index build time and per-keystroke
+latency, both with a cold prefix cache and with view count updates
+interleaved.
+
+Usage:
+    python scripts/bench_suggest.py --faqs 20000 --sessions 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_fuzzy_search import _synthetic_faqs  # noqa: E402
+from services.suggest_index import SuggestIndex  # noqa: E402
+
+
+def _report(label: str, latencies) -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{label}: {len(latencies)} keystrokes, "
+        f"p50 {statistics.median(latencies) * 1000:.1f} us, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} us, "
+        f"max {latencies[-1] * 1000:.1f} us"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", type=int, default=20000, help="Number of synthetic FAQs")
+    parser.add_argument("--sessions", type=int, default=500, help="Number of typed questions")
+    parser.add_argument("--limit", type=int, default=8, help="Suggestions per keystroke")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    faqs = _synthetic_faqs(args.faqs, args.seed)
+
+    started = time.perf_counter()
+    index = SuggestIndex()
+    index.rebuild(faqs)
+    print(f"{args.faqs} FAQs indexed in {(time.perf_counter() - started) * 1000:.0f} ms, {index.stats()}")
+
+    sessions = [rng.choice(faqs)["question"].rstrip("?")[9:] for _ in range(args.sessions)]
+    for label, views_per_keystroke in (("typing", 0), ("typing with view updates", 1)):
+        latencies = []
+        for text in sessions:
+            for end in range(1, len(text) + 1):
+                for _ in range(views_per_keystroke):
+                    faq = rng.choice(faqs)
+                    faq["view_count"] += 1
+                    index.upsert(faq)
+                started = time.perf_counter()
+                index.suggest(text[:end], limit=args.limit)
+                latencies.append((time.perf_counter() - started) * 1000)
+        _report(label, latencies)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
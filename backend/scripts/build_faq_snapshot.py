@@ -0,0 +1,128 @@
+"""
+Build and publish an FAQ search index snapshot.
+
+Meant to run as a background job (cron, a Kubernetes CronJob, or the
+app's scheduler) on every host, writing to the FAQ_SNAPSHOT_DIR that
+the workers map their index from. Workers pick the newest snapshot up
+on their next start; changes made after it are caught up from the
+``faqs`` table by updated_at.
+
+With --synthetic the snapshot is built from generated FAQs instead of
+Supabase, and the time to restore it is compared with a full rebuild,
+checking that both answer the same queries identically.
+
+Usage:
+    python scripts/build_faq_snapshot.py --output-dir /var/lib/clarifyai/faq-index
+    python scripts/build_faq_snapshot.py --output-dir /tmp/faq-index --synthetic 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_fuzzy_search import _misspell, _synthetic_faqs  # noqa: E402
+from services.fuzzy_index import FuzzyIndex  # noqa: E402
+from services.index_snapshot import FAQ_SNAPSHOT_DIR, FAQ_SNAPSHOT_KEEP, Snapshot, write_snapshot  # noqa: E402
+
+
+def _benchmark(directory: str, count: int, queries: int, keep: int, seed: int) -> int:
+    rng = random.Random(seed)
+    faqs = _synthetic_faqs(count, seed)
+
+    started = time.perf_counter()
+    built = FuzzyIndex()
+    built.rebuild(faqs)
+    rebuild_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    path = write_snapshot(
+        directory,
+        faqs,
+        datetime.utcnow().isoformat(),
+        built.snapshot_sections(),
+        meta={"fuzzy": built.snapshot_meta(), "faqs": len(faqs)},
+        keep=keep
+    )
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    snapshot = Snapshot(path)
+    restored = FuzzyIndex()
+    if not restored.restore(snapshot):
+        print("snapshot settings do not match this index", file=sys.stderr)
+        return 1
+    restore_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    snapshot.rows()
+    rows_seconds = time.perf_counter() - started
+
+    print(f"{count} FAQs, snapshot {os.path.getsize(path) / 1e6:.1f} MB: {path}")
+    print(f"full rebuild {rebuild_seconds * 1000:.0f} ms, snapshot write {write_seconds * 1000:.0f} ms")
+    print(f"restore (map + attach) {restore_seconds * 1000:.2f} ms, decode rows {rows_seconds * 1000:.0f} ms")
+    stats = restored.stats()
+    print(f"restored: {stats['snapshot_documents']} documents, vocabulary {stats['snapshot_vocabulary']}, "
+          f"postings {stats['snapshot_postings']}, private index memory {stats['approx_bytes'] / 1e6:.2f} MB")
+
+    texts = []
+    for _ in range(queries):
+        faq = rng.choice(faqs)
+        words = [w for w in faq["question"].rstrip("?").split()[3:] if w.isalpha()]
+        texts.append(" ".join(_misspell(w, rng) for w in words))
+
+    # Documents are numbered differently, so equal scores may tie-break differently
+    mismatches = sum(
+        [score for _, score in built.search(text)] != [score for _, score in restored.search(text)]
+        for text in texts
+    )
+    print(f"{mismatches} of {len(texts)} queries scored differently")
+
+    # Catch-up: a share of the FAQs changed after the snapshot
+    for faq in rng.sample(faqs, min(200, len(faqs))):
+        edited = dict(faq, question=faq["question"] + " revised")
+        built.upsert(edited)
+        restored.upsert(edited)
+
+    timings = {"rebuilt": [], "snapshot": []}
+    for text in texts:
+        for name, index in (("rebuilt", built), ("snapshot", restored)):
+            started = time.perf_counter()
+            index.search(text, limit=10)
+            timings[name].append((time.perf_counter() - started) * 1000)
+    for name, latencies in timings.items():
+        latencies.sort()
+        print(f"{name:>8} index: p50 {statistics.median(latencies):.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms (after catch-up)")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output-dir", default=FAQ_SNAPSHOT_DIR, help="Snapshot directory (default: FAQ_SNAPSHOT_DIR)")
+    parser.add_argument("--keep", type=int, default=FAQ_SNAPSHOT_KEEP, help="Snapshots to keep")
+    parser.add_argument("--synthetic", type=int, help="Benchmark with this many generated FAQs instead")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries compared in the benchmark")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        directory = args.output_dir or tempfile.mkdtemp(prefix="faq-index-")
+        return _benchmark(directory, args.synthetic, args.queries, args.keep, args.seed)
+
+    if not args.output_dir:
+        parser.error("--output-dir or FAQ_SNAPSHOT_DIR is required")
+    from services.supabase_service import get_supabase_service
+    started = time.perf_counter()
+    path = get_supabase_service().build_faq_snapshot(args.output_dir, keep=args.keep)
+    print(f"Published {path} in {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Exercise the cache invalidation bus across several local processes.
+
+Starts N subscriber processes that each open the bus and record how
+long after publication every event reaches them, then publishes events
+from the parent process. No broker or database is required.
+
+Usage:
+    python scripts/check_invalidation_bus.py --workers 4 --events 200
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.invalidation import InvalidationBus  # noqa: E402
+
+
+def _subscriber(path: str, expected: int, ready, results) -> None:
+    bus = InvalidationBus(path=path, poll_interval=0.001)
+    latencies = []
+
+    def on_event(key, op, payload):
+        # Keys carry the publish time in nanoseconds
+        latencies.append((time.time_ns() - int(key)) / 1e6)
+
+    bus.subscribe("faqs", on_event)
+    bus.start()
+    ready.set()
+    deadline = time.monotonic() + 30
+    while len(latencies) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    bus.close()
+    results.put((os.getpid(), latencies))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Number of subscriber processes")
+    parser.add_argument("--events", type=int, default=200, help="Number of events to publish")
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Delay between events")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "cache-bus")
+    results = multiprocessing.Queue()
+    readies = []
+    processes = []
+    for _ in range(args.workers):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_subscriber, args=(path, args.events, ready, results))
+        process.start()
+        readies.append(ready)
+        processes.append(process)
+    for ready in readies:
+        ready.wait(10)
+
+    publisher = InvalidationBus(path=path)
+    for _ in range(args.events):
+        publisher.publish("faqs", str(time.time_ns()), "update")
+        time.sleep(args.interval_ms / 1000.0)
+
+    failed = False
+    for _ in processes:
+        pid, latencies = results.get(timeout=60)
+        if len(latencies) != args.events:
+            failed = True
+            print(f"worker {pid}: received {len(latencies)}/{args.events} events")
+            continue
+        latencies.sort()
+        print(
+            f"worker {pid}: {len(latencies)} events, "
+            f"p50 {statistics.median(latencies):.2f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms, "
+            f"max {latencies[-1]:.2f} ms"
+        )
+    for process in processes:
+        process.join()
+    print(f"namespace version: {publisher.version('faqs')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
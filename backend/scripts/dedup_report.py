@@ -0,0 +1,123 @@
+"""
+Report clusters of near-duplicate FAQs across the whole table.
+
+Signatures every FAQ once and groups FAQs that share LSH buckets, so
+the cost grows with the number of FAQs and true duplicates rather than
+with the number of pairs. FAQs are read from a JSON export (a list of
+FAQ rows), generated synthetically, or loaded from Supabase.
+
+Usage:
+    python scripts/dedup_report.py --input faqs.json --output duplicates.json
+    python scripts/dedup_report.py --synthetic 100000
+    python scripts/dedup_report.py              # all active FAQs in Supabase
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.dedup import DEDUP_THRESHOLD, DuplicateIndex  # noqa: E402
+
+
+def _vocabulary(size: int, rng: random.Random):
+    consonants, vowels = "bcdfghjklmnprstvwyz", "aeiou"
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 5)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+
+def _synthetic_faqs(count: int, duplicate_ratio: float, seed: int):
+    """Distinct FAQs plus lightly reworded copies of some of them."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(20000, rng)
+    # Zipf-like with a flattened head, close to content words once stopwords are removed
+    cum_weights = list(accumulate(1.0 / (rank + 20) for rank in range(len(vocabulary))))
+    faqs = []
+    originals = int(count * (1 - duplicate_ratio))
+    for _ in range(originals):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=48)
+        faqs.append({
+            "id": str(uuid.uuid4()),
+            "question": "What are the " + " ".join(words[:6]) + "?",
+            "answer": " ".join(words[6:]),
+        })
+    while len(faqs) < count:
+        source = rng.choice(faqs[:originals])
+        answer = source["answer"].split()
+        for _ in range(2):
+            answer[rng.randrange(len(answer))] = rng.choice(vocabulary)
+        faqs.append({
+            "id": str(uuid.uuid4()),
+            "question": source["question"].replace("What are the", "What is the"),
+            "answer": " ".join(answer),
+        })
+    return faqs
+
+
+def _load(args):
+    if args.input:
+        with open(args.input) as handle:
+            return json.load(handle)
+    if args.synthetic:
+        return _synthetic_faqs(args.synthetic, args.duplicate_ratio, args.seed)
+    from services.supabase_service import get_supabase_service
+    return get_supabase_service()._load_all_faqs()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="JSON file containing a list of FAQ rows")
+    parser.add_argument("--synthetic", type=int, help="Generate this many synthetic FAQs instead")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="Share of synthetic FAQs that are rewordings")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD, help="Minimum estimated similarity")
+    parser.add_argument("--output", help="Write clusters as JSON to this file")
+    parser.add_argument("--show", type=int, default=10, help="Number of clusters to print")
+    args = parser.parse_args()
+
+    faqs = _load(args)
+    by_id = {str(faq["id"]): faq for faq in faqs}
+    print(f"{len(faqs)} FAQs loaded")
+
+    started = time.perf_counter()
+    index = DuplicateIndex(threshold=args.threshold)
+    index.rebuild(faqs)
+    indexed = time.perf_counter()
+    clusters = index.clusters()
+    finished = time.perf_counter()
+    duplicates = sum(len(cluster) - 1 for cluster in clusters)
+    print(
+        f"signatures and buckets built in {indexed - started:.1f} s, "
+        f"clusters found in {finished - indexed:.1f} s"
+    )
+    print(f"{len(clusters)} duplicate clusters, {duplicates} FAQs could be merged away")
+
+    for cluster in clusters[:args.show]:
+        print(f"\n[{len(cluster)} FAQs]")
+        for faq_id in cluster[:5]:
+            print(f"  {faq_id}  {by_id[faq_id].get('question', '')[:90]}")
+        if len(cluster) > 5:
+            print(f"  ... {len(cluster) - 5} more")
+
+    if args.output:
+        report = [
+            [{"id": faq_id, "question": by_id[faq_id].get("question")} for faq_id in cluster]
+            for cluster in clusters
+        ]
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nclusters written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+Evaluate FAQ matching quality and latency offline by replaying chat logs.
+
+Loads a local snapshot of FAQs and labelled chat logs, builds the FAQ
+search indexes from it exactly as the API does (through FAQCatalog
+listeners) and replays every logged question through each matcher. A
+logged match counts as relevant unless the user marked it unhelpful.
+
+Reports, per matcher:
+    hit@k / precision@k  share of questions whose FAQ is in the top k,
+                         and that share divided by k
+    MRR                  mean reciprocal rank of the labelled FAQ
+    latency              p50/p95/p99 per query and throughput at each
+                         requested concurrency level
+
+Results can be written as JSON tagged with the git commit and a
+fingerprint of the snapshot, and compared against an earlier run.
+
+Usage:
+    # one-off, needs Supabase credentials
+    python scripts/evaluate_matcher.py export --faqs faqs.json --chat-logs chat_logs.json
+
+    # offline
+    python scripts/evaluate_matcher.py run --faqs faqs.json --chat-logs chat_logs.json \\
+        --matchers fuzzy,substring --k 1,3,5 --concurrency 1,4 --output results.json
+    python scripts/evaluate_matcher.py run ... --compare results.json
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.faq_catalog import FAQCatalog  # noqa: E402
+from services.fuzzy_index import FuzzyIndex  # noqa: E402
+from services.suggest_index import SuggestIndex  # noqa: E402
+
+Matcher = Callable[[str, int], List[str]]
+
+
+# ============================================================================
+# Snapshot loading
+# ============================================================================
+
+def _parse_value(value: Any) -> Any:
+    """Convert CSV cells from a Supabase export to Python values."""
+    if not isinstance(value, str):
+        return value
+    if value == "":
+        return None
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    if value.startswith("{") and value.endswith("}"):
+        # Postgres array literal, e.g. {library,timings}
+        return [item.strip('"') for item in value[1:-1].split(",") if item]
+    return value
+
+
+def load_rows(path: str) -> List[Dict[str, Any]]:
+    """Read a JSON list, JSON lines or CSV export."""
+    with open(path, newline="") as handle:
+        if path.endswith(".csv"):
+            return [{key: _parse_value(value) for key, value in row.items()} for row in csv.DictReader(handle)]
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in handle if line.strip()]
+        return json.load(handle)
+
+
+def labelled_queries(chat_logs: List[Dict[str, Any]], faq_ids: set) -> List[Dict[str, str]]:
+    """Keep chat logs whose match was not rejected and still points at an active FAQ."""
+    queries = []
+    for log in chat_logs:
+        faq_id = log.get("matched_faq_id")
+        if not faq_id or not log.get("question") or log.get("was_helpful") is False:
+            continue
+        if str(faq_id) in faq_ids:
+            queries.append({"question": log["question"], "faq_id": str(faq_id)})
+    return queries
+
+
+def fingerprint(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================================================
+# Matchers
+# ============================================================================
+
+def _substring_matcher(catalog: FAQCatalog) -> Matcher:
+    """The original list_faqs filter: substring of question, answer or tags."""
+    rows = catalog.rows()
+
+    def match(question: str, k: int) -> List[str]:
+        needle = question.lower()
+        found = []
+        for faq in rows:
+            if (
+                needle in faq.get("question", "").lower()
+                or needle in faq.get("answer", "").lower()
+                or needle in " ".join(faq.get("tags") or []).lower()
+            ):
+                found.append(str(faq["id"]))
+                if len(found) >= k:
+                    break
+        return found
+
+    return match
+
+
+def build_matchers(rows: List[Dict[str, Any]], names: List[str]) -> Dict[str, Matcher]:
+    fuzzy, suggest = FuzzyIndex(), SuggestIndex()
+    catalog = FAQCatalog(lambda: rows)
+    catalog.add_listener(fuzzy)
+    catalog.add_listener(suggest)
+    catalog.refresh()
+
+    available: Dict[str, Callable[[], Matcher]] = {
+        "fuzzy": lambda: lambda question, k: [faq_id for faq_id, _ in fuzzy.search(question, limit=k)],
+        "substring": lambda: _substring_matcher(catalog),
+        "suggest": lambda: lambda question, k: suggest.suggest(question, limit=k),
+    }
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise SystemExit(f"Unknown matcher(s): {', '.join(unknown)}; choose from {', '.join(available)}")
+    return {name: available[name]() for name in names}
+
+
+# ============================================================================
+# Evaluation
+# ============================================================================
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def quality(matcher: Matcher, queries: List[Dict[str, str]], ks: List[int]) -> Dict[str, float]:
+    depth = max(ks)
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = 0.0
+    for query in queries:
+        ranked = matcher(query["question"], depth)
+        if query["faq_id"] in ranked:
+            rank = ranked.index(query["faq_id"]) + 1
+            reciprocal_ranks += 1.0 / rank
+            for k in ks:
+                if rank <= k:
+                    hits[k] += 1
+    total = len(queries) or 1
+    result = {"mrr": round(reciprocal_ranks / total, 4)}
+    for k in ks:
+        result[f"hit@{k}"] = round(hits[k] / total, 4)
+        result[f"precision@{k}"] = round(hits[k] / total / k, 4)
+    return result
+
+
+def latency(matcher: Matcher, queries: List[Dict[str, str]], k: int, concurrency: int, repeat: int) -> Dict[str, float]:
+    questions = [query["question"] for query in queries] * repeat
+
+    def timed(question: str) -> float:
+        started = time.perf_counter()
+        matcher(question, k)
+        return time.perf_counter() - started
+
+    for question in questions[:min(len(questions), 50)]:
+        matcher(question, k)  # warm caches
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        durations = [timed(question) for question in questions]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(timed, questions, chunksize=16))
+    elapsed = time.perf_counter() - started
+
+    durations.sort()
+    return {
+        "concurrency": concurrency,
+        "queries": len(durations),
+        "p50_ms": round(_percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(durations, 0.99) * 1000, 3),
+        "throughput_qps": round(len(durations) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _print_comparison(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    if baseline.get("snapshot") != current.get("snapshot"):
+        print("  warning: snapshots differ, quality deltas are not comparable")
+    for name, result in current["matchers"].items():
+        before = baseline.get("matchers", {}).get(name)
+        if before is None:
+            continue
+        deltas = [
+            f"{metric} {value - before['quality'][metric]:+.4f}"
+            for metric, value in result["quality"].items() if metric in before["quality"]
+        ]
+        print(f"  {name}: {', '.join(deltas)}")
+        previous = {run["concurrency"]: run for run in before.get("latency", [])}
+        for run in result["latency"]:
+            old = previous.get(run["concurrency"])
+            if old and old["p95_ms"]:
+                print(
+                    f"    c={run['concurrency']}: p95 {run['p95_ms']:.3f} ms "
+                    f"({(run['p95_ms'] / old['p95_ms'] - 1) * 100:+.1f}%), "
+                    f"{run['throughput_qps']:.0f} q/s ({(run['throughput_qps'] / old['throughput_qps'] - 1) * 100:+.1f}%)"
+                )
+
+
+def run(args) -> int:
+    faqs = [faq for faq in load_rows(args.faqs) if faq.get("is_active", True)]
+    queries = labelled_queries(load_rows(args.chat_logs), {str(faq["id"]) for faq in faqs})
+    if args.max_queries:
+        queries = queries[:args.max_queries]
+    if not queries:
+        print("No labelled chat logs match the FAQ snapshot")
+        return 1
+
+    ks = sorted({int(k) for k in args.k.split(",")})
+    levels = [int(level) for level in args.concurrency.split(",")]
+    matchers = build_matchers(faqs, args.matchers.split(","))
+    print(f"{len(faqs)} FAQs, {len(queries)} labelled questions")
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "snapshot": fingerprint(args.faqs, args.chat_logs),
+        "python": platform.python_version(),
+        "k": ks,
+        "repeat": args.repeat,
+        "matchers": {},
+    }
+    for name, matcher in matchers.items():
+        scores = quality(matcher, queries, ks)
+        runs = [latency(matcher, queries, max(ks), level, args.repeat) for level in levels]
+        report["matchers"][name] = {"quality": scores, "latency": runs}
+
+        print(f"\n{name}")
+        print("  " + ", ".join(f"{metric} {value:.4f}" for metric, value in scores.items()))
+        for result in runs:
+            print(
+                f"  c={result['concurrency']:<3} p50 {result['p50_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, "
+                f"p99 {result['p99_ms']:.3f} ms, {result['throughput_qps']:.0f} q/s"
+            )
+
+    if args.compare:
+        with open(args.compare) as handle:
+            _print_comparison(report, json.load(handle))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nresults written to {args.output}")
+    return 0
+
+
+def export(args) -> int:
+    from services.supabase_service import get_supabase_service
+
+    db = get_supabase_service()
+    faqs = db._load_all_faqs()
+    query = (
+        db.client.table("chat_logs")
+        .select("question,matched_faq_id,was_helpful,created_at")
+        .order("created_at", desc=True)
+        .limit(args.limit)
+    )
+    chat_logs = [log for log in db._execute("chat_logs.export", query, idempotent=True).data if log.get("matched_faq_id")]
+    with open(args.faqs, "w") as handle:
+        json.dump(faqs, handle)
+    with open(args.chat_logs, "w") as handle:
+        json.dump(chat_logs, handle)
+    print(f"exported {len(faqs)} FAQs to {args.faqs} and {len(chat_logs)} matched chat logs to {args.chat_logs}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write a local snapshot from Supabase")
+    export_parser.add_argument("--faqs", required=True, help="Output file for FAQs")
+    export_parser.add_argument("--chat-logs", required=True, help="Output file for chat logs")
+    export_parser.add_argument("--limit", type=int, default=10000, help="Most recent chat logs to export")
+    export_parser.set_defaults(handler=export)
+
+    run_parser = commands.add_parser("run", help="Evaluate matchers against a local snapshot")
+    run_parser.add_argument("--faqs", required=True, help="FAQ snapshot (.json, .jsonl or .csv)")
+    run_parser.add_argument("--chat-logs", required=True, help="Chat log snapshot (.json, .jsonl or .csv)")
+    run_parser.add_argument("--matchers", default="fuzzy", help="Comma-separated: fuzzy, substring, suggest")
+    run_parser.add_argument("--k", default="1,3,5", help="Comma-separated cut-offs for hit@k and precision@k")
+    run_parser.add_argument("--concurrency", default="1", help="Comma-separated thread counts for latency runs")
+    run_parser.add_argument("--repeat", type=int, default=1, help="Replay the questions this many times per latency run")
+    run_parser.add_argument("--max-queries", type=int, help="Only use the first N labelled questions")
+    run_parser.add_argument("--output", help="Write results as JSON")
+    run_parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    run_parser.set_defaults(handler=run)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
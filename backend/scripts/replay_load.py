@@ -0,0 +1,401 @@
+"""
+Replay recorded traffic against the API and report per-route latency.
+
+Builds a request schedule from either
+    --access-log  JSON lines ({"ts", "method", "path", "user_id", "body"})
+                  or Common/Combined Log Format lines with timestamps
+    --chat-logs   a chat_logs export (.json, .jsonl or .csv); every logged
+                  question becomes a search, the chat log POST and, at
+                  configurable rates, an announcements and history read
+and replays it open-loop at --speed times real time, so slow responses
+do not hold back later requests. Latency is measured from each
+request's scheduled time, plus the time actually spent in the server.
+
+Then runs the schedule closed-loop at each --curve concurrency level to
+trace throughput against concurrency.
+
+Targets:
+    --target asgi (default)   the app in-process, on the in-memory local
+                              storage backend (seeded from --seed or with
+                              synthetic FAQs and announcements)
+    --target http://host:port a running server, e.g. one started with
+                              SUPABASE_BACKEND=local LOCAL_STORE_SEED=seed.json
+                              and the same SUPABASE_JWT_SECRET
+
+Usage:
+    python scripts/replay_load.py --chat-logs chat_logs.json --speed 60 --curve 1,4,16,64
+    python scripts/replay_load.py --access-log access.jsonl --target http://127.0.0.1:8000 --speed 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.evaluate_matcher import load_rows  # noqa: E402
+from services.announcement_store import parse_timestamp  # noqa: E402
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf")]
+
+_UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+_CLF_RE = re.compile(r'\[(?P<ts>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*"')
+
+
+class ScheduledRequest(NamedTuple):
+    offset: float
+    method: str
+    path: str
+    user_id: Optional[str] = None
+    body: Optional[Dict[str, Any]] = None
+
+    @property
+    def route(self) -> str:
+        return f"{self.method} {_UUID_RE.sub('{id}', self.path.split('?', 1)[0])}"
+
+
+# ============================================================================
+# Schedules
+# ============================================================================
+
+def schedule_from_access_log(path: str) -> List[ScheduledRequest]:
+    entries = []
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                entries.append((
+                    parse_timestamp(record["ts"]) if isinstance(record["ts"], str) else float(record["ts"]),
+                    record.get("method", "GET"), record["path"], record.get("user_id"), record.get("body"),
+                ))
+                continue
+            match = _CLF_RE.search(line)
+            if match:
+                moment = datetime.strptime(match.group("ts"), "%d/%b/%Y:%H:%M:%S %z")
+                entries.append((moment.timestamp(), match.group("method"), match.group("path"), None, None))
+    if not entries:
+        return []
+    entries.sort(key=lambda entry: entry[0])
+    first = entries[0][0]
+    return [ScheduledRequest(ts - first, method, path, user_id, body) for ts, method, path, user_id, body in entries]
+
+
+def schedule_from_chat_logs(path: str, announcements_rate: float, history_rate: float, seed: int) -> List[ScheduledRequest]:
+    rng = random.Random(seed)
+    logs = [log for log in load_rows(path) if log.get("question") and log.get("created_at")]
+    logs.sort(key=lambda log: parse_timestamp(log["created_at"]))
+    if not logs:
+        return []
+    first = parse_timestamp(logs[0]["created_at"])
+    schedule = []
+    for log in logs:
+        at = parse_timestamp(log["created_at"]) - first
+        user_id = str(log.get("user_id") or f"replay-user-{rng.randrange(1000)}")
+        question = str(log["question"])[:200]
+        if rng.random() < announcements_rate:
+            schedule.append(ScheduledRequest(max(0.0, at - 5), "GET", "/api/v1/announcements?limit=20"))
+        search = httpx.QueryParams({"search": question, "limit": 5})
+        schedule.append(ScheduledRequest(max(0.0, at - 2), "GET", f"/api/v1/faqs?{search}"))
+        schedule.append(ScheduledRequest(at, "POST", "/api/v1/chat-logs", user_id, {
+            "user_id": user_id,
+            "question": question,
+            "matched_faq_id": log.get("matched_faq_id") or None,
+            "confidence": 0.9 if log.get("matched_faq_id") else None,
+        }))
+        if rng.random() < history_rate:
+            schedule.append(ScheduledRequest(at + 1, "GET", "/api/v1/chat-logs/my-history?limit=20", user_id))
+    schedule.sort(key=lambda request: request.offset)
+    return schedule
+
+
+# ============================================================================
+# Targets
+# ============================================================================
+
+def _synthetic_seed(faqs: int, announcements: int, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    topics = ["hostel", "library", "exam", "fees", "scholarship", "canteen", "bus", "placement", "wifi", "sports"]
+    categories = ["academics", "admissions", "facilities", "general", "library", "hostel", "placement", "sports"]
+    now = datetime.utcnow()
+    return {
+        "faqs": [
+            {
+                "question": f"What are the {rng.choice(topics)} {rng.choice(['timings', 'rules', 'fees', 'contacts'])} for {i}?",
+                "answer": " ".join(rng.choice(topics) for _ in range(40)),
+                "category": rng.choice(categories),
+                "tags": rng.sample(topics, 2),
+                "created_by": "replay",
+                "view_count": rng.randrange(500),
+            }
+            for i in range(faqs)
+        ],
+        "announcements": [
+            {
+                "title": f"{rng.choice(topics).title()} notice {i}",
+                "description": " ".join(rng.choice(topics) for _ in range(20)),
+                "category": rng.choice(["academic", "event", "exam", "general", "sports"]),
+                "date": (now + timedelta(hours=rng.randrange(1, 24 * 60))).isoformat(),
+                "priority": rng.choice(["low", "medium", "high"]),
+                "created_by": "replay",
+            }
+            for i in range(announcements)
+        ],
+    }
+
+
+def _prepare_asgi_environment(args) -> None:
+    """Point the app at the local backend before it is imported."""
+    os.environ["SUPABASE_BACKEND"] = "local"
+    os.environ.setdefault("SUPABASE_JWT_SECRET", args.jwt_secret or secrets.token_hex(16))
+    os.environ["LOCAL_STORE_LATENCY_MS"] = str(args.backend_latency_ms)
+    seed_path = args.seed
+    if not seed_path:
+        handle = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        json.dump(_synthetic_seed(args.synthetic_faqs, args.synthetic_announcements, args.random_seed), handle)
+        handle.close()
+        seed_path = handle.name
+    os.environ["LOCAL_STORE_SEED"] = seed_path
+
+
+class TokenCache:
+    def __init__(self, secret: str):
+        from jose import jwt
+
+        self._encode = lambda user_id: jwt.encode({"sub": user_id, "role": "authenticated"}, secret, algorithm="HS256")
+        self._tokens: Dict[str, str] = {}
+
+    def headers(self, user_id: Optional[str]) -> Dict[str, str]:
+        if user_id is None:
+            return {}
+        if user_id not in self._tokens:
+            self._tokens[user_id] = self._encode(user_id)
+        return {"Authorization": f"Bearer {self._tokens[user_id]}"}
+
+
+# ============================================================================
+# Replay
+# ============================================================================
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.service_times: List[float] = []
+        self.statuses: Dict[int, int] = {}
+
+    def record(self, status: int, latency: float, service_time: float) -> None:
+        self.latencies.append(latency)
+        self.service_times.append(service_time)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+async def _send(client: httpx.AsyncClient, tokens: TokenCache, request: ScheduledRequest) -> int:
+    try:
+        response = await client.request(
+            request.method, request.path, json=request.body, headers=tokens.headers(request.user_id)
+        )
+        return response.status_code
+    except httpx.HTTPError:
+        return 0
+
+
+async def replay_open_loop(client, tokens, schedule: List[ScheduledRequest], speed: float, max_in_flight: int):
+    loop = asyncio.get_running_loop()
+    stats: Dict[str, RouteStats] = {}
+    in_flight = asyncio.Semaphore(max_in_flight)
+    started = loop.time()
+
+    async def fire(request: ScheduledRequest, due: float) -> None:
+        async with in_flight:
+            sent = loop.time()
+            status = await _send(client, tokens, request)
+            done = loop.time()
+        stats.setdefault(request.route, RouteStats()).record(status, done - due, done - sent)
+
+    tasks = []
+    for request in schedule:
+        due = started + request.offset / speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(request, due)))
+    await asyncio.gather(*tasks)
+    return stats, loop.time() - started
+
+
+async def replay_closed_loop(client, tokens, schedule: List[ScheduledRequest], concurrency: int, total: int):
+    latencies: List[float] = []
+    position = 0
+
+    async def worker() -> None:
+        nonlocal position
+        while position < total:
+            request = schedule[position % len(schedule)]
+            position += 1
+            started = time.perf_counter()
+            await _send(client, tokens, request)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def _histogram(values: List[float]) -> List[int]:
+    counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+    for value in values:
+        milliseconds = value * 1000
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if milliseconds <= bound:
+                counts[index] += 1
+                break
+    return counts
+
+
+def _print_route(route: str, route_stats: RouteStats) -> Dict[str, Any]:
+    latencies = route_stats.latencies
+    summary = {
+        "requests": len(latencies),
+        "statuses": route_stats.statuses,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "service_p50_ms": round(_percentile(route_stats.service_times, 0.50) * 1000, 2),
+        "histogram": dict(zip((f"le_{bound}" for bound in HISTOGRAM_BUCKETS_MS), _histogram(latencies))),
+    }
+    statuses = ", ".join(f"{status}x{count}" for status, count in sorted(route_stats.statuses.items()))
+    print(f"\n{route}  ({len(latencies)} requests; {statuses})")
+    print(
+        f"  p50 {summary['p50_ms']:.2f} ms  p95 {summary['p95_ms']:.2f} ms  p99 {summary['p99_ms']:.2f} ms  "
+        f"(in server p50 {summary['service_p50_ms']:.2f} ms)"
+    )
+    counts = _histogram(latencies)
+    widest = max(counts) or 1
+    lower = 0.0
+    for bound, count in zip(HISTOGRAM_BUCKETS_MS, counts):
+        if count:
+            label = f"{lower:g}-{bound:g} ms" if bound != float("inf") else f">{lower:g} ms"
+            print(f"  {label:>14} {count:>7} {'#' * max(1, int(40 * count / widest))}")
+        lower = bound
+    return summary
+
+
+async def _run(args, schedule: List[ScheduledRequest]) -> Dict[str, Any]:
+    if args.target == "asgi":
+        import main
+        from middleware.auth import SUPABASE_JWT_SECRET
+
+        app = main.app
+        tokens = TokenCache(SUPABASE_JWT_SECRET)
+        transport = httpx.ASGITransport(app=app)
+        lifespan = app.router.lifespan_context(app)
+        base_url = "http://replay"
+    else:
+        secret = args.jwt_secret or os.getenv("SUPABASE_JWT_SECRET") or os.getenv("SUPABASE_SERVICE_KEY")
+        if not secret:
+            raise SystemExit("--jwt-secret (or SUPABASE_JWT_SECRET) is required to authenticate against a server")
+        tokens = TokenCache(secret)
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.max_in_flight))
+        lifespan = None
+        base_url = args.target.rstrip("/")
+
+    report: Dict[str, Any] = {"schedule": len(schedule), "speed": args.speed, "routes": {}, "curve": []}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            span = schedule[-1].offset
+            print(f"replaying {len(schedule)} requests spanning {span:.0f} s at {args.speed:g}x ({span / args.speed:.1f} s)")
+            stats, elapsed = await replay_open_loop(client, tokens, schedule, args.speed, args.max_in_flight)
+            print(f"finished in {elapsed:.1f} s, {len(schedule) / elapsed:.1f} req/s offered")
+            for route in sorted(stats, key=lambda name: -len(stats[name].latencies)):
+                report["routes"][route] = _print_route(route, stats[route])
+
+            if args.curve:
+                print("\nthroughput vs concurrency (closed loop)")
+                print(f"{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+                for level in [int(level) for level in args.curve.split(",")]:
+                    point = await replay_closed_loop(client, tokens, schedule, level, args.curve_requests)
+                    report["curve"].append(point)
+                    print(
+                        f"{level:>12}{point['throughput_rps']:>10.1f}{point['p50_ms']:>10.2f}"
+                        f"{point['p95_ms']:>10.2f}{point['p99_ms']:>10.2f}"
+                    )
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--access-log", help="Recorded requests (JSON lines or Common Log Format)")
+    source.add_argument("--chat-logs", help="chat_logs export to derive sessions from")
+    parser.add_argument("--target", default="asgi", help="'asgi' for in-process, or a base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--max-requests", type=int, help="Only replay the first N scheduled requests")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on concurrent open-loop requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--curve", default="1,4,16,64", help="Comma-separated concurrency levels ('' to skip)")
+    parser.add_argument("--curve-requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--announcements-rate", type=float, default=0.5, help="Chat sessions that read announcements")
+    parser.add_argument("--history-rate", type=float, default=0.3, help="Chat sessions that read their history")
+    parser.add_argument("--seed", help="JSON file of tables to seed the local backend with (asgi target)")
+    parser.add_argument("--synthetic-faqs", type=int, default=500, help="FAQs to generate when no --seed is given")
+    parser.add_argument("--synthetic-announcements", type=int, default=100)
+    parser.add_argument("--backend-latency-ms", type=float, default=0.0, help="Added latency per local backend query")
+    parser.add_argument("--jwt-secret", help="Secret used to sign replay tokens")
+    parser.add_argument("--random-seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.access_log:
+        schedule = schedule_from_access_log(args.access_log)
+    else:
+        schedule = schedule_from_chat_logs(args.chat_logs, args.announcements_rate, args.history_rate, args.random_seed)
+    if args.max_requests:
+        schedule = schedule[:args.max_requests]
+    if not schedule:
+        print("Nothing to replay")
+        return 1
+
+    if args.target == "asgi":
+        _prepare_asgi_environment(args)
+    report = asyncio.run(_run(args, schedule))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nreport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
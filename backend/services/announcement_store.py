@@ -0,0 +1,404 @@
+"""
+Time-indexed in-memory store of upcoming announcements.
+
+The set of upcoming announcements only changes when one is written or
+when an announcement's date passes, so instead of asking Supabase for
+``date >= now`` on every request the store keeps them in arrays sorted
+by date and answers window queries with bisect in O(log n + k). Writes
+made through SupabaseService are applied immediately, writes made by
+other workers arrive through the invalidation bus, and a timer drops
+each entry at the moment its date passes. Entries are held as
+CompactAnnouncement records and turned back into dicts when queried.
+
+Staleness is bounded like the FAQ catalog's: once the last successful
+load is ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS / 2 old, the next query
+reloads the store in the background, and past the full bound the store
+reports itself unavailable so queries go to Supabase. Changes applied
+while a load is in flight are replayed over its result unless the
+loaded row is newer.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.compact_store import ANNOUNCEMENT_CATEGORIES, PRIORITIES, CompactAnnouncement, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+ANNOUNCEMENT_STORE_ENABLED = os.getenv("ANNOUNCEMENT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Past this many upcoming announcements the store stays unloaded and queries go to Supabase
+ANNOUNCEMENT_STORE_MAX_ROWS = int(os.getenv("ANNOUNCEMENT_STORE_MAX_ROWS", "5000"))
+ANNOUNCEMENT_STORE_PAGE_SIZE = int(os.getenv("ANNOUNCEMENT_STORE_PAGE_SIZE", "1000"))
+# After a failed load, wait this long before trying again
+ANNOUNCEMENT_STORE_RETRY_SECONDS = float(os.getenv("ANNOUNCEMENT_STORE_RETRY_SECONDS", "10"))
+ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS = float(os.getenv("ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS", "300"))
+
+# (category code, priority code), None meaning any
+IndexKey = Tuple[Optional[int], Optional[int]]
+
+
+class _DateIndex:
+    """Announcements sorted by (date, id) in parallel arrays."""
+
+    __slots__ = ("keys", "rows")
+
+    def __init__(self):
+        self.keys: List[Tuple[float, str]] = []
+        self.rows: List[CompactAnnouncement] = []
+
+    def insert(self, key: Tuple[float, str], row: CompactAnnouncement) -> None:
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.rows.insert(position, row)
+
+    def remove(self, key: Tuple[float, str]) -> None:
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+            del self.rows[position]
+
+    def drop_before(self, timestamp: float) -> None:
+        cut = bisect_left(self.keys, (timestamp, ""))
+        if cut:
+            del self.keys[:cut]
+            del self.rows[:cut]
+
+    def window(self, start: float, end: Optional[float], limit: int) -> List[CompactAnnouncement]:
+        lo = bisect_left(self.keys, (start, ""))
+        hi = len(self.keys) if end is None else bisect_left(self.keys, (end, ""))
+        return self.rows[lo:min(hi, lo + limit)]
+
+
+class AnnouncementStore:
+    """
+    Upcoming active announcements indexed by date.
+
+    One sorted index is kept for every combination of category and
+    priority filter (including "any"), so each query is a pair of
+    bisects followed by a slice of the matching rows.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict[str, Any]]],
+        fetch_one: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    ):
+        """
+        Args:
+            loader: Callable returning every active announcement whose
+                date has not passed; raises on failure
+            fetch_one: Optional callable returning a single announcement
+                by ID, used to refresh entries changed by other workers
+        """
+        self._loader = loader
+        self._fetch_one = fetch_one
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="announcement-store")
+        self._lock = threading.RLock()
+        self._indexes: Dict[IndexKey, _DateIndex] = {}
+        self._keys_by_id: Dict[str, Tuple[float, str]] = {}
+        self._rows_by_id: Dict[str, CompactAnnouncement] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due: Optional[float] = None
+        self._loaded = False
+        self._next_load_attempt = 0.0
+        # Monotonic start of the last successful load
+        self._synced_at = 0.0
+        self._reload_pending = False
+        # Changes applied while loads are in flight, replayed over their results
+        self._journal: List[Tuple[str, Any]] = []
+        self._loads = 0
+        # Held by the load in flight, so loads never run in parallel
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self) -> bool:
+        """
+        Load the store on first use.
+
+        Returns:
+            True if the store can answer queries, False if loading failed
+            or another request's load is still in flight
+        """
+        if self._loaded:
+            age = time.monotonic() - self._synced_at
+            if age > ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS / 2:
+                self._schedule_reload()
+            return age <= ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS
+        if time.monotonic() < self._next_load_attempt:
+            return False
+        # Requests arriving while another one loads go to Supabase meanwhile
+        if not self._load_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._loaded:
+                return True
+            if time.monotonic() < self._next_load_attempt:
+                return False
+            return self._refresh()
+        finally:
+            self._load_lock.release()
+
+    def refresh(self) -> bool:
+        """
+        Replace the contents of the store with a fresh load.
+
+        Waits for a load already in flight, so a scheduled refresh never
+        overlaps one started by a request.
+
+        Returns:
+            True on success, False if the loader failed or returned more
+            than ANNOUNCEMENT_STORE_MAX_ROWS rows
+        """
+        with self._load_lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        synced_at = time.monotonic()
+        with self._lock:
+            self._loads += 1
+            mark = len(self._journal)
+        try:
+            try:
+                rows = self._loader()
+            except Exception as e:
+                logger.error(f"Failed to load announcement store: {str(e)}")
+                self._next_load_attempt = time.monotonic() + ANNOUNCEMENT_STORE_RETRY_SECONDS
+                return False
+
+            if len(rows) > ANNOUNCEMENT_STORE_MAX_ROWS:
+                # A partial store would answer queries past its last row with nothing
+                logger.warning(
+                    f"More than {ANNOUNCEMENT_STORE_MAX_ROWS} upcoming announcements; "
+                    f"announcement store disabled, queries go to Supabase"
+                )
+                with self._lock:
+                    self._indexes = {}
+                    self._keys_by_id = {}
+                    self._rows_by_id = {}
+                    self._loaded = False
+                self._next_load_attempt = time.monotonic() + ANNOUNCEMENT_STORE_MAX_STALENESS_SECONDS
+                return False
+
+            with self._lock:
+                self._indexes = {}
+                self._keys_by_id = {}
+                self._rows_by_id = {}
+                for row in rows:
+                    self._insert(CompactAnnouncement(row))
+                replayed = self._replay(mark)
+                self._expire(time.time())
+                self._loaded = True
+                self._synced_at = max(self._synced_at, synced_at)
+        finally:
+            with self._lock:
+                self._loads -= 1
+                if not self._loads:
+                    self._journal = []
+        if replayed:
+            logger.info(f"Replayed {replayed} announcement changes made during the store load")
+        logger.info(f"Announcement store loaded with {len(self._rows_by_id)} upcoming announcements")
+        return True
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Apply a created or updated announcement row."""
+        with self._lock:
+            if self._loads:
+                self._journal.append(("upsert", row))
+            if self._loaded:
+                self._apply(row)
+
+    def remove(self, announcement_id: str) -> None:
+        """Drop an announcement (e.g. after a soft delete)."""
+        with self._lock:
+            if self._loads:
+                self._journal.append(("remove", str(announcement_id)))
+            if self._loaded:
+                self._remove(str(announcement_id))
+
+    def apply_event(self, key: Optional[str], op: str, payload: Optional[Dict[str, Any]]) -> None:
+        """
+        Invalidation bus callback for the announcements namespace.
+
+        Local writes carry the written row and are applied directly.
+        Changes from other workers only carry the ID: the entry is
+        dropped at once and refetched in the background.
+        """
+        if not self._loaded and not self._loads:
+            return
+        if key is None:
+            self._refresher.submit(self.refresh)
+            return
+        if payload is not None:
+            self.upsert(payload)
+            return
+        self.remove(key)
+        if op != "delete" and self._fetch_one is not None:
+            self._refresher.submit(self._refetch, key)
+
+    def _refetch(self, announcement_id: str) -> None:
+        row = self._fetch_one(announcement_id)
+        if row is not None:
+            self.upsert(row)
+
+    def query(
+        self,
+        limit: int = 50,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return upcoming announcements ordered by date.
+
+        Args:
+            limit: Maximum number of announcements to return
+            category: Optional category filter
+            priority: Optional priority filter
+            start: Optional inclusive lower bound on date (never before now)
+            end: Optional exclusive upper bound on date
+
+        Returns:
+            List of announcement dictionaries
+        """
+        lower = time.time()
+        if start is not None:
+            lower = max(lower, parse_timestamp(start))
+        upper = parse_timestamp(end) if end is not None else None
+        with self._lock:
+            index = self._indexes.get((self._code(ANNOUNCEMENT_CATEGORIES, category), self._code(PRIORITIES, priority)))
+            if index is None:
+                return []
+            records = index.window(lower, upper, limit)
+        return [record.to_row() for record in records]
+
+    def __len__(self) -> int:
+        return len(self._rows_by_id)
+
+    def close(self) -> None:
+        """Cancel the pending expiry timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+                self._timer_due = None
+
+    @staticmethod
+    def _code(codebook, value: Optional[str]) -> Optional[int]:
+        """Index key part for a filter value; -1 when no announcement has it."""
+        if value is None:
+            return None
+        code = codebook.find(value)
+        return -1 if code is None else code
+
+    def _schedule_reload(self) -> None:
+        with self._lock:
+            if self._reload_pending:
+                return
+            self._reload_pending = True
+        self._refresher.submit(self._run_reload)
+
+    def _run_reload(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            self._reload_pending = False
+
+    def _apply(self, row: Dict[str, Any]) -> None:
+        self._remove(str(row.get("id")))
+        if row.get("is_active", True) and parse_timestamp(row["date"]) >= time.time():
+            self._insert(CompactAnnouncement(row))
+            self._schedule_expiry()
+
+    def _replay(self, mark: int) -> int:
+        """Re-apply the changes journaled since mark over freshly loaded rows."""
+        replayed = 0
+        for op, value in self._journal[mark:]:
+            if op == "remove":
+                self._remove(value)
+                replayed += 1
+                continue
+            current = self._rows_by_id.get(str(value.get("id")))
+            updated_at = CompactAnnouncement(value).updated_at
+            if current is not None and current.updated_at is not None and updated_at is not None and updated_at < current.updated_at:
+                continue
+            self._apply(value)
+            replayed += 1
+        return replayed
+
+    def _index_keys(self, row: CompactAnnouncement) -> List[IndexKey]:
+        category = row.category
+        priority = row.priority
+        return [(None, None), (category, None), (None, priority), (category, priority)]
+
+    def _insert(self, row: CompactAnnouncement) -> None:
+        announcement_id = row.id
+        key = (row.date, announcement_id)
+        for index_key in self._index_keys(row):
+            index = self._indexes.get(index_key)
+            if index is None:
+                index = self._indexes[index_key] = _DateIndex()
+            index.insert(key, row)
+        self._keys_by_id[announcement_id] = key
+        self._rows_by_id[announcement_id] = row
+
+    def _remove(self, announcement_id: str) -> None:
+        key = self._keys_by_id.pop(announcement_id, None)
+        if key is None:
+            return
+        row = self._rows_by_id.pop(announcement_id)
+        for index_key in self._index_keys(row):
+            index = self._indexes.get(index_key)
+            if index is not None:
+                index.remove(key)
+                if not index.keys:
+                    del self._indexes[index_key]
+
+    def _expire(self, now: float) -> None:
+        """Drop every announcement dated before now and re-arm the timer."""
+        everything = self._indexes.get((None, None))
+        if everything is not None:
+            cut = bisect_left(everything.keys, (now, ""))
+            for _, announcement_id in everything.keys[:cut]:
+                self._keys_by_id.pop(announcement_id, None)
+                self._rows_by_id.pop(announcement_id, None)
+            for index_key, index in list(self._indexes.items()):
+                index.drop_before(now)
+                if not index.keys:
+                    del self._indexes[index_key]
+            if cut:
+                logger.info(f"Expired {cut} announcements from store")
+        self._schedule_expiry()
+
+    def _schedule_expiry(self) -> None:
+        everything = self._indexes.get((None, None))
+        due = everything.keys[0][0] if everything is not None and everything.keys else None
+        if due == self._timer_due:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._timer_due = due
+        if due is None:
+            return
+        # An announcement stays upcoming while date >= now, so it is due
+        # to be dropped just after its date.
+        delay = max(0.0, due - time.time()) + 0.001
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._timer_due = None
+            self._expire(time.time())
@@ -0,0 +1,222 @@
+"""
+Server-sent event stream of announcement changes.
+
+The broker listens to the announcements namespace of the invalidation
+bus, so it sees writes from this worker (with the written row) and from
+every other worker (ID only; the row is refetched here). Each change is
+encoded once as an SSE frame and appended to a bounded ring shared by
+all subscribers.
+
+A subscriber holds nothing but its position in the ring and one shared
+"next event" future, so thousands of idle connections cost a suspended
+generator each. A subscriber that falls further behind than the ring,
+or resumes from an ID this worker never issued, gets a ``resync`` event
+telling it to refetch the list instead of a stream with holes.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STREAM_BUFFER_EVENTS = int(os.getenv("STREAM_BUFFER_EVENTS", "512"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "10000"))
+STREAM_RETRY_MS = int(os.getenv("STREAM_RETRY_MS", "3000"))
+
+# Announcements pushed with the "urgent" flag set
+URGENT_PRIORITIES = {"urgent"}
+URGENT_CATEGORIES = {"emergency"}
+
+_HEARTBEAT = b": heartbeat\n\n"
+
+
+class TooManySubscribers(Exception):
+    """Raised when STREAM_MAX_SUBSCRIBERS connections are already open."""
+
+
+class AnnouncementBroker:
+    """
+    Fans announcement changes out to streaming subscribers.
+
+    Event IDs are ``<epoch>-<sequence>``: the epoch identifies this
+    broker instance, so an ID from another worker or before a restart
+    is recognised and answered with a resync.
+    """
+
+    def __init__(
+        self,
+        fetch_one: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+        buffer_size: int = STREAM_BUFFER_EVENTS,
+        max_subscribers: int = STREAM_MAX_SUBSCRIBERS,
+    ):
+        self._fetch_one = fetch_one
+        self._epoch = format(int(time.time() * 1000), "x")
+        self._lock = threading.Lock()
+        # (sequence, category, priority, encoded frame)
+        self._events: Deque[Tuple[int, Optional[str], Optional[str], bytes]] = deque(maxlen=buffer_size)
+        self._sequence = 0
+        self._max_subscribers = max_subscribers
+        self._subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next: Optional[asyncio.Future] = None
+        self._fetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="announcement-stream")
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    # ------------------------------------------------------------------
+    # Producer side (bus callback, any thread)
+    # ------------------------------------------------------------------
+
+    def apply_event(self, key: Optional[str], op: str, payload: Optional[Dict[str, Any]]) -> None:
+        """Invalidation bus callback for the announcements namespace."""
+        if self._loop is None:
+            # Nobody has ever subscribed in this worker
+            return
+        if key is None:
+            self._publish("resync", None, {})
+        elif op == "delete":
+            self._publish("deleted", None, {"id": key})
+        elif payload is not None:
+            self._publish_row(op, payload)
+        elif self._fetch_one is not None:
+            self._fetcher.submit(self._refetch, key, op)
+
+    def _refetch(self, announcement_id: str, op: str) -> None:
+        row = self._fetch_one(announcement_id)
+        if row is None:
+            # Deactivated or gone: subscribers drop it either way
+            self._publish("deleted", None, {"id": announcement_id})
+        else:
+            self._publish_row(op, row)
+
+    def _publish_row(self, op: str, row: Dict[str, Any]) -> None:
+        if row.get("is_active") is False:
+            self._publish("deleted", None, {"id": str(row.get("id"))})
+            return
+        urgent = row.get("priority") in URGENT_PRIORITIES or row.get("category") in URGENT_CATEGORIES
+        self._publish("created" if op == "create" else "updated", row, {"urgent": urgent, "announcement": row})
+
+    def _publish(self, kind: str, row: Optional[Dict[str, Any]], data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            event_id = f"{self._epoch}-{sequence}"
+            frame = (
+                f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+            ).encode("utf-8")
+            self._events.append((
+                sequence,
+                row.get("category") if row else None,
+                row.get("priority") if row else None,
+                frame,
+            ))
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # Loop closed (shutdown); nobody is listening any more
+                self._loop = None
+
+    def _wake(self) -> None:
+        if self._next is not None and not self._next.done():
+            self._next.set_result(None)
+        self._next = None
+
+    # ------------------------------------------------------------------
+    # Consumer side (event loop)
+    # ------------------------------------------------------------------
+
+    async def subscribe(
+        self,
+        last_event_id: Optional[str] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Return an async iterator of SSE frames for one connection.
+
+        Args:
+            last_event_id: ID of the last event the client received, to resume after it
+            category: Only push announcements of this category
+            priority: Only push announcements of this priority
+
+        Raises:
+            TooManySubscribers: When the connection limit is reached
+        """
+        if self._subscribers >= self._max_subscribers:
+            raise TooManySubscribers()
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._next = loop, None
+        return self._stream(self._resume_position(last_event_id), category, priority)
+
+    def _resume_position(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence to continue after, or None when the client must resync."""
+        with self._lock:
+            if not last_event_id:
+                return self._sequence
+            epoch, _, sequence = last_event_id.partition("-")
+            if epoch != self._epoch or not sequence.isdigit() or int(sequence) > self._sequence:
+                return None
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+            if int(sequence) < oldest - 1:
+                return None
+            return int(sequence)
+
+    async def _stream(self, position: Optional[int], category: Optional[str], priority: Optional[str]) -> AsyncIterator[bytes]:
+        # Counted once the response starts iterating, so the finally below always balances it
+        self._subscribers += 1
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode("utf-8")
+            if position is None:
+                position = self._sequence
+                yield self._resync_frame()
+            while True:
+                frames, position = self._after(position, category, priority)
+                if frames is None:
+                    yield self._resync_frame()
+                    continue
+                for frame in frames:
+                    yield frame
+                if frames:
+                    continue
+                if self._next is None:
+                    self._next = self._loop.create_future()
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._next), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield _HEARTBEAT
+        finally:
+            self._subscribers -= 1
+
+    def _after(self, position: int, category: Optional[str], priority: Optional[str]):
+        """Frames after position matching the filters, and the new position."""
+        with self._lock:
+            if position >= self._sequence:
+                return [], position
+            if not self._events or self._events[0][0] > position + 1:
+                # Fell behind the ring: the events in between are gone
+                return None, self._sequence
+            frames = [
+                frame for sequence, event_category, event_priority, frame in self._events
+                if sequence > position
+                and (category is None or event_category in (None, category))
+                and (priority is None or event_priority in (None, priority))
+            ]
+            return frames, self._sequence
+
+    def _resync_frame(self) -> bytes:
+        return f"id: {self._epoch}-{self._sequence}\nevent: resync\ndata: {{}}\n\n".encode("utf-8")
+
+    def close(self) -> None:
+        self._fetcher.shutdown(wait=False)
@@ -0,0 +1,246 @@
+"""
+Per-user cache of recent chat history.
+
+A user's chat history only changes through our own endpoints: a new
+question creates a log and feedback updates one. So instead of querying
+chat_logs on every visit to the chat page, the newest logs of each
+active user are kept in a bounded ring (newest first), loaded on the
+first read and then kept current by the writes themselves:
+
+- ``create_chat_log`` pushes the new log onto the front of the ring,
+  dropping the oldest once the ring is full
+- feedback updates patch the cached log in place
+- writes made by other workers arrive through the invalidation bus
+  without the row, and drop that user's entry (reloaded on next read);
+  with CACHE_BUS_PG_NOTIFY, writes from other hosts and archive runs do
+  too, through the chat_logs NOTIFYs (keyed by user ID)
+
+Entries are also reloaded once CHAT_HISTORY_CACHE_TTL_SECONDS old, which
+bounds how stale a history can get when writes from other hosts are not
+notified. Users are evicted least recently used first once the estimated
+size of all cached logs exceeds CHAT_HISTORY_CACHE_MAX_MB.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_CACHE_ENABLED = os.getenv("CHAT_HISTORY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Logs kept per user; reads asking for more go to Supabase unless the user has no more
+CHAT_HISTORY_CACHE_PER_USER = int(os.getenv("CHAT_HISTORY_CACHE_PER_USER", "100"))
+CHAT_HISTORY_CACHE_MAX_MB = float(os.getenv("CHAT_HISTORY_CACHE_MAX_MB", "64"))
+CHAT_HISTORY_CACHE_TTL_SECONDS = float(os.getenv("CHAT_HISTORY_CACHE_TTL_SECONDS", "60"))
+
+
+def _row_bytes(row: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached log."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+
+class _History:
+    """The newest logs of one user, newest first."""
+
+    __slots__ = ("logs", "complete", "bytes", "loaded_at")
+
+    def __init__(self, logs: List[Dict[str, Any]], capacity: int):
+        self.logs: Deque[Dict[str, Any]] = deque(logs[:capacity], maxlen=capacity)
+        # True when the ring holds every log the user has
+        self.complete = len(logs) < capacity
+        self.bytes = sum(_row_bytes(row) for row in self.logs)
+        self.loaded_at = time.monotonic()
+
+
+class ChatHistoryCache:
+    """Bounded per-user rings of recent chat logs with a global LRU size cap."""
+
+    def __init__(
+        self,
+        per_user: int = CHAT_HISTORY_CACHE_PER_USER,
+        max_bytes: int = int(CHAT_HISTORY_CACHE_MAX_MB * 1e6),
+        ttl: float = CHAT_HISTORY_CACHE_TTL_SECONDS
+    ):
+        self.per_user = per_user
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, _History]" = OrderedDict()
+        self._bytes = 0
+        # Users being loaded -> [loads in flight, whether one of their logs was
+        # written meanwhile]; the mark stays until the user's last load ends
+        self._loading: Dict[str, List[Any]] = {}
+
+    def get(self, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the user's newest logs if the cache can answer for limit.
+
+        Args:
+            user_id: ID of the user
+            limit: Number of logs wanted
+
+        Returns:
+            Up to limit logs, newest first, or None on a miss
+        """
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is not None and time.monotonic() - history.loaded_at > self.ttl:
+                self._remove(user_id)
+                history = None
+            if history is None or (len(history.logs) < limit and not history.complete):
+                get_metrics().incr("chat_history.miss")
+                return None
+            self._users.move_to_end(user_id)
+            get_metrics().incr("chat_history.hit")
+            return [dict(row) for _, row in zip(range(limit), history.logs)]
+
+    def find(self, user_id: str, log_id: str) -> Optional[Dict[str, Any]]:
+        """Return one of the user's cached logs, or None if it is not cached."""
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None or time.monotonic() - history.loaded_at > self.ttl:
+                return None
+            for row in history.logs:
+                if str(row.get("id")) == log_id:
+                    return dict(row)
+            return None
+
+    def begin_load(self, user_id: str) -> None:
+        """Note that the user's history is being read, before querying Supabase."""
+        with self._lock:
+            self._loading.setdefault(user_id, [0, False])[0] += 1
+
+    def finish_load(self, user_id: str, logs: List[Dict[str, Any]]) -> None:
+        """
+        Cache the logs read after begin_load.
+
+        The read must have asked for at least ``per_user`` logs, so that
+        a shorter result means the user has no more. It is discarded
+        when a log of the user was written while it was being read,
+        since it may not contain that write.
+
+        Args:
+            user_id: ID of the user
+            logs: Logs read, newest first
+        """
+        with self._lock:
+            loading = self._loading.get(user_id)
+            if loading is None:
+                return
+            self._end_load(user_id, loading)
+            if loading[1]:
+                return
+            self._remove(user_id)
+            history = _History([dict(row) for row in logs], self.per_user)
+            self._users[user_id] = history
+            self._bytes += history.bytes
+            self._evict()
+
+    def abort_load(self, user_id: str) -> None:
+        """Forget a begin_load whose read failed."""
+        with self._lock:
+            loading = self._loading.get(user_id)
+            if loading is not None:
+                self._end_load(user_id, loading)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Add a newly created log to its user's history."""
+        user_id = row.get("user_id")
+        with self._lock:
+            self._mark_written(user_id)
+            history = self._users.get(user_id)
+            if history is None:
+                return
+            change = 0
+            if len(history.logs) == history.logs.maxlen:
+                # appendleft pushes the oldest log out of the ring
+                change -= _row_bytes(history.logs[-1])
+                history.complete = False
+            row = dict(row)
+            history.logs.appendleft(row)
+            change += _row_bytes(row)
+            history.bytes += change
+            self._bytes += change
+            self._evict()
+
+    def patch(self, row: Dict[str, Any]) -> None:
+        """Replace a cached log with its updated version."""
+        user_id = row.get("user_id")
+        log_id = str(row.get("id"))
+        with self._lock:
+            self._mark_written(user_id)
+            history = self._users.get(user_id)
+            if history is None:
+                return
+            for position, cached in enumerate(history.logs):
+                if str(cached.get("id")) == log_id:
+                    updated = {**cached, **row}
+                    change = _row_bytes(updated) - _row_bytes(cached)
+                    history.logs[position] = updated
+                    history.bytes += change
+                    self._bytes += change
+                    self._evict()
+                    return
+
+    def drop(self, user_id: Optional[str]) -> None:
+        """Forget one user's history, or everyone's when user_id is None."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._bytes = 0
+                for loading in self._loading.values():
+                    loading[1] = True
+                return
+            self._mark_written(user_id)
+            self._remove(user_id)
+
+    def apply_event(self, key: Optional[str], op: str, payload: Optional[Dict[str, Any]]) -> None:
+        """
+        Invalidation bus callback for the chat_logs namespace (keyed by user ID).
+
+        Local writes carry the written log and are applied directly;
+        writes from other workers drop the user's entry.
+        """
+        if key is not None and payload is not None:
+            if op == "create":
+                self.append(payload)
+            else:
+                self.patch(payload)
+            return
+        self.drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "logs": sum(len(history.logs) for history in self._users.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _mark_written(self, user_id: Optional[str]) -> None:
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            loading[1] = True
+
+    def _end_load(self, user_id: str, loading: List[Any]) -> None:
+        loading[0] -= 1
+        if not loading[0]:
+            del self._loading[user_id]
+
+    def _remove(self, user_id: str) -> None:
+        history = self._users.pop(user_id, None)
+        if history is not None:
+            self._bytes -= history.bytes
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._users:
+            _, history = self._users.popitem(last=False)
+            self._bytes -= history.bytes
+            get_metrics().incr("chat_history.evicted")
@@ -0,0 +1,260 @@
+"""
+Compact records for FAQs and announcements held in memory.
+
+A PostgREST row is a dict of a dozen string keys and values: the UUID
+as 36 characters, timestamps as ISO strings, category and priority as
+repeated strings. Caches of them cost several times the raw text. The
+records here keep each row in a ``__slots__`` object instead:
+
+- IDs as 16-byte UUID values
+- timestamps as epoch floats
+- categories and priorities as small integer codes (see Codebook)
+- tags and creator IDs as interned strings, shared across records
+
+Question, answer, title and description text is kept as is. Records
+convert back to PostgREST-shaped dicts (``to_row``) or response models
+(``to_response``) on demand.
+"""
+
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from models.database import (
+    AnnouncementCategory,
+    AnnouncementResponse,
+    FAQCategory,
+    FAQResponse,
+    Priority,
+)
+
+RecordKey = Union[bytes, str]
+
+
+def parse_timestamp(value: Any) -> float:
+    """
+    Convert a PostgREST timestamp (ISO string or datetime) to epoch seconds.
+
+    Naive values are treated as UTC, matching how the service writes them.
+    """
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def format_timestamp(value: float) -> str:
+    """
+    Format epoch seconds the way PostgREST returns a timestamptz.
+
+    UTC with a "+00:00" offset, and fractional seconds only to their
+    last non-zero digit, as Postgres prints them.
+    """
+    moment = datetime.fromtimestamp(value, timezone.utc)
+    text = moment.strftime("%Y-%m-%dT%H:%M:%S")
+    if moment.microsecond:
+        text += f".{moment.microsecond:06d}".rstrip("0")
+    return text + "+00:00"
+
+
+def record_key(value: Any) -> RecordKey:
+    """16-byte form of a UUID, or the string itself for other IDs."""
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    try:
+        return uuid.UUID(str(value)).bytes
+    except ValueError:
+        return str(value)
+
+
+def _key_string(key: RecordKey) -> str:
+    return str(uuid.UUID(bytes=key)) if isinstance(key, bytes) else key
+
+
+def _epoch(value: Any) -> Optional[float]:
+    return parse_timestamp(value) if value is not None else None
+
+
+def _isoformat(value: Optional[float]) -> Optional[str]:
+    return format_timestamp(value) if value is not None else None
+
+
+def _datetime(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class Codebook:
+    """
+    Small integer codes for a column with few distinct values.
+
+    Seeded with the enum's values so their codes are stable; values the
+    enum does not know (rows written before it was extended) get codes
+    as they are seen.
+    """
+
+    def __init__(self, values: List[str]):
+        self._lock = threading.Lock()
+        self._values: List[Optional[str]] = [None, *values]
+        self._codes: Dict[Optional[str], int] = {value: code for code, value in enumerate(self._values)}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(sys.intern(value))
+                    self._codes[value] = code
+        return code
+
+    def find(self, value: Optional[str]) -> Optional[int]:
+        """Code of value, or None if no record has it."""
+        return self._codes.get(value)
+
+    def value(self, code: int) -> Optional[str]:
+        return self._values[code]
+
+
+FAQ_CATEGORIES = Codebook([category.value for category in FAQCategory])
+ANNOUNCEMENT_CATEGORIES = Codebook([category.value for category in AnnouncementCategory])
+PRIORITIES = Codebook([priority.value for priority in Priority])
+
+
+class CompactFAQ:
+    """One FAQ row."""
+
+    __slots__ = (
+        "key", "question", "answer", "category", "tags", "is_active",
+        "created_by", "created_at", "updated_at", "view_count",
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.key: RecordKey = record_key(row["id"])
+        self.question: str = row.get("question") or ""
+        self.answer: str = row.get("answer") or ""
+        self.category: int = FAQ_CATEGORIES.code(row.get("category"))
+        self.tags: Tuple[str, ...] = tuple(sys.intern(tag) for tag in row.get("tags") or ())
+        self.is_active: bool = row.get("is_active", True)
+        self.created_by: Optional[str] = _intern(row.get("created_by"))
+        self.created_at: Optional[float] = _epoch(row.get("created_at"))
+        self.updated_at: Optional[float] = _epoch(row.get("updated_at"))
+        self.view_count: int = row.get("view_count") or 0
+
+    @property
+    def id(self) -> str:
+        return _key_string(self.key)
+
+    def to_row(self) -> Dict[str, Any]:
+        """The FAQ as a PostgREST-shaped dict."""
+        return {
+            "id": self.id,
+            "question": self.question,
+            "answer": self.answer,
+            "category": FAQ_CATEGORIES.value(self.category),
+            "tags": list(self.tags),
+            "is_active": self.is_active,
+            "created_by": self.created_by,
+            "created_at": _isoformat(self.created_at),
+            "updated_at": _isoformat(self.updated_at),
+            "view_count": self.view_count,
+        }
+
+    def to_response(self) -> FAQResponse:
+        return FAQResponse(
+            id=uuid.UUID(bytes=self.key) if isinstance(self.key, bytes) else self.key,
+            question=self.question,
+            answer=self.answer,
+            category=FAQ_CATEGORIES.value(self.category),
+            tags=list(self.tags),
+            is_active=self.is_active,
+            created_by=self.created_by,
+            created_at=_datetime(self.created_at),
+            updated_at=_datetime(self.updated_at),
+            view_count=self.view_count,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CompactFAQ):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def same_content(self, other: "CompactFAQ") -> bool:
+        """
+        True if other differs at most in view_count and updated_at.
+
+        A view increment changes only those two (updated_at through the
+        BEFORE UPDATE trigger).
+        """
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__ if name not in ("view_count", "updated_at")
+        )
+
+
+class CompactAnnouncement:
+    """One announcement row."""
+
+    __slots__ = (
+        "key", "title", "description", "category", "date", "priority",
+        "created_by", "created_at", "updated_at", "is_active",
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.key: RecordKey = record_key(row["id"])
+        self.title: str = row.get("title") or ""
+        self.description: str = row.get("description") or ""
+        self.category: int = ANNOUNCEMENT_CATEGORIES.code(row.get("category"))
+        self.date: float = parse_timestamp(row["date"])
+        self.priority: int = PRIORITIES.code(row.get("priority"))
+        self.created_by: Optional[str] = _intern(row.get("created_by"))
+        self.created_at: Optional[float] = _epoch(row.get("created_at"))
+        self.updated_at: Optional[float] = _epoch(row.get("updated_at"))
+        self.is_active: bool = row.get("is_active", True)
+
+    @property
+    def id(self) -> str:
+        return _key_string(self.key)
+
+    def to_row(self) -> Dict[str, Any]:
+        """The announcement as a PostgREST-shaped dict."""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "category": ANNOUNCEMENT_CATEGORIES.value(self.category),
+            "date": _isoformat(self.date),
+            "priority": PRIORITIES.value(self.priority),
+            "created_by": self.created_by,
+            "created_at": _isoformat(self.created_at),
+            "updated_at": _isoformat(self.updated_at),
+            "is_active": self.is_active,
+        }
+
+    def to_response(self) -> AnnouncementResponse:
+        return AnnouncementResponse(
+            id=uuid.UUID(bytes=self.key) if isinstance(self.key, bytes) else self.key,
+            title=self.title,
+            description=self.description,
+            category=ANNOUNCEMENT_CATEGORIES.value(self.category),
+            date=_datetime(self.date),
+            priority=PRIORITIES.value(self.priority),
+            created_by=self.created_by,
+            created_at=_datetime(self.created_at),
+            updated_at=_datetime(self.updated_at),
+            is_active=self.is_active,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CompactAnnouncement):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
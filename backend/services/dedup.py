@@ -0,0 +1,286 @@
+"""
+Near-duplicate FAQ detection with MinHash and locality-sensitive hashing.
+
+Each FAQ is reduced to a set of character shingles over its normalised
+question and answer, and the set to a fixed-size MinHash signature. The
+fraction of matching signature positions estimates the Jaccard
+similarity of two FAQs. Signatures are cut into bands, and FAQs that
+share any band bucket become candidates. Finding the duplicates of one
+FAQ therefore touches only its few candidates, never the whole table.
+
+Signatures use one-permutation hashing: every shingle is hashed once
+and kept as the minimum of its bin. Empty bins are densified by
+rotation, so building a signature is linear in the number of shingles
+rather than in shingles times permutations.
+"""
+
+import logging
+import os
+import threading
+from operator import eq
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from zlib import crc32
+
+from services.fuzzy_index import STOPWORDS, tokenize
+
+logger = logging.getLogger(__name__)
+
+DEDUP_NUM_HASHES = int(os.getenv("DEDUP_NUM_HASHES", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "4"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+# Buckets this large hold boilerplate shared by unrelated FAQs; the table-wide pass skips them
+DEDUP_MAX_BUCKET_SIZE = int(os.getenv("DEDUP_MAX_BUCKET_SIZE", "1000"))
+
+_HASH_BITS = 64
+_MAX_HASH = (1 << _HASH_BITS) - 1
+_MULTIPLIER = 0x9E3779B97F4A7C15
+# Added per bin of rotation when densifying, keeps borrowed values distinct
+_ROTATION_OFFSET = 0xC2B2AE3D27D4EB4F
+
+Signature = Tuple[int, ...]
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase, drop stopwords and strip plural endings."""
+    words = []
+    for word in tokenize(text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def shingles(question: str, answer: str = "", size: int = DEDUP_SHINGLE_SIZE) -> Set[str]:
+    """
+    Character shingles of an FAQ.
+
+    Question shingles are tagged so a question never matches another
+    FAQ's answer text.
+    """
+    result: Set[str] = set()
+    for tag, text in (("q", question), ("a", answer)):
+        joined = " ".join(normalize(text))
+        if not joined:
+            continue
+        if len(joined) <= size:
+            result.add(tag + joined)
+        else:
+            result.update([tag + joined[i:i + size] for i in range(len(joined) - size + 1)])
+    return result
+
+
+def signature(items: Iterable[str], num_hashes: int = DEDUP_NUM_HASHES) -> Optional[Signature]:
+    """
+    One-permutation MinHash signature of a shingle set.
+
+    Returns:
+        Tuple of num_hashes integers, or None for an empty set
+    """
+    bins = [_MAX_HASH] * num_hashes
+    empty = True
+    for item in items:
+        # CRC32 spread over 64 bits by a multiplicative hash: a third of the cost of blake2b
+        value = (crc32(item.encode("utf-8")) * _MULTIPLIER) & _MAX_HASH
+        index = value % num_hashes
+        if value < bins[index]:
+            bins[index] = value
+            empty = False
+    if empty:
+        return None
+
+    # Rotation densification: an empty bin borrows the next filled bin to its right
+    densified = list(bins)
+    for index in range(num_hashes):
+        if bins[index] != _MAX_HASH:
+            continue
+        distance = 1
+        while bins[(index + distance) % num_hashes] == _MAX_HASH:
+            distance += 1
+        densified[index] = (bins[(index + distance) % num_hashes] + distance * _ROTATION_OFFSET) & _MAX_HASH
+    return tuple(densified)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(eq, a, b)) / len(a)
+
+
+def faq_signature(row: Dict[str, Any], num_hashes: int = DEDUP_NUM_HASHES) -> Optional[Signature]:
+    return signature(shingles(row.get("question") or "", row.get("answer") or ""), num_hashes)
+
+
+class DuplicateIndex:
+    """
+    LSH index of FAQ signatures.
+
+    With b bands of r rows, two FAQs of similarity s become candidates
+    with probability ``1 - (1 - s**r)**b``. The default 16 bands of 4
+    rows put the midpoint near 0.5, so pairs at the 0.6 reporting
+    threshold are found with 89% probability (99% at 0.7).
+    """
+
+    def __init__(
+        self,
+        num_hashes: int = DEDUP_NUM_HASHES,
+        bands: int = DEDUP_BANDS,
+        threshold: float = DEDUP_THRESHOLD,
+    ):
+        if num_hashes % bands:
+            raise ValueError("DEDUP_NUM_HASHES must be a multiple of DEDUP_BANDS")
+        self.num_hashes = num_hashes
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._signatures: Dict[str, Signature] = {}
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in range(self.bands)]
+
+    # ------------------------------------------------------------------
+    # Catalog listener interface
+    # ------------------------------------------------------------------
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(str(row["id"]), faq_signature(row, self.num_hashes))
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        faq_id = str(row["id"])
+        sig = faq_signature(row, self.num_hashes)
+        with self._lock:
+            if self._signatures.get(faq_id) == sig:
+                return
+            self._discard(faq_id)
+            self._add(faq_id, sig)
+
+    def remove(self, faq_id: str) -> None:
+        with self._lock:
+            self._discard(str(faq_id))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def find_similar(
+        self,
+        question: str,
+        answer: str = "",
+        exclude_id: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[Tuple[str, float]]:
+        """
+        Return indexed FAQs that are likely near-duplicates of the given text.
+
+        Args:
+            question: FAQ question
+            answer: FAQ answer
+            exclude_id: ID of the FAQ itself, when it is already indexed
+            limit: Maximum number of results
+
+        Returns:
+            List of (faq_id, estimated similarity), most similar first
+        """
+        sig = signature(shingles(question, answer), self.num_hashes)
+        if sig is None:
+            return []
+        with self._lock:
+            matches = [
+                (faq_id, round(similarity(sig, self._signatures[faq_id]), 3))
+                for faq_id in self._candidates(sig)
+                if faq_id != exclude_id
+            ]
+        matches = [match for match in matches if match[1] >= self.threshold]
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit]
+
+    def duplicate_pairs(self) -> List[Tuple[str, str, float]]:
+        """
+        Every indexed pair above the threshold, found through shared buckets.
+
+        Buckets larger than DEDUP_MAX_BUCKET_SIZE are skipped to keep the
+        pass from turning quadratic; true duplicates share most of their
+        bands and are still found through the others.
+
+        Returns:
+            List of (faq_id, faq_id, estimated similarity)
+        """
+        pairs: Dict[Tuple[str, str], float] = {}
+        skipped = 0
+        with self._lock:
+            for buckets in self._buckets:
+                for members in buckets.values():
+                    if len(members) < 2:
+                        continue
+                    if len(members) > DEDUP_MAX_BUCKET_SIZE:
+                        skipped += 1
+                        continue
+                    ordered = sorted(members)
+                    for i, first in enumerate(ordered):
+                        for second in ordered[i + 1:]:
+                            if (first, second) in pairs:
+                                continue
+                            pairs[(first, second)] = similarity(self._signatures[first], self._signatures[second])
+        if skipped:
+            logger.warning(f"Skipped {skipped} LSH buckets larger than {DEDUP_MAX_BUCKET_SIZE} FAQs")
+        return [(a, b, round(score, 3)) for (a, b), score in pairs.items() if score >= self.threshold]
+
+    def clusters(self) -> List[List[str]]:
+        """Group duplicate pairs into connected clusters, largest first."""
+        parent: Dict[str, str] = {}
+
+        def find(node: str) -> str:
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for first, second, _ in self.duplicate_pairs():
+            root_a, root_b = find(first), find(second)
+            if root_a != root_b:
+                parent[root_b] = root_a
+        groups: Dict[str, List[str]] = {}
+        for node in parent:
+            groups.setdefault(find(node), []).append(node)
+        return sorted((sorted(group) for group in groups.values()), key=len, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _band_keys(self, sig: Signature) -> List[int]:
+        return [hash(sig[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _candidates(self, sig: Signature) -> Set[str]:
+        found: Set[str] = set()
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            found.update(buckets.get(key, ()))
+        return found
+
+    def _add(self, faq_id: str, sig: Optional[Signature]) -> None:
+        if sig is None:
+            return
+        self._signatures[faq_id] = sig
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            buckets.setdefault(key, set()).add(faq_id)
+
+    def _discard(self, faq_id: str) -> None:
+        sig = self._signatures.pop(faq_id, None)
+        if sig is None:
+            return
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            members = buckets.get(key)
+            if members is not None:
+                members.discard(faq_id)
+                if not members:
+                    del buckets[key]
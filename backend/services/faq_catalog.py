@@ -0,0 +1,493 @@
+"""
+In-memory catalog of active FAQs.
+
+Loads every active FAQ once and keeps the set current from the cache
+invalidation bus. Search structures built over the FAQ corpus register
+as listeners and are updated incrementally as FAQs are written instead
+of being rebuilt from a table scan.
+
+A listener implements:
+    rebuild(rows): replace all contents
+    upsert(row): add or replace one FAQ
+    remove(faq_id): drop one FAQ
+and optionally:
+    restore(snapshot): replace all contents from a snapshot, returning
+        False when it cannot (the listener is then rebuilt from rows)
+    reweight(faq_id, view_count): take a new view count; listeners
+        without it are not told about views at all
+
+When a snapshot directory is configured, the first load maps the newest
+snapshot and fetches only the FAQs changed since its watermark instead
+of scanning the whole table. A ``builder`` may likewise hand full
+reloads a snapshot built from the loaded rows elsewhere (e.g. in the
+process pool), so restore-capable listeners are not rebuilt inline.
+
+Rows are held as CompactFAQ records keyed by 16-byte ID; ``get`` and
+``rows`` hand out PostgREST-shaped dicts, listeners see the rows as
+loaded or written.
+
+Staleness: changes made through other hosts arrive only with
+CACHE_BUS_PG_NOTIFY, and any host can miss events (restarts, dropped
+LISTEN connections). So once the last successful sync (full load or
+catch-up) is FAQ_CATALOG_MAX_STALENESS_SECONDS / 2 old, the next read
+starts a background catch-up of the FAQs changed since; past
+FAQ_CATALOG_MAX_STALENESS_SECONDS, ``ensure_loaded`` reports the catalog
+unavailable and reads go to Supabase until a sync succeeds.
+
+Changes applied while a full load is in flight are recorded and
+replayed over its result (unless the loaded row is newer), so a load
+that started before a write cannot undo it.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from services.compact_store import FAQ_CATEGORIES, CompactFAQ, RecordKey, record_key
+from services.index_snapshot import Snapshot, load_latest_snapshot
+
+logger = logging.getLogger(__name__)
+
+FAQ_CATALOG_MAX_ROWS = int(os.getenv("FAQ_CATALOG_MAX_ROWS", "100000"))
+FAQ_CATALOG_PAGE_SIZE = int(os.getenv("FAQ_CATALOG_PAGE_SIZE", "1000"))
+FAQ_CATALOG_RETRY_SECONDS = float(os.getenv("FAQ_CATALOG_RETRY_SECONDS", "10"))
+FAQ_CATALOG_MAX_STALENESS_SECONDS = float(os.getenv("FAQ_CATALOG_MAX_STALENESS_SECONDS", "300"))
+# Catch-ups refetch from this long before the previous sync started (commit lag, clock skew)
+FAQ_CATALOG_SYNC_OVERLAP_SECONDS = float(os.getenv("FAQ_CATALOG_SYNC_OVERLAP_SECONDS", "30"))
+
+
+class FAQCatalog:
+    """Active FAQs by ID, with change notification to registered indexes."""
+
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict[str, Any]]],
+        fetch_one: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+        changed_since: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+        snapshot_dir: Optional[str] = None,
+        builder: Optional[Callable[[List[Dict[str, Any]]], Optional[Snapshot]]] = None,
+    ):
+        """
+        Args:
+            loader: Callable returning every active FAQ; raises on failure
+            fetch_one: Optional callable returning a single FAQ by ID (None
+                if it no longer exists), used to refresh entries changed by
+                other workers; raises on failure
+            changed_since: Optional callable returning every FAQ (active or
+                not) updated at or after a timestamp; raises on failure
+            snapshot_dir: Directory of index snapshots to start from
+            builder: Optional callable returning a snapshot indexing the
+                given rows, or None to rebuild every listener inline
+        """
+        self._loader = loader
+        self._fetch_one = fetch_one
+        self._changed_since = changed_since
+        self._snapshot_dir = snapshot_dir
+        self._builder = builder
+        self._lock = threading.RLock()
+        self._rows: Dict[RecordKey, CompactFAQ] = {}
+        self._listeners: List[Any] = []
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faq-catalog")
+        self._loaded = False
+        self._next_load_attempt = 0.0
+        self._generation = 0
+        # IDs whose refetch failed, retried after FAQ_CATALOG_RETRY_SECONDS
+        self._pending: Set[str] = set()
+        self._retry: Optional[threading.Timer] = None
+        # Start of the last successful sync, monotonic and wall clock (catch-up watermark)
+        self._synced_at = 0.0
+        self._synced_wall: Optional[float] = None
+        self._catch_up_pending = False
+        # Changes applied while full loads are in flight, replayed over their results
+        self._journal: List[Tuple[str, Any]] = []
+        self._loads = 0
+        # Held by the full load in flight, so loads never run in parallel
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def generation(self) -> int:
+        """Incremented on every change, so derived data can tell it is stale."""
+        return self._generation
+
+    def add_listener(self, listener: Any) -> None:
+        """Register an index; it is rebuilt immediately if the catalog is loaded."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._loaded:
+                listener.rebuild(self.rows())
+
+    def ensure_loaded(self) -> bool:
+        """
+        Load the catalog on first use.
+
+        Returns:
+            True if the catalog is available, False if loading failed
+            or another request's load is still in flight
+        """
+        if self._loaded:
+            age = time.monotonic() - self._synced_at
+            if age > FAQ_CATALOG_MAX_STALENESS_SECONDS / 2:
+                self._schedule_catch_up()
+            return age <= FAQ_CATALOG_MAX_STALENESS_SECONDS
+        if time.monotonic() < self._next_load_attempt:
+            return False
+        # Requests arriving while another one loads go to Supabase meanwhile
+        if not self._load_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._loaded:
+                return True
+            if time.monotonic() < self._next_load_attempt:
+                return False
+            return self._restore_snapshot() or self._refresh()
+        finally:
+            self._load_lock.release()
+
+    def restore_snapshot(self) -> bool:
+        """
+        Load the catalog from the newest snapshot plus the changes since it.
+
+        Listeners able to restore from the snapshot map it; the others
+        are rebuilt from its rows. Waits for a load already in flight.
+
+        Returns:
+            True on success, False if no usable snapshot or catch-up failed
+        """
+        with self._load_lock:
+            return self._restore_snapshot()
+
+    def refresh(self) -> bool:
+        """
+        Reload every active FAQ and rebuild all listeners.
+
+        Waits for a load already in flight, so a scheduled refresh never
+        overlaps one started by a request.
+
+        Returns:
+            True on success, False if the loader failed
+        """
+        with self._load_lock:
+            return self._refresh()
+
+    def _restore_snapshot(self) -> bool:
+        if self._changed_since is None:
+            return False
+        snapshot = load_latest_snapshot(self._snapshot_dir)
+        if snapshot is None:
+            return False
+
+        started = time.perf_counter()
+        synced_at, synced_wall = time.monotonic(), time.time()
+        mark = self._begin_load()
+        try:
+            try:
+                rows = snapshot.rows()
+                changes = self._changed_since(snapshot.catch_up_since())
+            except Exception as e:
+                logger.error(f"Failed to restore FAQ catalog from {snapshot.path}: {str(e)}")
+                return False
+
+            with self._lock:
+                self._replace(rows, snapshot)
+                # The catch-up window overlaps the snapshot; rows it already holds are skipped
+                changes = [row for row in changes if self._rows.get(record_key(row["id"])) != CompactFAQ(row)]
+                for row in changes:
+                    self._apply(row)
+                self._replay(mark)
+                self._mark_synced(synced_at, synced_wall)
+        finally:
+            self._end_load()
+        logger.info(
+            f"FAQ catalog restored with {len(self._rows)} FAQs from {snapshot.path} "
+            f"(watermark {snapshot.watermark}, {len(changes)} changes caught up, "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms)"
+        )
+        return True
+
+    def _refresh(self) -> bool:
+        synced_at, synced_wall = time.monotonic(), time.time()
+        mark = self._begin_load()
+        try:
+            try:
+                rows = self._loader()
+            except Exception as e:
+                logger.error(f"Failed to load FAQ catalog: {str(e)}")
+                self._next_load_attempt = time.monotonic() + FAQ_CATALOG_RETRY_SECONDS
+                return False
+
+            started = time.perf_counter()
+            rows = [row for row in rows if row.get("is_active", True)]
+            snapshot = None
+            if self._builder is not None:
+                try:
+                    snapshot = self._builder(rows)
+                except Exception as e:
+                    logger.error(f"Failed to build FAQ index snapshot, rebuilding inline: {str(e)}")
+            with self._lock:
+                self._replace(rows, snapshot)
+                replayed = self._replay(mark)
+                self._mark_synced(synced_at, synced_wall)
+        finally:
+            self._end_load()
+        if replayed:
+            logger.info(f"Replayed {replayed} FAQ changes made during the catalog load")
+        logger.info(
+            f"FAQ catalog loaded with {len(self._rows)} FAQs "
+            f"(indexes built in {(time.perf_counter() - started) * 1000:.1f} ms"
+            f"{', from a prebuilt snapshot' if snapshot is not None else ''})"
+        )
+        return True
+
+    def catch_up(self) -> bool:
+        """
+        Apply every FAQ changed since the last sync (with an overlap).
+
+        Unlike refresh, the catalog is not replaced, so changes applied
+        meanwhile stay; rows older than the cached version are skipped.
+        Falls back to a full refresh before the first sync.
+
+        Returns:
+            True on success, False if the fetch failed
+        """
+        if self._changed_since is None or self._synced_wall is None or not self._loaded:
+            return self.refresh()
+        synced_at, synced_wall = time.monotonic(), time.time()
+        since = datetime.utcfromtimestamp(self._synced_wall - FAQ_CATALOG_SYNC_OVERLAP_SECONDS).isoformat()
+        try:
+            changes = self._changed_since(since)
+        except Exception as e:
+            logger.error(f"Failed to catch up FAQ catalog since {since}: {str(e)}")
+            return False
+        with self._lock:
+            applied = sum(self._apply_if_newer(row) for row in changes)
+            self._mark_synced(synced_at, synced_wall)
+        logger.info(f"FAQ catalog caught up with {applied} changes since {since}")
+        return True
+
+    def get(self, faq_id: str) -> Optional[Dict[str, Any]]:
+        record = self._rows.get(record_key(faq_id))
+        return record.to_row() if record is not None else None
+
+    def get_record(self, faq_id: str) -> Optional[CompactFAQ]:
+        return self._rows.get(record_key(faq_id))
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Return a snapshot list of all active FAQs."""
+        with self._lock:
+            records = list(self._rows.values())
+        return [record.to_row() for record in records]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 100
+    ) -> List[CompactFAQ]:
+        """
+        Return the newest FAQs matching the filters.
+
+        Args:
+            category: Optional category filter
+            tag: Optional tag filter
+            limit: Maximum number of FAQs to return
+
+        Returns:
+            Records ordered by created_at, newest first
+        """
+        with self._lock:
+            records = list(self._rows.values())
+        if category is not None:
+            code = FAQ_CATEGORIES.find(category)
+            records = [record for record in records if record.category == code]
+        if tag is not None:
+            tag = tag.lower().strip()
+            records = [record for record in records if tag in record.tags]
+        return heapq.nlargest(limit, records, key=lambda record: record.created_at or 0.0)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Apply a created or updated FAQ row."""
+        with self._lock:
+            if self._loads:
+                self._journal.append(("upsert", row))
+            if self._loaded:
+                self._apply(row)
+
+    def update_views(self, row: Dict[str, Any]) -> None:
+        """
+        Apply an FAQ row whose view count was incremented.
+
+        Only the cached view count (and the updated_at the increment
+        stamped) change. The generation is not bumped and only
+        listeners implementing ``reweight`` are called, as nothing
+        derived from the FAQ's content is affected.
+        """
+        with self._lock:
+            if self._loads:
+                self._journal.append(("views", row))
+            if self._loaded:
+                self._update_views(CompactFAQ(row))
+
+    def remove(self, faq_id: str) -> None:
+        """Drop an FAQ (e.g. after a soft delete)."""
+        with self._lock:
+            if self._loads:
+                self._journal.append(("remove", str(faq_id)))
+            if self._loaded:
+                self._remove(str(faq_id))
+
+    def apply_event(self, key: Optional[str], op: str, payload: Optional[Dict[str, Any]]) -> None:
+        """
+        Invalidation bus callback for the faqs namespace.
+
+        Local writes carry the written row and are applied directly.
+        Changes from other workers only carry the ID: the entry is
+        refetched in the background and the cached version kept until
+        the refetch succeeds. Failed refetches are retried.
+        """
+        if not self._loaded and not self._loads:
+            return
+        if key is None:
+            self._refresher.submit(self.refresh)
+            return
+        if payload is not None:
+            self.upsert(payload)
+            return
+        if op == "delete" or self._fetch_one is None:
+            self.remove(key)
+            return
+        self._refresher.submit(self._refetch, key)
+
+    def _refetch(self, faq_id: str) -> None:
+        try:
+            row = self._fetch_one(faq_id)
+        except Exception as e:
+            logger.error(f"Failed to refetch FAQ {faq_id}, retrying in {FAQ_CATALOG_RETRY_SECONDS:.0f} s: {str(e)}")
+            with self._lock:
+                self._pending.add(faq_id)
+                if self._retry is None:
+                    self._retry = threading.Timer(FAQ_CATALOG_RETRY_SECONDS, self._retry_pending)
+                    self._retry.daemon = True
+                    self._retry.start()
+            return
+        if row is not None:
+            self.upsert(row)
+        else:
+            self.remove(faq_id)
+
+    def _retry_pending(self) -> None:
+        with self._lock:
+            pending, self._pending, self._retry = self._pending, set(), None
+        for faq_id in pending:
+            self._refresher.submit(self._refetch, faq_id)
+
+    def _schedule_catch_up(self) -> None:
+        with self._lock:
+            if self._catch_up_pending:
+                return
+            self._catch_up_pending = True
+        self._refresher.submit(self._run_catch_up)
+
+    def _run_catch_up(self) -> None:
+        try:
+            self.catch_up()
+        finally:
+            self._catch_up_pending = False
+
+    def _mark_synced(self, synced_at: float, synced_wall: float) -> None:
+        if synced_at > self._synced_at:
+            self._synced_at, self._synced_wall = synced_at, synced_wall
+
+    def _begin_load(self) -> int:
+        """Start journaling changes; returns the journal position of this load."""
+        with self._lock:
+            self._loads += 1
+            return len(self._journal)
+
+    def _end_load(self) -> None:
+        with self._lock:
+            self._loads -= 1
+            if not self._loads:
+                self._journal = []
+
+    def _replay(self, mark: int) -> int:
+        """Re-apply the changes journaled since mark over freshly loaded rows."""
+        replayed = 0
+        for op, value in self._journal[mark:]:
+            if op == "remove":
+                self._remove(value)
+                replayed += 1
+            elif op == "views":
+                replayed += self._update_views(CompactFAQ(value))
+            else:
+                replayed += self._apply_if_newer(value)
+        return replayed
+
+    def _apply_if_newer(self, row: Dict[str, Any]) -> bool:
+        """Apply row unless the cached version is newer or the same."""
+        record = CompactFAQ(row)
+        current = self._rows.get(record.key)
+        if current is not None and (current == record or (
+            current.updated_at is not None and record.updated_at is not None and record.updated_at < current.updated_at
+        )):
+            return False
+        if current is None and not record.is_active:
+            return False
+        self._apply(row)
+        return True
+
+    def _apply(self, row: Dict[str, Any]) -> None:
+        if not row.get("is_active", True):
+            self._remove(str(row["id"]))
+            return
+        record = CompactFAQ(row)
+        current = self._rows.get(record.key)
+        if current is not None and current.same_content(record):
+            # A view increment (e.g. refetched after another worker's event): not a content change
+            self._update_views(record)
+            return
+        self._rows[record.key] = record
+        self._generation += 1
+        for listener in self._listeners:
+            listener.upsert(row)
+
+    def _update_views(self, record: CompactFAQ) -> bool:
+        """Copy record's view count onto the cached FAQ unless the cached one is newer."""
+        current = self._rows.get(record.key)
+        if current is None or current.view_count == record.view_count or (
+            current.updated_at is not None and record.updated_at is not None and record.updated_at < current.updated_at
+        ):
+            return False
+        current.view_count = record.view_count
+        current.updated_at = record.updated_at
+        for listener in self._listeners:
+            reweight = getattr(listener, "reweight", None)
+            if reweight is not None:
+                reweight(current.id, current.view_count)
+        return True
+
+    def _replace(self, rows: List[Dict[str, Any]], snapshot: Optional[Snapshot]) -> None:
+        self._rows = {record.key: record for record in map(CompactFAQ, rows)}
+        self._generation += 1
+        for listener in self._listeners:
+            restore = getattr(listener, "restore", None) if snapshot is not None else None
+            if restore is None or not restore(snapshot):
+                listener.rebuild(rows)
+        self._loaded = True
+
+    def _remove(self, faq_id: str) -> None:
+        if self._rows.pop(record_key(faq_id), None) is not None:
+            self._generation += 1
+            for listener in self._listeners:
+                listener.remove(faq_id)
@@ -0,0 +1,567 @@
+"""
+Typo-tolerant FAQ retrieval.
+
+Builds a weighted inverted index over FAQ questions, tags and answers,
+plus a SymSpell-style symmetric-delete dictionary over the vocabulary.
+Misspelled query words ("hostle", "libary", "fess") are corrected by
+looking up their deletes in the dictionary and verifying candidates
+with a bounded Damerau-Levenshtein distance, so correction costs a few
+hash lookups instead of a scan of the vocabulary.
+
+The index is maintained incrementally as a FAQCatalog listener. It can
+also be restored from a memory-mapped snapshot (see index_snapshot):
+the snapshot serves as a read-only base layer, and FAQs written after
+it are tombstoned there and indexed in memory on top.
+"""
+
+import heapq
+import math
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from services.index_snapshot import Snapshot, pack_strings
+
+FUZZY_MAX_EDIT_DISTANCE = int(os.getenv("FUZZY_MAX_EDIT_DISTANCE", "1"))
+FUZZY_PREFIX_LENGTH = int(os.getenv("FUZZY_PREFIX_LENGTH", "7"))
+FUZZY_MAX_PREFIX_EXPANSIONS = int(os.getenv("FUZZY_MAX_PREFIX_EXPANSIONS", "50"))
+# Words in more than this share of FAQs never add new candidates on their own
+FUZZY_COMMON_WORD_RATIO = float(os.getenv("FUZZY_COMMON_WORD_RATIO", "0.05"))
+FUZZY_COMMON_WORD_MIN_DOCS = int(os.getenv("FUZZY_COMMON_WORD_MIN_DOCS", "200"))
+FUZZY_SNAPSHOT_WORD_CACHE = int(os.getenv("FUZZY_SNAPSHOT_WORD_CACHE", "50000"))
+
+FIELD_WEIGHTS = {"question": 3.0, "tags": 2.0, "answer": 1.0}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it me my of on or "
+    "the to was we what when where which who why will with you your".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into alphanumeric words."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance between a and b.
+
+    Counts insertions, deletions, substitutions and adjacent
+    transpositions. Returns max_distance + 1 as soon as the distance is
+    known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous_previous is not None and j > 1
+                and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """Return every string obtained by deleting up to max_distance characters from word."""
+    results: Set[str] = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            if len(candidate) <= 1:
+                continue
+            for i in range(len(candidate)):
+                deleted = candidate[:i] + candidate[i + 1:]
+                if deleted not in results:
+                    results.add(deleted)
+                    next_frontier.add(deleted)
+        frontier = next_frontier
+    return results
+
+
+class _SnapshotLayer:
+    """
+    Read-only index over the ``fuzzy.*`` sections of a snapshot.
+
+    Documents are numbered in ID order and words in sorted order, so
+    both are found by binary search in the mapped string tables, and
+    each word's posting is a slice of the slot and weight arrays with
+    slots ascending.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.doc_ids = snapshot.strings("fuzzy.doc_ids")
+        self.doc_categories = snapshot.array("fuzzy.doc_categories", "H")
+        self.categories: List[Optional[str]] = [None, *snapshot.strings("fuzzy.categories")]
+        self.words = snapshot.strings("fuzzy.words")
+        self.posting_offsets = snapshot.array("fuzzy.posting_offsets", "Q")
+        self.posting_slots = snapshot.array("fuzzy.posting_slots", "I")
+        self.posting_weights = snapshot.array("fuzzy.posting_weights", "f")
+        self.delete_keys = snapshot.strings("fuzzy.delete_keys")
+        self.delete_offsets = snapshot.array("fuzzy.delete_offsets", "Q")
+        self.delete_words = snapshot.array("fuzzy.delete_words", "I")
+        # Binary searches of the mapped table decode strings; remember queried words
+        self._word_cache: Dict[str, Optional[int]] = {}
+
+    def word_id(self, word: str) -> Optional[int]:
+        try:
+            return self._word_cache[word]
+        except KeyError:
+            pass
+        if len(self._word_cache) >= FUZZY_SNAPSHOT_WORD_CACHE:
+            self._word_cache.clear()
+        word_id = self._word_cache[word] = self.words.find(word)
+        return word_id
+
+    def frequency(self, word_id: int) -> int:
+        return self.posting_offsets[word_id + 1] - self.posting_offsets[word_id]
+
+    def posting(self, word_id: int) -> Tuple[memoryview, memoryview]:
+        start, end = self.posting_offsets[word_id], self.posting_offsets[word_id + 1]
+        return self.posting_slots[start:end], self.posting_weights[start:end]
+
+    def deleted(self, key: str) -> memoryview:
+        """Word IDs whose prefix becomes key after deletes."""
+        position = self.delete_keys.find(key)
+        if position is None:
+            return self.delete_words[0:0]
+        return self.delete_words[self.delete_offsets[position]:self.delete_offsets[position + 1]]
+
+
+class FuzzyIndex:
+    """
+    Weighted inverted index with symmetric-delete spelling correction.
+
+    Documents are FAQ rows; each word's posting maps a document slot to
+    the summed field weight of its occurrences. Scores are
+    ``sum(idf(word) * weight * match_penalty)`` over query words, where
+    exact matches count fully, one-edit corrections by half and prefix
+    completions of the last query word by a third.
+
+    Query words are processed rarest first. Once candidates exist, very
+    common words only add to the scores of documents already found
+    instead of walking postings that cover most of the corpus.
+
+    After ``restore()`` the snapshot's documents occupy the first slots
+    and in-memory documents follow. Document frequencies count
+    tombstoned snapshot documents until the next snapshot, which skews
+    idf only by the share of FAQs changed since it was built.
+    """
+
+    def __init__(self, max_distance: int = FUZZY_MAX_EDIT_DISTANCE, prefix_length: int = FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._base: Optional[_SnapshotLayer] = None
+        # Slots below _offset belong to the snapshot; _dead holds the replaced ones
+        self._offset = 0
+        self._dead: Set[int] = set()
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_categories: List[Optional[str]] = []
+        self._doc_words: List[Tuple[int, ...]] = []
+        self._slots: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+        self._word_ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._sorted_words: List[str] = []
+        self._postings: List[Dict[int, float]] = []
+        self._deletes: Dict[str, List[int]] = {}
+
+    # ------------------------------------------------------------------
+    # Catalog listener interface
+    # ------------------------------------------------------------------
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(row)
+
+    def restore(self, snapshot: Snapshot) -> bool:
+        """
+        Replace all contents with the index stored in a snapshot.
+
+        Returns:
+            False if the snapshot was built with different index settings
+        """
+        if snapshot.meta.get("fuzzy") != self.snapshot_meta():
+            return False
+        with self._lock:
+            self._clear()
+            self._base = _SnapshotLayer(snapshot)
+            self._offset = len(self._base.doc_ids)
+        return True
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._discard(str(row["id"]))
+            self._add(row)
+
+    def remove(self, faq_id: str) -> None:
+        with self._lock:
+            self._discard(str(faq_id))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, limit: int = 10, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Return the best matching FAQs for query.
+
+        Args:
+            query: Free text, possibly misspelled
+            limit: Maximum number of results
+            category: Optional category filter
+
+        Returns:
+            List of (faq_id, score) tuples, best first
+        """
+        tokens = tokenize(query)
+        content = [token for token in tokens if token not in STOPWORDS]
+        tokens = content or tokens
+        if not tokens:
+            return []
+
+        with self._lock:
+            live_docs = self._live_docs() or 1
+            expanded = []
+            for position, token in enumerate(tokens):
+                matches = self._expand(token, allow_prefix=position == len(tokens) - 1)
+                if matches:
+                    expanded.append((sum(frequency for _, _, frequency in matches), matches))
+
+            # Rare words select the candidates; postings of words matching a
+            # large share of the corpus are only probed for those candidates
+            expanded.sort(key=lambda item: item[0])
+            common = max(FUZZY_COMMON_WORD_MIN_DOCS, int(live_docs * FUZZY_COMMON_WORD_RATIO))
+            scores: Dict[int, float] = {}
+            for frequency, matches in expanded:
+                probe_only = bool(scores) and frequency > common
+                best_for_doc: Dict[int, float] = {}
+                for word, penalty, word_frequency in matches:
+                    idf = math.log(1 + live_docs / word_frequency)
+                    pairs = self._probe(word, scores) if probe_only else self._posting(word)
+                    for slot, weight in pairs:
+                        contribution = idf * weight * penalty
+                        if contribution > best_for_doc.get(slot, 0.0):
+                            best_for_doc[slot] = contribution
+                for slot, contribution in best_for_doc.items():
+                    scores[slot] = scores.get(slot, 0.0) + contribution
+
+            if category is not None:
+                scores = {slot: score for slot, score in scores.items() if self._category(slot) == category}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._doc_id(slot), round(score, 4)) for slot, score in best]
+
+    def correct(self, word: str) -> List[str]:
+        """Return vocabulary words within the edit distance of word, closest first."""
+        with self._lock:
+            return [match for match, _, _ in self._expand(word.lower(), allow_prefix=False)]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return index sizes and an approximate memory footprint.
+
+        The byte estimate counts container and string objects owned by
+        the index (not the FAQ rows themselves, nor the mapped snapshot,
+        whose pages are shared between workers).
+        """
+        with self._lock:
+            postings_entries = sum(len(posting) for posting in self._postings)
+            delete_entries = sum(len(ids) for ids in self._deletes.values())
+            approx = (
+                sys.getsizeof(self._deletes)
+                + sum(sys.getsizeof(key) + sys.getsizeof(ids) for key, ids in self._deletes.items())
+                + sum(sys.getsizeof(posting) for posting in self._postings)
+                + sys.getsizeof(self._word_ids)
+                + sum(sys.getsizeof(word) for word in self._words)
+                + sys.getsizeof(self._sorted_words)
+                + sum(sys.getsizeof(words) for words in self._doc_words)
+            )
+            stats = {
+                "documents": self._live_docs(),
+                "vocabulary": len(self._words),
+                "postings": postings_entries,
+                "deletes": len(self._deletes),
+                "delete_entries": delete_entries,
+                "approx_bytes": approx,
+            }
+            if self._base is not None:
+                stats.update({
+                    "snapshot_documents": self._offset,
+                    "snapshot_vocabulary": len(self._base.words),
+                    "snapshot_postings": len(self._base.posting_slots),
+                    "snapshot_tombstones": len(self._dead),
+                    "snapshot_bytes": len(self._base.snapshot),
+                })
+            return stats
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def snapshot_meta(self) -> Dict[str, Any]:
+        """Settings a snapshot must have been built with to be restored here."""
+        return {"max_distance": self.max_distance, "prefix_length": self.prefix_length, "field_weights": FIELD_WEIGHTS}
+
+    def snapshot_sections(self) -> Dict[str, bytes]:
+        """
+        Serialize the index as ``fuzzy.*`` snapshot sections.
+
+        Raises:
+            ValueError: If the index itself was restored from a snapshot
+        """
+        with self._lock:
+            if self._base is not None:
+                raise ValueError("Only an index built from rows can be written to a snapshot")
+            doc_ids = sorted(self._slots)
+            renumbered = {self._slots[faq_id]: position for position, faq_id in enumerate(doc_ids)}
+            doc_categories = [self._doc_categories[self._slots[faq_id]] for faq_id in doc_ids]
+            categories = sorted({category for category in doc_categories if category is not None})
+            category_ids = {category: position + 1 for position, category in enumerate(categories)}
+
+            words = sorted(word for word, word_id in self._word_ids.items() if self._postings[word_id])
+            posting_offsets, posting_slots, posting_weights = array("Q", [0]), array("I"), array("f")
+            for word in words:
+                for slot, weight in sorted(
+                    (renumbered[slot], weight) for slot, weight in self._postings[self._word_ids[word]].items()
+                ):
+                    posting_slots.append(slot)
+                    posting_weights.append(weight)
+                posting_offsets.append(len(posting_slots))
+
+            deletes: Dict[str, List[int]] = {}
+            for word_id, word in enumerate(words):
+                prefix = word[:self.prefix_length]
+                for deleted in _deletes(prefix, self.max_distance) | {prefix}:
+                    if deleted != word:
+                        deletes.setdefault(deleted, []).append(word_id)
+            delete_keys = sorted(deletes)
+            delete_offsets, delete_words = array("Q", [0]), array("I")
+            for key in delete_keys:
+                delete_words.extend(deletes[key])
+                delete_offsets.append(len(delete_words))
+
+        sections = {
+            "fuzzy.doc_categories": array("H", (category_ids.get(category, 0) for category in doc_categories)).tobytes(),
+            "fuzzy.posting_offsets": posting_offsets.tobytes(),
+            "fuzzy.posting_slots": posting_slots.tobytes(),
+            "fuzzy.posting_weights": posting_weights.tobytes(),
+            "fuzzy.delete_offsets": delete_offsets.tobytes(),
+            "fuzzy.delete_words": delete_words.tobytes(),
+        }
+        for name, values in (("doc_ids", doc_ids), ("categories", categories), ("words", words), ("delete_keys", delete_keys)):
+            for part, data in pack_strings(values).items():
+                sections[f"fuzzy.{name}.{part}"] = data
+        return sections
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _live_docs(self) -> int:
+        return len(self._slots) + self._offset - len(self._dead)
+
+    def _doc_id(self, slot: int) -> str:
+        if slot < self._offset:
+            return self._base.doc_ids[slot]
+        return self._doc_ids[slot - self._offset]
+
+    def _category(self, slot: int) -> Optional[str]:
+        if slot < self._offset:
+            return self._base.categories[self._base.doc_categories[slot]]
+        return self._doc_categories[slot - self._offset]
+
+    def _frequency(self, word: str) -> int:
+        """Number of documents containing word."""
+        frequency = 0
+        word_id = self._word_ids.get(word)
+        if word_id is not None:
+            frequency = len(self._postings[word_id])
+        if self._base is not None:
+            base_id = self._base.word_id(word)
+            if base_id is not None:
+                frequency += self._base.frequency(base_id)
+        return frequency
+
+    def _posting(self, word: str) -> Iterator[Tuple[int, float]]:
+        """(slot, weight) pairs of every live document containing word."""
+        word_id = self._word_ids.get(word)
+        if word_id is not None:
+            yield from self._postings[word_id].items()
+        if self._base is not None:
+            base_id = self._base.word_id(word)
+            if base_id is not None:
+                slots, weights = self._base.posting(base_id)
+                dead = self._dead
+                for slot, weight in zip(slots, weights):
+                    if slot not in dead:
+                        yield slot, weight
+
+    def _probe(self, word: str, candidates: Dict[int, float]) -> Iterator[Tuple[int, float]]:
+        """(slot, weight) pairs of the candidate documents containing word."""
+        word_id = self._word_ids.get(word)
+        posting = self._postings[word_id] if word_id is not None else {}
+        base_slots = base_weights = None
+        if self._base is not None:
+            base_id = self._base.word_id(word)
+            if base_id is not None:
+                base_slots, base_weights = self._base.posting(base_id)
+        # Walking a short snapshot posting beats a binary search per candidate
+        walk = base_slots is not None and len(base_slots) < 16 * len(candidates)
+        if walk:
+            dead = self._dead
+            for slot, weight in zip(base_slots, base_weights):
+                if slot in candidates and slot not in dead:
+                    yield slot, weight
+        for slot in candidates:
+            if slot >= self._offset:
+                weight = posting.get(slot)
+                if weight is not None:
+                    yield slot, weight
+            elif base_slots is not None and not walk and slot not in self._dead:
+                position = bisect_left(base_slots, slot)
+                if position < len(base_slots) and base_slots[position] == slot:
+                    yield slot, base_weights[position]
+
+    def _prefixed(self, prefix: str) -> Iterator[str]:
+        """Vocabulary words starting with prefix, in sorted order."""
+        def starting_with(sorted_words) -> Iterator[str]:
+            position = bisect_left(sorted_words, prefix)
+            while position < len(sorted_words) and sorted_words[position].startswith(prefix):
+                yield sorted_words[position]
+                position += 1
+
+        if self._base is None:
+            return starting_with(self._sorted_words)
+        return merge(starting_with(self._sorted_words), starting_with(self._base.words))
+
+    def _expand(self, token: str, allow_prefix: bool) -> List[Tuple[str, float, int]]:
+        """Map a query word to (word, penalty, frequency) triples for exact, corrected and prefix matches."""
+        frequency = self._frequency(token)
+        if frequency:
+            matches = [(token, 1.0, frequency)]
+        else:
+            matches = self._corrections(token)
+        if allow_prefix and len(token) >= 3:
+            seen = {match[0] for match in matches}
+            expansions = 0
+            for candidate in self._prefixed(token):
+                if expansions >= FUZZY_MAX_PREFIX_EXPANSIONS:
+                    break
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                frequency = self._frequency(candidate)
+                if frequency:
+                    matches.append((candidate, 1.0 / 3, frequency))
+                    expansions += 1
+        return matches
+
+    def _corrections(self, token: str) -> List[Tuple[str, float, int]]:
+        if self.max_distance <= 0:
+            return []
+        prefix = token[:self.prefix_length]
+        # Vocabulary words equal to a delete of the prefix, or sharing one
+        keys = _deletes(prefix, self.max_distance) | {prefix}
+        candidates: Set[str] = set(keys)
+        for key in keys:
+            candidates.update(self._words[word_id] for word_id in self._deletes.get(key, ()))
+            if self._base is not None:
+                candidates.update(self._base.words[word_id] for word_id in self._base.deleted(key))
+
+        best: List[Tuple[str, int, int]] = []
+        for candidate in candidates:
+            distance = edit_distance(token, candidate, self.max_distance)
+            if distance > self.max_distance:
+                continue
+            frequency = self._frequency(candidate)
+            if frequency:
+                best.append((candidate, distance, frequency))
+        if not best:
+            return []
+        closest = min(distance for _, distance, _ in best)
+        return [(candidate, 0.5 ** distance, frequency) for candidate, distance, frequency in best if distance == closest]
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is not None:
+            return word_id
+        word_id = len(self._words)
+        self._word_ids[word] = word_id
+        self._words.append(word)
+        self._postings.append({})
+        insort(self._sorted_words, word)
+        prefix = word[:self.prefix_length]
+        for deleted in _deletes(prefix, self.max_distance) | {prefix}:
+            if deleted == word:
+                continue
+            self._deletes.setdefault(deleted, []).append(word_id)
+        return word_id
+
+    def _add(self, row: Dict[str, Any]) -> None:
+        faq_id = str(row["id"])
+        weights: Dict[int, float] = {}
+        fields = (
+            ("question", row.get("question") or ""),
+            ("tags", " ".join(row.get("tags") or [])),
+            ("answer", row.get("answer") or ""),
+        )
+        for field, text in fields:
+            for word in set(tokenize(text)):
+                word_id = self._word_id(word)
+                weights[word_id] = weights.get(word_id, 0.0) + FIELD_WEIGHTS[field]
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._doc_ids[slot - self._offset] = faq_id
+            self._doc_categories[slot - self._offset] = row.get("category")
+            self._doc_words[slot - self._offset] = tuple(weights)
+        else:
+            slot = self._offset + len(self._doc_ids)
+            self._doc_ids.append(faq_id)
+            self._doc_categories.append(row.get("category"))
+            self._doc_words.append(tuple(weights))
+        self._slots[faq_id] = slot
+        for word_id, weight in weights.items():
+            self._postings[word_id][slot] = weight
+
+    def _discard(self, faq_id: str) -> None:
+        slot = self._slots.pop(faq_id, None)
+        if slot is None:
+            if self._base is not None:
+                base_slot = self._base.doc_ids.find(faq_id)
+                if base_slot is not None:
+                    self._dead.add(base_slot)
+            return
+        for word_id in self._doc_words[slot - self._offset]:
+            self._postings[word_id].pop(slot, None)
+        self._doc_ids[slot - self._offset] = None
+        self._doc_categories[slot - self._offset] = None
+        self._doc_words[slot - self._offset] = ()
+        self._free_slots.append(slot)
@@ -0,0 +1,244 @@
+"""
+Versioned on-disk snapshots of the FAQ corpus and its search index.
+
+A snapshot is built by a background job (``scripts/build_faq_snapshot.py``)
+and loaded by workers with ``mmap``, so every worker on a host shares
+the same page cache copy of the index instead of rebuilding it from a
+full ``faqs`` table scan. After loading, a worker only fetches FAQs
+updated since the snapshot's watermark.
+
+File layout (native byte order, recorded in the header)::
+
+    magic   8 bytes  b"FAQSNAP\\0"
+    version uint32   SNAPSHOT_FORMAT_VERSION
+    length  uint32   length of the JSON header
+    header  JSON     watermark, metadata and {section: [offset, length]}
+    sections         each aligned to 8 bytes
+
+Sections are flat arrays (``array`` typecodes) or string tables: an
+array of uint64 offsets plus one UTF-8 blob, so the i-th string is
+sliced out of the map without parsing anything else. Files are named
+``faq-index-<timestamp>.v<version>.snap`` and published by atomic
+rename; workers pick the newest file of their format version.
+"""
+
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+FAQ_SNAPSHOT_DIR = os.getenv("FAQ_SNAPSHOT_DIR") or None
+FAQ_SNAPSHOT_KEEP = int(os.getenv("FAQ_SNAPSHOT_KEEP", "3"))
+# Catch-up re-reads this much before the watermark, covering transactions
+# that committed after the snapshot scan with an earlier updated_at
+FAQ_SNAPSHOT_OVERLAP_SECONDS = float(os.getenv("FAQ_SNAPSHOT_OVERLAP_SECONDS", "300"))
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_PREFIX = "faq-index-"
+SNAPSHOT_SUFFIX = f".v{SNAPSHOT_FORMAT_VERSION}.snap"
+
+_MAGIC = b"FAQSNAP\0"
+_PREAMBLE = struct.Struct("=8sII")
+_ALIGN = 8
+
+
+class StringTable(Sequence):
+    """Read-only strings stored as offsets into a UTF-8 blob."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def bisect_left(self, value: str) -> int:
+        """Insertion point of value; the table must be sorted."""
+        return bisect.bisect_left(self, value)
+
+    def find(self, value: str) -> Optional[int]:
+        """Index of value in a sorted table, or None."""
+        position = bisect.bisect_left(self, value)
+        if position < len(self) and self[position] == value:
+            return position
+        return None
+
+
+def pack_strings(values: Iterable[str]) -> Dict[str, bytes]:
+    """Encode strings as the ``offsets`` and ``data`` parts of a string table."""
+    offsets = array("Q", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return {"offsets": offsets.tobytes(), "data": bytes(blob)}
+
+
+class Snapshot:
+    """A memory-mapped snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, version, length = _PREAMBLE.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_FORMAT_VERSION} FAQ snapshot")
+        header = json.loads(bytes(self._view[_PREAMBLE.size:_PREAMBLE.size + length]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian host")
+        self.watermark: str = header["watermark"]
+        self.created_at: str = header["created_at"]
+        self.meta: Dict[str, Any] = header["meta"]
+        self._sections: Dict[str, List[int]] = header["sections"]
+
+    def section(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def array(self, name: str, typecode: str) -> memoryview:
+        """A section as a typed array view (e.g. ``"I"`` for uint32)."""
+        return self.section(name).cast(typecode)
+
+    def strings(self, name: str) -> StringTable:
+        return StringTable(self.array(f"{name}.offsets", "Q"), self.section(f"{name}.data"))
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Decode the FAQ rows stored in the snapshot."""
+        return [json.loads(row) for row in self.strings("rows")]
+
+    def catch_up_since(self) -> str:
+        """Timestamp after which rows must be refetched to bring the snapshot current."""
+        watermark = datetime.fromisoformat(self.watermark).replace(tzinfo=timezone.utc)
+        moment = watermark.timestamp() - FAQ_SNAPSHOT_OVERLAP_SECONDS
+        return datetime.utcfromtimestamp(moment).isoformat()
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+
+def write_snapshot(
+    directory: str,
+    rows: List[Dict[str, Any]],
+    watermark: str,
+    sections: Dict[str, bytes],
+    meta: Optional[Dict[str, Any]] = None,
+    keep: int = FAQ_SNAPSHOT_KEEP
+) -> str:
+    """
+    Write and publish a snapshot, then prune old ones.
+
+    Workers that still have a pruned file mapped keep reading it; the
+    pages are released when they unmap it.
+
+    Args:
+        directory: Snapshot directory
+        rows: FAQ rows, stored in the ``rows`` string table
+        watermark: Naive UTC ISO timestamp of the newest change included
+        sections: Additional sections by name
+        meta: Metadata recorded in the header
+        keep: Number of snapshots to keep (including this one)
+
+    Returns:
+        Path of the published snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    parts: Dict[str, bytes] = {}
+    for name, value in pack_strings(json.dumps(row, default=str, separators=(",", ":")) for row in rows).items():
+        parts[f"rows.{name}"] = value
+    parts.update(sections)
+
+    # Section offsets depend on the header length, which depends on the offsets
+    header: Dict[str, Any] = {
+        "watermark": watermark,
+        "created_at": datetime.utcnow().isoformat(),
+        "byteorder": sys.byteorder,
+        "meta": meta or {},
+        "sections": {},
+    }
+    start = 0
+    while True:
+        encoded = json.dumps(header).encode("utf-8")
+        position = _aligned(_PREAMBLE.size + len(encoded))
+        if position == start:
+            break
+        start = position
+        for name, value in parts.items():
+            header["sections"][name] = [position, len(value)]
+            position = _aligned(position + len(value))
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}")
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(_PREAMBLE.pack(_MAGIC, SNAPSHOT_FORMAT_VERSION, len(encoded)))
+            handle.write(encoded)
+            for name, value in parts.items():
+                handle.write(b"\0" * (header["sections"][name][0] - handle.tell()))
+                handle.write(value)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+    for stale in list_snapshots(directory)[keep:]:
+        try:
+            os.remove(os.path.join(directory, stale))
+        except OSError as e:
+            logger.warning(f"Failed to prune FAQ snapshot {stale}: {str(e)}")
+    return path
+
+
+def list_snapshots(directory: str) -> List[str]:
+    """Snapshot file names of the current format version, newest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (name for name in names if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)),
+        reverse=True
+    )
+
+
+def load_latest_snapshot(directory: Optional[str]) -> Optional[Snapshot]:
+    """
+    Map the newest readable snapshot in directory.
+
+    Returns:
+        The snapshot, or None when there is none (or none is readable)
+    """
+    if not directory:
+        return None
+    for name in list_snapshots(directory):
+        try:
+            return Snapshot(os.path.join(directory, name))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Skipping unreadable FAQ snapshot {name}: {str(e)}")
+    return None
+
+
+def _aligned(position: int) -> int:
+    return (position + _ALIGN - 1) // _ALIGN * _ALIGN
@@ -0,0 +1,348 @@
+"""
+Cross-worker cache invalidation bus.
+
+With ``uvicorn --workers N`` every worker process holds its own
+in-memory caches. Writes made through one worker are broadcast to the
+others through a small memory-mapped file on the same host:
+
+    header   magic, layout version and a global event sequence number
+    counters one version counter per namespace (faqs, announcements, ...)
+    ring     the most recent events: sequence, namespace, op and key
+
+Publishers append to the ring under an exclusive ``flock``. Every
+worker polls the sequence number every few milliseconds (a single
+8-byte read while idle) and hands new events to the callbacks
+subscribed to their namespace. A worker that falls more than a ring's
+length behind flushes the whole namespace instead.
+
+Postgres LISTEN/NOTIFY can optionally feed the bus as well, so writes
+that bypass the API (SQL editor, other services) also reach the caches.
+The API tags its own requests with the bus's ``origin`` (the
+X-Cache-Origin header, echoed by the trigger), so NOTIFYs for writes
+this bus already broadcast are skipped.
+"""
+
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+NAMESPACES = ("faqs", "announcements", "chat_logs", "tokens")
+OPS = ("create", "update", "delete", "flush")
+
+CACHE_BUS_ENABLED = os.getenv("CACHE_BUS_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_BUS_PATH = os.getenv("CACHE_BUS_PATH") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    f"clarifyai-cache-bus-{os.getuid() if hasattr(os, 'getuid') else 0}",
+)
+CACHE_BUS_POLL_MS = float(os.getenv("CACHE_BUS_POLL_MS", "2"))
+CACHE_BUS_PG_NOTIFY = os.getenv("CACHE_BUS_PG_NOTIFY", "false").lower() in ("1", "true", "yes")
+CACHE_BUS_PG_CHANNEL = os.getenv("CACHE_BUS_PG_CHANNEL", "cache_invalidation")
+
+_MAGIC = 0x43414348  # "CACH"
+_LAYOUT_VERSION = 1
+_HEADER = struct.Struct("<IIQ")
+_COUNTERS = struct.Struct("<" + "Q" * 8)
+_SLOT = struct.Struct("<QBBB61s")
+_RING_SIZE = 4096
+_RING_OFFSET = _HEADER.size + _COUNTERS.size
+_FILE_SIZE = _RING_OFFSET + _SLOT.size * _RING_SIZE
+
+# key, op, payload (payload is only available to the publishing process)
+Callback = Callable[[Optional[str], str, Optional[Any]], None]
+
+
+class InvalidationBus:
+    """
+    Broadcasts cache invalidation events between worker processes.
+
+    Callbacks run on the bus's polling thread (or inline on the
+    publishing thread for local events) and should only drop or
+    schedule refreshes of cached entries, never block on the network.
+    A key of None means "drop everything in this namespace".
+    """
+
+    def __init__(self, path: str = CACHE_BUS_PATH, poll_interval: float = CACHE_BUS_POLL_MS / 1000.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, List[Callback]] = defaultdict(list)
+        self._own_events: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listener: Optional["PgNotifyListener"] = None
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._last_seen = 0
+        if CACHE_BUS_ENABLED and fcntl is not None:
+            self._open()
+            # Shared by every worker on this bus: they all see each other's events
+            self.origin = f"{socket.gethostname()}:{self.path}"
+        else:
+            logger.warning("Cache invalidation bus running in process-local mode")
+            self.origin = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < _FILE_SIZE:
+                os.ftruncate(self._fd, _FILE_SIZE)
+            self._map = mmap.mmap(self._fd, _FILE_SIZE)
+            magic, layout, _ = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or layout != _LAYOUT_VERSION:
+                self._map[:_FILE_SIZE] = bytes(_FILE_SIZE)
+                _HEADER.pack_into(self._map, 0, _MAGIC, _LAYOUT_VERSION, 0)
+            self._last_seen = _HEADER.unpack_from(self._map, 0)[2]
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def subscribe(self, namespace: str, callback: Callback) -> None:
+        """Register callback for events in namespace."""
+        _namespace_index(namespace)
+        with self._lock:
+            self._subscribers[namespace].append(callback)
+
+    def publish(self, namespace: str, key: Optional[str] = None, op: str = "update", payload: Any = None) -> None:
+        """
+        Broadcast a change to every worker.
+
+        Subscribers in this process are called immediately and receive
+        payload (e.g. the written row); other workers receive only the
+        namespace, op and key and must refetch if they need the data.
+
+        Args:
+            namespace: One of NAMESPACES
+            key: Identifier of the changed entry, or None for the whole namespace
+            op: One of OPS
+            payload: Optional data for local subscribers
+        """
+        ns_index = _namespace_index(namespace)
+        op_index = OPS.index(op)
+        with self._lock:
+            if self._map is not None:
+                seq = self._append(ns_index, op_index, key)
+                self._own_events.add(seq)
+            self._deliver(namespace, key, op, payload)
+
+    def version(self, namespace: str) -> int:
+        """Return the shared version counter of namespace (0 in local mode)."""
+        if self._map is None:
+            return 0
+        return _COUNTERS.unpack_from(self._map, _HEADER.size)[_namespace_index(namespace)]
+
+    def poll(self) -> int:
+        """
+        Deliver events published by other workers since the last poll.
+
+        Cheap enough to call on hot read paths: while nothing has
+        changed it costs a single 8-byte read.
+
+        Returns:
+            Number of events delivered
+        """
+        if self._map is None:
+            return 0
+        if _HEADER.unpack_from(self._map, 0)[2] == self._last_seen:
+            return 0
+        with self._lock:
+            events = self._read_new_events()
+            delivered = 0
+            for seq, namespace, op, key in events:
+                if seq in self._own_events:
+                    self._own_events.discard(seq)
+                    continue
+                self._deliver(namespace, key, op, None)
+                delivered += 1
+            return delivered
+
+    def start(self) -> None:
+        """Start the polling thread and, if configured, the Postgres listener."""
+        if self._map is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-bus", daemon=True)
+            self._thread.start()
+        if CACHE_BUS_PG_NOTIFY and self._listener is None:
+            self._listener = PgNotifyListener(self)
+            self._listener.start()
+
+    def close(self) -> None:
+        """Stop background threads."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def deliver_external(self, namespace: str, key: Optional[str], op: str) -> None:
+        """Deliver an event that arrived from outside the bus (e.g. NOTIFY) to local subscribers."""
+        with self._lock:
+            self._deliver(namespace, key, op, None)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Cache bus poll failed: {str(e)}")
+
+    def _append(self, ns_index: int, op_index: int, key: Optional[str]) -> int:
+        encoded = (key or "").encode("utf-8")[:61]
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            seq = _HEADER.unpack_from(self._map, 0)[2] + 1
+            _SLOT.pack_into(
+                self._map,
+                _RING_OFFSET + (seq % _RING_SIZE) * _SLOT.size,
+                seq, ns_index, op_index, 1 if key is not None else 0, encoded,
+            )
+            counter_offset = _HEADER.size + ns_index * 8
+            struct.pack_into("<Q", self._map, counter_offset, struct.unpack_from("<Q", self._map, counter_offset)[0] + 1)
+            # Publishing the sequence number last makes the event visible
+            _HEADER.pack_into(self._map, 0, _MAGIC, _LAYOUT_VERSION, seq)
+            return seq
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _read_new_events(self) -> List[tuple]:
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            current = _HEADER.unpack_from(self._map, 0)[2]
+            first = self._last_seen + 1
+            if current - self._last_seen > _RING_SIZE:
+                logger.warning("Cache bus fell behind; flushing all namespaces")
+                self._last_seen = current
+                self._own_events.clear()
+                return [(0, namespace, "flush", None) for namespace in NAMESPACES]
+            events = []
+            for seq in range(first, current + 1):
+                slot_seq, ns_index, op_index, has_key, raw_key = _SLOT.unpack_from(
+                    self._map, _RING_OFFSET + (seq % _RING_SIZE) * _SLOT.size
+                )
+                key = raw_key.rstrip(b"\x00").decode("utf-8") if has_key else None
+                events.append((slot_seq, NAMESPACES[ns_index], OPS[op_index], key))
+            self._last_seen = current
+            return events
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _deliver(self, namespace: str, key: Optional[str], op: str, payload: Any) -> None:
+        if op == "flush":
+            key = None
+        for callback in list(self._subscribers.get(namespace, ())):
+            try:
+                callback(key, op, payload)
+            except Exception as e:
+                logger.error(f"Cache invalidation callback for {namespace} failed: {str(e)}")
+
+
+class PgNotifyListener:
+    """
+    Feeds Postgres NOTIFY events into the local bus.
+
+    Requires ``psycopg`` (v3) and DATABASE_URL pointing at the Supabase
+    Postgres instance. Payloads are JSON objects with ``table``, ``op``,
+    ``id`` and ``origin`` as produced by the ``notify_cache_invalidation``
+    trigger in setup_database.sql (op FLUSH, without id, drops the whole
+    table's namespace). Each worker listens on its own
+    connection and delivers events only to its own subscribers; events
+    whose origin is this bus were already delivered through it.
+    """
+
+    def __init__(self, bus: InvalidationBus, dsn: Optional[str] = None, channel: str = CACHE_BUS_PG_CHANNEL):
+        self.bus = bus
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.dsn:
+            logger.warning("CACHE_BUS_PG_NOTIFY is set but DATABASE_URL is missing; LISTEN disabled")
+            return
+        try:
+            import psycopg  # noqa: F401
+        except ImportError:
+            logger.warning("psycopg is not installed; Postgres LISTEN/NOTIFY disabled")
+            return
+        self._thread = threading.Thread(target=self._run, name="cache-bus-pg", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        import psycopg
+
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {self.channel}")
+                    logger.info(f"Listening for cache invalidations on {self.channel}")
+                    while not self._stop.is_set():
+                        for notify in connection.notifies(timeout=1.0):
+                            self._handle(notify.payload)
+            except Exception as e:
+                logger.error(f"Postgres LISTEN connection failed: {str(e)}")
+                self._stop.wait(5)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            namespace = event["table"]
+            op = {"INSERT": "create", "UPDATE": "update", "DELETE": "delete", "FLUSH": "flush"}.get(event.get("op", ""), "update")
+            key = event.get("id")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed invalidation payload {payload!r}: {str(e)}")
+            return
+        if event.get("origin") == self.bus.origin:
+            return
+        if namespace in NAMESPACES:
+            self.bus.deliver_external(namespace, str(key) if key is not None else None, op)
+
+
+def _namespace_index(namespace: str) -> int:
+    try:
+        return NAMESPACES.index(namespace)
+    except ValueError:
+        raise ValueError(f"Unknown cache namespace: {namespace}")
+
+
+# Singleton instance
+_invalidation_bus: Optional[InvalidationBus] = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """
+    Get or create the singleton InvalidationBus instance.
+
+    Returns:
+        InvalidationBus instance
+    """
+    global _invalidation_bus
+    if _invalidation_bus is None:
+        _invalidation_bus = InvalidationBus()
+    return _invalidation_bus
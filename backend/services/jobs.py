@@ -0,0 +1,79 @@
+"""
+Periodic jobs registered with the scheduler at startup.
+
+Per-worker jobs reload the in-memory FAQ catalog and announcement store,
+as a backstop for invalidation events a worker may have missed.
+Leader-only jobs (one worker per host) publish FAQ index snapshots,
+expire old announcements and move old chat logs to the archive. Each
+job can be turned off by setting its interval to 0 or its cron
+expression to an empty string.
+"""
+
+import logging
+import os
+
+from services.announcement_store import ANNOUNCEMENT_STORE_ENABLED
+from services.index_snapshot import FAQ_SNAPSHOT_DIR, FAQ_SNAPSHOT_KEEP
+from services.scheduler import Scheduler
+from services.supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+FAQ_CATALOG_REFRESH_SECONDS = float(os.getenv("FAQ_CATALOG_REFRESH_SECONDS", "3600"))
+ANNOUNCEMENT_STORE_REFRESH_SECONDS = float(os.getenv("ANNOUNCEMENT_STORE_REFRESH_SECONDS", "900"))
+FAQ_SNAPSHOT_CRON = os.getenv("FAQ_SNAPSHOT_CRON", "*/30 * * * *")
+ANNOUNCEMENT_EXPIRY_CRON = os.getenv("ANNOUNCEMENT_EXPIRY_CRON", "15 3 * * *")
+# Days past its date after which an announcement is soft deleted; 0 keeps them
+ANNOUNCEMENT_EXPIRE_AFTER_DAYS = float(os.getenv("ANNOUNCEMENT_EXPIRE_AFTER_DAYS", "0"))
+CHAT_LOG_ARCHIVE_CRON = os.getenv("CHAT_LOG_ARCHIVE_CRON", "30 2 * * *")
+# Age at which chat logs move to chat_logs_archive; 0 keeps them in chat_logs
+CHAT_LOG_RETENTION_DAYS = float(os.getenv("CHAT_LOG_RETENTION_DAYS", "0"))
+
+
+def register_jobs(scheduler: Scheduler, db: SupabaseService) -> None:
+    """
+    Register the application's periodic jobs.
+
+    Args:
+        scheduler: Scheduler to register with (before or after it starts)
+        db: Service whose caches and tables the jobs maintain
+    """
+    if FAQ_CATALOG_REFRESH_SECONDS > 0:
+        scheduler.add_interval_job(
+            "faq-catalog-refresh",
+            db.faq_catalog.refresh,
+            FAQ_CATALOG_REFRESH_SECONDS,
+            jitter=FAQ_CATALOG_REFRESH_SECONDS / 10
+        )
+    if ANNOUNCEMENT_STORE_ENABLED and ANNOUNCEMENT_STORE_REFRESH_SECONDS > 0:
+        scheduler.add_interval_job(
+            "announcement-store-refresh",
+            db.announcement_store.refresh,
+            ANNOUNCEMENT_STORE_REFRESH_SECONDS,
+            jitter=ANNOUNCEMENT_STORE_REFRESH_SECONDS / 10
+        )
+    if FAQ_SNAPSHOT_DIR and FAQ_SNAPSHOT_CRON:
+        scheduler.add_cron_job(
+            "faq-snapshot",
+            lambda: db.build_faq_snapshot(FAQ_SNAPSHOT_DIR, keep=FAQ_SNAPSHOT_KEEP),
+            FAQ_SNAPSHOT_CRON,
+            jitter=60,
+            leader_only=True
+        )
+    if ANNOUNCEMENT_EXPIRE_AFTER_DAYS > 0 and ANNOUNCEMENT_EXPIRY_CRON:
+        scheduler.add_cron_job(
+            "announcement-expiry",
+            lambda: db.expire_announcements(ANNOUNCEMENT_EXPIRE_AFTER_DAYS),
+            ANNOUNCEMENT_EXPIRY_CRON,
+            jitter=60,
+            leader_only=True
+        )
+    if CHAT_LOG_RETENTION_DAYS > 0 and CHAT_LOG_ARCHIVE_CRON:
+        scheduler.add_cron_job(
+            "chat-log-archive",
+            lambda: db.archive_chat_logs(CHAT_LOG_RETENTION_DAYS),
+            CHAT_LOG_ARCHIVE_CRON,
+            jitter=60,
+            leader_only=True
+        )
+    logger.info(f"Registered {len(scheduler.stats()['jobs'])} scheduled jobs")
@@ -0,0 +1,428 @@
+"""
+In-memory stand-in for the Supabase client.
+
+Implements the subset of the supabase-py / PostgREST query builder used
+by SupabaseService (select, filters, order, limit, range, insert,
+update, execute, and ``or_`` logic trees) over Python dictionaries, with the column defaults of
+setup_database.sql, plus Python versions of its functions for ``rpc()``. Selected with ``SUPABASE_BACKEND=local`` so the API
+can run for load tests and local replay without a Supabase project.
+
+Data lives in the process and is lost on restart. Tables can be seeded
+from a JSON file (``{"faqs": [...], "announcements": [...]}``) and an
+artificial per-query latency can be added to approximate the network.
+"""
+
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from services.compact_store import format_timestamp, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Column defaults applied on insert, mirroring setup_database.sql
+_DEFAULTS: Dict[str, Dict[str, Callable[[], Any]]] = {
+    "faqs": {"tags": list, "is_active": lambda: True, "view_count": lambda: 0},
+    "announcements": {"priority": lambda: "medium", "is_active": lambda: True},
+    "chat_logs": {"matched_faq_id": lambda: None, "confidence": lambda: None, "was_helpful": lambda: None},
+}
+_TIMESTAMPS = {"faqs": ("created_at", "updated_at"), "announcements": ("created_at", "updated_at"), "chat_logs": ("created_at", "updated_at")}
+# TIMESTAMPTZ columns, stored in the format PostgREST returns them in
+_TIMESTAMPTZ_COLUMNS = {
+    "faqs": ("created_at", "updated_at"),
+    "announcements": ("date", "created_at", "updated_at"),
+    "chat_logs": ("created_at", "updated_at"),
+    "chat_logs_archive": ("created_at", "updated_at", "archived_at"),
+}
+# Words of the search_faqs() stand-in
+_WORD = re.compile(r"\w+")
+# Operators allowed inside or_() filters
+_LOGIC_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+class LocalResponse:
+    """Mimics the APIResponse returned by ``execute()``."""
+
+    def __init__(self, data: Any):
+        self.data = data
+        self.count = None
+
+
+def _json_value(value: Any) -> Any:
+    """JSON form of the values the service writes that json cannot encode itself."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _stored(table: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A written payload as PostgREST would return it.
+
+    The payload goes through JSON, so enums, datetimes and UUIDs become
+    strings, and TIMESTAMPTZ columns are reformatted the way Postgres
+    prints them.
+    """
+    row = json.loads(json.dumps(payload, default=_json_value))
+    for column in _TIMESTAMPTZ_COLUMNS.get(table, ()):
+        if isinstance(row.get(column), str):
+            row[column] = format_timestamp(parse_timestamp(row[column]))
+    return row
+
+
+def _ordered(value: Any) -> Any:
+    """Sort/compare key: timestamps by instant, everything else as is."""
+    if isinstance(value, datetime):
+        return parse_timestamp(value)
+    if isinstance(value, str) and len(value) >= 10 and value[4:5] == "-" and value[7:8] == "-":
+        try:
+            return parse_timestamp(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _equal(stored: Any, wanted: Any) -> bool:
+    if isinstance(stored, bool) or isinstance(wanted, bool):
+        return stored is wanted or str(stored).lower() == str(wanted).lower()
+    return str(stored) == str(wanted)
+
+
+def _split_terms(filters: str) -> List[str]:
+    """Split on the commas outside parentheses and double quotes."""
+    terms, depth, quoted, start = [], 0, False, 0
+    for position, char in enumerate(filters):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(filters[start:position])
+            start = position + 1
+    terms.append(filters[start:])
+    return [term.strip() for term in terms if term.strip()]
+
+
+def _logic(combine: str, filters: str) -> Callable[[Dict[str, Any]], bool]:
+    """Row predicate of an and()/or() filter body."""
+    matchers = []
+    for term in _split_terms(filters):
+        nested = re.fullmatch(r"(and|or)\((.*)\)", term, re.DOTALL)
+        if nested:
+            matchers.append(_logic(nested.group(1), nested.group(2)))
+            continue
+        column, op, value = term.split(".", 2)
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        matchers.append(_term(column, op, value))
+    if combine == "and":
+        return lambda row: all(match(row) for match in matchers)
+    return lambda row: any(match(row) for match in matchers)
+
+
+def _term(column: str, op: str, value: str) -> Callable[[Dict[str, Any]], bool]:
+    if op == "neq":
+        return lambda row: not _equal(row.get(column), value)
+    if op != "eq" and op not in _LOGIC_OPS:
+        raise ValueError(f"Local store does not support the {op} operator in or_()")
+    wanted = _ordered(value)
+
+    def matches(row: Dict[str, Any]) -> bool:
+        stored = row.get(column)
+        if stored is None:
+            return False
+        if op == "eq":
+            # Timestamps are equal by instant, whatever their text
+            ordered = _ordered(stored)
+            return ordered == wanted if isinstance(wanted, float) and isinstance(ordered, float) else _equal(stored, value)
+        try:
+            return _LOGIC_OPS[op](_ordered(stored), wanted)
+        except TypeError:
+            return _LOGIC_OPS[op](str(stored), value)
+
+    return matches
+
+
+class LocalQuery:
+    """One PostgREST-style request against a LocalStore table."""
+
+    def __init__(self, store: "LocalStore", table: str):
+        self._store = store
+        self._table = table
+        self._operation = "select"
+        self._payload: Optional[Any] = None
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._range: Optional[tuple] = None
+
+    # Builders ---------------------------------------------------------
+
+    def select(self, columns: str = "*", **kwargs) -> "LocalQuery":
+        if columns.strip() != "*":
+            self._columns = [column.strip() for column in columns.split(",") if column.strip()]
+        return self
+
+    def insert(self, payload: Any, **kwargs) -> "LocalQuery":
+        self._operation, self._payload = "insert", payload
+        return self
+
+    def update(self, payload: Dict[str, Any], **kwargs) -> "LocalQuery":
+        self._operation, self._payload = "update", payload
+        return self
+
+    def eq(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _equal(row.get(column), value))
+        return self
+
+    def neq(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: not _equal(row.get(column), value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "LocalQuery":
+        return self._compare(column, value, lambda a, b: a > b)
+
+    def gte(self, column: str, value: Any) -> "LocalQuery":
+        return self._compare(column, value, lambda a, b: a >= b)
+
+    def lt(self, column: str, value: Any) -> "LocalQuery":
+        return self._compare(column, value, lambda a, b: a < b)
+
+    def lte(self, column: str, value: Any) -> "LocalQuery":
+        return self._compare(column, value, lambda a, b: a <= b)
+
+    def in_(self, column: str, values: List[Any]) -> "LocalQuery":
+        wanted = {str(value) for value in values}
+        self._filters.append(lambda row: str(row.get(column)) in wanted)
+        return self
+
+    def or_(self, filters: str, **kwargs) -> "LocalQuery":
+        """PostgREST ``or=(...)``: comma-separated ``column.op.value`` terms, nestable with and()/or()."""
+        self._filters.append(_logic("or", filters))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "LocalQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs) -> "LocalQuery":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "LocalQuery":
+        self._range = (start, end)
+        return self
+
+    def _compare(self, column: str, value: Any, op: Callable[[Any, Any], bool]) -> "LocalQuery":
+        wanted = _ordered(value)
+
+        def matches(row: Dict[str, Any]) -> bool:
+            stored = row.get(column)
+            if stored is None:
+                return False
+            try:
+                return op(_ordered(stored), wanted)
+            except TypeError:
+                return op(str(stored), str(value))
+
+        self._filters.append(matches)
+        return self
+
+    # Execution --------------------------------------------------------
+
+    def execute(self) -> LocalResponse:
+        if self._store.latency:
+            time.sleep(self._store.latency)
+        with self._store.lock:
+            rows = self._store.tables.setdefault(self._table, [])
+            if self._operation == "insert":
+                payloads = self._payload if isinstance(self._payload, list) else [self._payload]
+                created = [self._store.new_row(self._table, payload) for payload in payloads]
+                rows.extend(created)
+                return LocalResponse(copy.deepcopy(created))
+
+            selected = [row for row in rows if all(match(row) for match in self._filters)]
+            if self._operation == "update":
+                # The BEFORE UPDATE triggers of setup_database.sql overwrite updated_at
+                stamped = "updated_at" in _TIMESTAMPS.get(self._table, ())
+                now = format_timestamp(time.time())
+                for row in selected:
+                    row.update(_stored(self._table, self._payload))
+                    if stamped:
+                        row["updated_at"] = now
+                return LocalResponse(copy.deepcopy(selected))
+
+            for column, desc in reversed(self._order):
+                selected.sort(key=lambda row: (row.get(column) is None, _ordered(row.get(column))), reverse=desc)
+            if self._range is not None:
+                selected = selected[self._range[0]:self._range[1] + 1]
+            if self._limit is not None:
+                selected = selected[:self._limit]
+            if self._columns is not None:
+                selected = [{column: row.get(column) for column in self._columns} for row in selected]
+            return LocalResponse(copy.deepcopy(selected))
+
+
+class LocalStore:
+    """Tables of rows plus the ``table()`` entry point of a Supabase client."""
+
+    def __init__(self, seed_path: Optional[str] = None, latency_ms: Optional[float] = None):
+        # Read at construction: the services package is imported before scripts can set the environment
+        seed_path = seed_path or os.getenv("LOCAL_STORE_SEED")
+        if latency_ms is None:
+            latency_ms = float(os.getenv("LOCAL_STORE_LATENCY_MS", "0"))
+        self.lock = threading.Lock()
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        if seed_path:
+            with open(seed_path) as handle:
+                for table, rows in json.load(handle).items():
+                    self.load(table, rows)
+            logger.info(
+                f"Local store seeded from {seed_path}: "
+                + ", ".join(f"{len(rows)} {table}" for table, rows in self.tables.items())
+            )
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> "LocalCall":
+        function = getattr(self, f"_rpc_{name}", None)
+        if function is None:
+            raise ValueError(f"Local store has no function {name}")
+        return LocalCall(self, function, params or {})
+
+    def load(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Add rows, filling the same defaults as an insert."""
+        with self.lock:
+            self.tables.setdefault(table, []).extend(self.new_row(table, row) for row in rows)
+
+    def new_row(self, table: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        row = _stored(table, payload)
+        row.setdefault("id", str(uuid.uuid4()))
+        for column, default in _DEFAULTS.get(table, {}).items():
+            row.setdefault(column, default())
+        now = format_timestamp(time.time())
+        for column in _TIMESTAMPS.get(table, ()):
+            row.setdefault(column, now)
+        return row
+
+    # Functions --------------------------------------------------------
+
+    def _rpc_archive_chat_logs(self, cutoff: str, batch_size: int = 1000) -> int:
+        """archive_chat_logs() of setup_database.sql."""
+        limit = parse_timestamp(cutoff)
+        hot = self.tables.setdefault("chat_logs", [])
+        moved = sorted(
+            (row for row in hot if parse_timestamp(row["created_at"]) < limit),
+            key=lambda row: parse_timestamp(row["created_at"])
+        )[:batch_size]
+        moved_ids = {row["id"] for row in moved}
+        self.tables["chat_logs"] = [row for row in hot if row["id"] not in moved_ids]
+
+        now = format_timestamp(time.time())
+        self.tables.setdefault("chat_logs_archive", []).extend(dict(row, archived_at=now) for row in moved)
+        rollups = {
+            (row["day"], row["matched_faq_id"]): row for row in self.tables.setdefault("chat_log_rollups", [])
+        }
+        for row in moved:
+            day = datetime.utcfromtimestamp(parse_timestamp(row["created_at"])).date().isoformat()
+            faq_id = row.get("matched_faq_id")
+            rollup = rollups.get((day, faq_id))
+            if rollup is None:
+                rollup = {
+                    "day": day, "matched_faq_id": faq_id, "questions": 0, "helpful": 0,
+                    "unhelpful": 0, "confidence_sum": 0.0, "confidence_count": 0,
+                }
+                rollups[(day, faq_id)] = rollup
+                self.tables["chat_log_rollups"].append(rollup)
+            rollup["questions"] += 1
+            rollup["helpful"] += row.get("was_helpful") is True
+            rollup["unhelpful"] += row.get("was_helpful") is False
+            if row.get("confidence") is not None:
+                rollup["confidence_sum"] += float(row["confidence"])
+                rollup["confidence_count"] += 1
+        return len(moved)
+
+
+    def _rpc_increment_faq_views(self, faq_ids: List[str]) -> List[Dict[str, Any]]:
+        """increment_faq_views() of setup_database.sql."""
+        wanted = {str(faq_id) for faq_id in faq_ids}
+        now = format_timestamp(time.time())
+        updated = []
+        for row in self.tables.setdefault("faqs", []):
+            if str(row["id"]) in wanted:
+                row["view_count"] = (row.get("view_count") or 0) + 1
+                # The updated_at trigger fires on this UPDATE too
+                row["updated_at"] = now
+                updated.append(copy.deepcopy(row))
+        return updated
+
+    def _rpc_search_faqs(self, search_query: str, category_filter: Optional[str] = None, result_limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Approximation of search_faqs() of setup_database.sql.
+
+        Every query word must occur in the question, tags or answer
+        (exact words, no stemming or web search operators); the rank
+        weighs the matches like ts_rank's default A, B and C weights.
+        """
+        terms = set(_WORD.findall(search_query.lower()))
+        if not terms:
+            return []
+        hits = []
+        for row in self.tables.get("faqs", []):
+            if not row.get("is_active") or (category_filter is not None and row.get("category") != category_filter):
+                continue
+            fields = (
+                (1.0, set(_WORD.findall(row.get("question", "").lower()))),
+                (0.4, set(_WORD.findall(" ".join(row.get("tags") or []).lower()))),
+                (0.2, set(_WORD.findall(row.get("answer", "").lower()))),
+            )
+            if not all(any(term in words for _, words in fields) for term in terms):
+                continue
+            rank = sum(weight * len(terms & words) for weight, words in fields) / len(terms)
+            hits.append((rank, row))
+        hits.sort(key=lambda hit: (-hit[0], -(hit[1].get("view_count") or 0)))
+
+        def mark(text: str) -> str:
+            return _WORD.sub(lambda m: f"<mark>{m.group(0)}</mark>" if m.group(0).lower() in terms else m.group(0), text)
+
+        return [
+            dict(row, rank=rank, question_highlight=mark(row.get("question", "")), answer_highlight=mark(row.get("answer", "")))
+            for rank, row in hits[:result_limit]
+        ]
+
+
+class LocalCall:
+    """A pending ``rpc()`` call."""
+
+    def __init__(self, store: LocalStore, function: Callable[..., Any], params: Dict[str, Any]):
+        self._store = store
+        self._function = function
+        self._params = params
+
+    def execute(self) -> LocalResponse:
+        if self._store.latency:
+            time.sleep(self._store.latency)
+        with self._store.lock:
+            return LocalResponse(copy.deepcopy(self._function(**self._params)))
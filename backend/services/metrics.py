@@ -0,0 +1,129 @@
+"""
+In-process metrics registry.
+
+Provides thread-safe counters and rolling latency windows that services
+and middleware use to record operational data. Values are exposed as a
+JSON snapshot through the /metrics endpoint.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any
+
+
+class LatencyWindow:
+    """
+    Rolling window of the most recent latency samples (in seconds).
+
+    Percentiles are computed from a sorted copy of the window, which is
+    cached until enough new samples have arrived to make it worth
+    re-sorting.
+    """
+
+    def __init__(self, size: int = 1024, resort_every: int = 32):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: List[float] = []
+        self._pending = 0
+        self._resort_every = resort_every
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._pending += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-100) of the window, or None if empty."""
+        if not self._samples:
+            return None
+        if self._pending >= self._resort_every or not self._sorted:
+            self._sorted = sorted(self._samples)
+            self._pending = 0
+        index = min(len(self._sorted) - 1, int(round(q / 100.0 * (len(self._sorted) - 1))))
+        return self._sorted[index]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of named counters and latency windows.
+
+    Names are dotted strings such as ``breaker.faqs.list.opened`` so the
+    snapshot stays flat and easy to grep.
+    """
+
+    def __init__(self, window_size: int = 1024):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timings: Dict[str, LatencyWindow] = {}
+        self._window_size = window_size
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter by value."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a latency sample in seconds."""
+        with self._lock:
+            window = self._timings.get(name)
+            if window is None:
+                window = LatencyWindow(self._window_size)
+                self._timings[name] = window
+            window.add(seconds)
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Return the q-th percentile of a latency window, or None if unknown."""
+        with self._lock:
+            window = self._timings.get(name)
+            return window.percentile(q) if window else None
+
+    def counter(self, name: str) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return a JSON-serializable view of all metrics.
+
+        Returns:
+            Dictionary with ``counters`` and ``timings`` (count, mean, p50,
+            p95 and p99 in milliseconds)
+        """
+        with self._lock:
+            timings = {}
+            for name, window in self._timings.items():
+                timings[name] = {
+                    "count": window.count,
+                    "mean_ms": round(window.total / window.count * 1000, 3) if window.count else None,
+                    "p50_ms": _to_ms(window.percentile(50)),
+                    "p95_ms": _to_ms(window.percentile(95)),
+                    "p99_ms": _to_ms(window.percentile(99)),
+                }
+            return {"counters": dict(self._counters), "timings": timings}
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+# Singleton instance
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Get or create the singleton MetricsRegistry instance.
+
+    Returns:
+        MetricsRegistry instance
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
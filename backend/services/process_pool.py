@@ -0,0 +1,292 @@
+"""
+Process pool for CPU-bound FAQ work.
+
+Building the fuzzy search index over every FAQ and scoring large
+batches of questions against it are pure Python and hold the GIL, so
+run in a request worker they stall every request it is serving and
+never use more than one core. The pool runs them in separate processes
+(started with ``spawn``, so they inherit none of the worker's threads
+or locks) and is started and closed by the app lifespan.
+
+Results are not pickled back:
+
+- index builds write an index snapshot (``services/index_snapshot.py``)
+  into PROCESS_POOL_DIR and return its path; the caller maps the file
+  and restores its index from it
+- batch scoring maps the snapshot in every pool process (one page cache
+  copy for all of them) and each process writes its share of the
+  results into a memory-mapped results file under /dev/shm, which the
+  caller reads once every share is done
+
+When the pool is not running every call runs inline instead, so callers
+need no fallback of their own.
+"""
+
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.fuzzy_index import FuzzyIndex
+from services.index_snapshot import Snapshot, write_snapshot
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+PROCESS_POOL_ENABLED = os.getenv("PROCESS_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+# Per uvicorn worker; lower it when running several workers on one host
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", "0")) or os.cpu_count() or 1
+PROCESS_POOL_DIR = os.getenv("PROCESS_POOL_DIR") or os.path.join(
+    tempfile.gettempdir(),
+    f"clarifyai-pool-{os.getuid() if hasattr(os, 'getuid') else 0}",
+)
+# Below these sizes the work is cheaper inline than the hand-off
+PROCESS_POOL_MIN_FAQS = int(os.getenv("PROCESS_POOL_MIN_FAQS", "5000"))
+PROCESS_POOL_MIN_QUESTIONS = int(os.getenv("PROCESS_POOL_MIN_QUESTIONS", "500"))
+
+_RESULTS_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+# Scratch snapshots kept in PROCESS_POOL_DIR; older ones may still be mapped
+_SCRATCH_KEEP = 2
+
+Scores = List[List[Tuple[str, float]]]
+
+
+# ============================================================================
+# Tasks (run in the pool processes, or inline)
+# ============================================================================
+
+def build_index_snapshot(
+    directory: str,
+    rows: List[Dict[str, Any]],
+    watermark: Optional[str] = None,
+    keep: int = _SCRATCH_KEEP
+) -> str:
+    """
+    Index rows and write them to a new snapshot.
+
+    Args:
+        directory: Snapshot directory
+        rows: FAQ rows
+        watermark: Snapshot watermark (default: now)
+        keep: Number of snapshots to keep in directory
+
+    Returns:
+        Path of the snapshot
+    """
+    index = FuzzyIndex()
+    index.rebuild(rows)
+    return write_snapshot(
+        directory,
+        rows,
+        watermark or datetime.utcnow().isoformat(),
+        index.snapshot_sections(),
+        meta={"fuzzy": index.snapshot_meta(), "faqs": len(rows)},
+        keep=keep
+    )
+
+
+# The index restored in this pool process, kept between batches
+_restored: Dict[str, Tuple[Snapshot, FuzzyIndex]] = {}
+
+
+def _restored_index(path: str) -> Tuple[Snapshot, FuzzyIndex]:
+    if path not in _restored:
+        snapshot = Snapshot(path)
+        index = FuzzyIndex()
+        if not index.restore(snapshot):
+            raise ValueError(f"{path} was built with different index settings")
+        _restored.clear()
+        _restored[path] = (snapshot, index)
+    return _restored[path]
+
+
+def score_into(
+    snapshot_path: str,
+    questions: List[str],
+    first: int,
+    limit: int,
+    category: Optional[str],
+    results_path: str
+) -> int:
+    """
+    Score questions against a snapshot and write the matches to a results file.
+
+    The file holds, for every question of the batch, ``limit`` int64
+    positions in the snapshot's ``fuzzy.doc_ids`` table (-1 past the
+    last match), then as many float64 scores; this share starts at
+    question ``first``.
+
+    Returns:
+        Number of questions scored
+    """
+    snapshot, index = _restored_index(snapshot_path)
+    doc_ids = snapshot.strings("fuzzy.doc_ids")
+    with open(results_path, "r+b") as handle, mmap.mmap(handle.fileno(), 0) as results:
+        view = memoryview(results)
+        positions = view[:len(view) // 2].cast("q")
+        scores = view[len(view) // 2:].cast("d")
+        try:
+            for number, question in enumerate(questions, start=first):
+                base = number * limit
+                matches = index.search(question, limit=limit, category=category)
+                for rank, (faq_id, score) in enumerate(matches):
+                    positions[base + rank] = doc_ids.find(faq_id)
+                    scores[base + rank] = score
+                for rank in range(len(matches), limit):
+                    positions[base + rank] = -1
+        finally:
+            # The map cannot close while views of it are alive
+            scores.release()
+            positions.release()
+            view.release()
+    return len(questions)
+
+
+# ============================================================================
+# Pool
+# ============================================================================
+
+class CPUPool:
+    """A lazily spawned pool of processes for CPU-bound tasks."""
+
+    def __init__(self, workers: int = PROCESS_POOL_WORKERS, directory: str = PROCESS_POOL_DIR):
+        self.workers = workers
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Create the pool; processes are spawned as tasks arrive."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Process pool started with up to {self.workers} processes")
+
+    def close(self) -> None:
+        """Stop the pool; queued tasks are cancelled, running ones finish."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Process pool stopped")
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) in the pool and wait for its result, or inline
+        when the pool is not running. func must be a module-level function.
+        """
+        name = func.__name__
+        started = time.perf_counter()
+        executor = self._executor
+        if executor is None:
+            result = func(*args)
+            get_metrics().incr(f"pool.{name}.inline")
+        else:
+            result = executor.submit(func, *args).result()
+            get_metrics().incr(f"pool.{name}.offloaded")
+        get_metrics().observe(f"pool.{name}", time.perf_counter() - started)
+        return result
+
+    def build_index_snapshot(self, rows: List[Dict[str, Any]]) -> Snapshot:
+        """
+        Build the fuzzy index over rows and return it mapped from a scratch snapshot.
+
+        Raises:
+            Exception: If the build fails
+        """
+        return Snapshot(self.run(build_index_snapshot, self.directory, rows))
+
+    def score(
+        self,
+        snapshot_path: str,
+        questions: List[str],
+        limit: int = 5,
+        category: Optional[str] = None
+    ) -> Scores:
+        """
+        Score questions against the index in a snapshot, split across the pool.
+
+        Args:
+            snapshot_path: Snapshot with a fuzzy index
+            questions: Questions to score
+            limit: Matches per question
+            category: Optional category filter
+
+        Returns:
+            (faq_id, score) matches per question, best first
+
+        Raises:
+            Exception: If scoring fails
+        """
+        if not questions:
+            return []
+        size = len(questions) * limit * 16
+        descriptor, results_path = tempfile.mkstemp(dir=_RESULTS_DIR, prefix="clarifyai-scores-")
+        try:
+            os.ftruncate(descriptor, size)
+            executor = self._executor
+            started = time.perf_counter()
+            if executor is None:
+                score_into(snapshot_path, questions, 0, limit, category, results_path)
+            else:
+                # A few shares per process, so a slow share does not hold the batch up
+                share = -(-len(questions) // (self.workers * 4))
+                futures = [
+                    executor.submit(
+                        score_into, snapshot_path, questions[first:first + share], first, limit, category, results_path
+                    )
+                    for first in range(0, len(questions), share)
+                ]
+                for future in futures:
+                    future.result()
+            get_metrics().observe("pool.score", time.perf_counter() - started)
+            get_metrics().incr("pool.score.questions", len(questions))
+
+            doc_ids = Snapshot(snapshot_path).strings("fuzzy.doc_ids")
+            with mmap.mmap(descriptor, size, access=mmap.ACCESS_READ) as results:
+                view = memoryview(results)
+                positions = view[:size // 2].cast("q").tolist()
+                scores = view[size // 2:].cast("d").tolist()
+                view.release()
+        finally:
+            os.close(descriptor)
+            os.remove(results_path)
+
+        matches: Scores = []
+        for number in range(len(questions)):
+            base = number * limit
+            matches.append([
+                (doc_ids[positions[base + rank]], scores[base + rank])
+                for rank in range(limit)
+                if positions[base + rank] >= 0
+            ])
+        return matches
+
+
+# Singleton instance
+_cpu_pool: Optional[CPUPool] = None
+
+
+def get_cpu_pool() -> CPUPool:
+    """
+    Get or create the singleton CPUPool instance.
+
+    Returns:
+        CPUPool instance
+    """
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = CPUPool()
+    return _cpu_pool
@@ -0,0 +1,486 @@
+"""
+Resilience primitives for upstream Supabase calls.
+
+Provides a circuit breaker that opens after repeated failed or slow
+calls, and a ResilientReader that combines a breaker with a last known
+good cache so reads keep answering (with stale data) while Supabase is
+degraded and are revalidated in the background.
+
+UpstreamCaller runs each individual round trip under the request
+deadline, retries idempotent reads with jittered exponential backoff,
+and optionally hedges slow reads with a second identical request.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+import httpx
+from postgrest.exceptions import APIError
+
+from middleware.request_context import current_request_context, remaining_time
+from services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_SLOW_CALL_MS = float(os.getenv("BREAKER_SLOW_CALL_MS", "2000"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+STALE_CACHE_MAX_KEYS = int(os.getenv("STALE_CACHE_MAX_KEYS", "256"))
+
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_BACKOFF_BASE_MS = float(os.getenv("UPSTREAM_BACKOFF_BASE_MS", "50"))
+UPSTREAM_BACKOFF_MAX_MS = float(os.getenv("UPSTREAM_BACKOFF_MAX_MS", "1000"))
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "32"))
+HEDGE_READS = os.getenv("HEDGE_READS", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# PostgreSQL error classes that indicate a transient condition:
+# connection exceptions, serialization failures/deadlocks, insufficient
+# resources and operator intervention (statement timeouts, shutdowns).
+_RETRYABLE_SQLSTATE_PREFIXES = ("08", "40", "53", "57")
+# PostgREST codes for failing to reach or use the database
+_RETRYABLE_PGRST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+_RETRYABLE_HTTP_STATUSES = (502, 503, 504)
+# SQLSTATE classes raised by the database itself rather than the request:
+# the transient ones above, plus system errors and internal errors
+_SERVER_SQLSTATE_PREFIXES = _RETRYABLE_SQLSTATE_PREFIXES + ("58", "XX")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected by an open breaker and no fallback exists."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request's time budget runs out before an upstream call completes."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True if error is a transient upstream failure worth retrying."""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    if isinstance(error, APIError):
+        code = error.code
+        if isinstance(code, int):
+            return code in _RETRYABLE_HTTP_STATUSES
+        if code:
+            return code in _RETRYABLE_PGRST_CODES or code.startswith(_RETRYABLE_SQLSTATE_PREFIXES)
+    return False
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+    Return True if error means the upstream failed, not the request.
+
+    Transport errors and 5xx responses count against a circuit breaker;
+    a rejected request (bad filter, missing row, permission denied) got
+    a prompt answer from a healthy upstream and does not.
+    """
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, APIError):
+        code = error.code
+        if isinstance(code, int):
+            return code >= 500
+        if code:
+            return code in _RETRYABLE_PGRST_CODES or code.startswith(_SERVER_SQLSTATE_PREFIXES)
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    States:
+        closed: calls pass through; failures and slow calls are counted
+        open: calls are rejected until ``open_seconds`` have elapsed
+        half_open: a single probe call is allowed to test the upstream
+
+    A call slower than ``slow_call_seconds`` counts as a failure even if
+    it returned data, so a degraded upstream trips the breaker before
+    it starts erroring outright. Only errors for which
+    ``is_upstream_failure`` holds are failures; any other error is
+    recorded like a successful call (see ``record_error``).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        slow_call_seconds: float = BREAKER_SLOW_CALL_MS / 1000.0,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_closed(self) -> bool:
+        with self._lock:
+            return self._state == self.CLOSED
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a call may go to the upstream now.
+
+        When the open period has elapsed, exactly one caller is allowed
+        through as a half-open probe; everyone else keeps being rejected
+        until that probe reports back.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, duration: float) -> None:
+        """Record a completed call, treating slow calls as failures."""
+        if duration >= self.slow_call_seconds:
+            get_metrics().incr(f"breaker.{self.name}.slow_calls")
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit breaker {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_error(self, error: Exception, duration: float) -> None:
+        """Record a call that raised, counting only upstream failures against the breaker."""
+        if is_upstream_failure(error):
+            self.record_failure()
+        else:
+            self.record_success(duration)
+
+    def record_failure(self) -> None:
+        """Record a failed call and open the breaker if the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            should_open = (
+                self._state == self.HALF_OPEN
+                or (self._state == self.CLOSED and self._failures >= self.failure_threshold)
+            )
+            if should_open:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+        if should_open:
+            logger.warning(f"Circuit breaker {self.name} opened after {self._failures} failures")
+            get_metrics().incr(f"breaker.{self.name}.opened")
+
+
+class ResilientReader:
+    """
+    Read path guarded by a circuit breaker with a last known good cache.
+
+    Every successful fetch is remembered per cache key. When the fetch
+    fails, or the breaker is open, the remembered value is returned and
+    flagged as stale instead of waiting on the upstream. While serving
+    stale data, a single background refresh per key revalidates the
+    cache and acts as the breaker's half-open probe.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+
+    def __init__(self, name: str, breaker: Optional[CircuitBreaker] = None, max_keys: int = STALE_CACHE_MAX_KEYS):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name)
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+        self._last_good: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._revalidating: Set[Hashable] = set()
+
+    def read(self, key: Hashable, fetch: Callable[[], Any], use_last_good: bool = True) -> Tuple[Any, bool]:
+        """
+        Fetch a value through the breaker.
+
+        Args:
+            key: Cache key identifying the query (e.g. its arguments)
+            fetch: Callable performing the upstream read; raises on error
+            use_last_good: False to raise rather than return a remembered
+                value; the breaker still rejects calls while open
+
+        Returns:
+            Tuple of (value, is_stale)
+
+        Raises:
+            CircuitOpenError: If the breaker is open and nothing is cached
+                (or use_last_good is False)
+            Exception: The fetch error if the call failed and nothing is
+                cached (or use_last_good is False)
+        """
+        if not self.breaker.is_closed():
+            if use_last_good and self._has(key):
+                self._schedule_revalidation(key, fetch)
+                return self._stale_or_raise(key, CircuitOpenError(f"Circuit {self.name} is open"))
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"Circuit {self.name} is open")
+
+        start = time.monotonic()
+        try:
+            value = fetch()
+        except Exception as e:
+            self.breaker.record_error(e, time.monotonic() - start)
+            if not use_last_good:
+                raise
+            return self._stale_or_raise(key, e)
+
+        self.breaker.record_success(time.monotonic() - start)
+        self._remember(key, value)
+        return value, False
+
+    def invalidate(self) -> None:
+        """Drop every remembered value."""
+        with self._lock:
+            self._last_good.clear()
+
+    def _has(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._last_good
+
+    def _stale_or_raise(self, key: Hashable, error: Exception) -> Tuple[Any, bool]:
+        with self._lock:
+            if key in self._last_good:
+                self._last_good.move_to_end(key)
+                value = self._last_good[key]
+            else:
+                raise error
+        get_metrics().incr(f"stale_served.{self.name}")
+        return value, True
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._last_good[key] = value
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self._max_keys:
+                self._last_good.popitem(last=False)
+
+    def _schedule_revalidation(self, key: Hashable, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        if not self.breaker.allow_request():
+            with self._lock:
+                self._revalidating.discard(key)
+            return
+        self._executor.submit(self._revalidate, key, fetch)
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Any]) -> None:
+        start = time.monotonic()
+        try:
+            value = fetch()
+        except Exception as e:
+            self.breaker.record_error(e, time.monotonic() - start)
+            logger.warning(f"Background revalidation of {self.name} failed: {str(e)}")
+            get_metrics().incr(f"revalidation.{self.name}.failed")
+        else:
+            self.breaker.record_success(time.monotonic() - start)
+            self._remember(key, value)
+            get_metrics().incr(f"revalidation.{self.name}.succeeded")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+
+def breaker_states(readers: Dict[str, ResilientReader]) -> Dict[str, str]:
+    """Return the breaker state of each named reader."""
+    return {name: reader.breaker.state for name, reader in readers.items()}
+
+
+class UpstreamCaller:
+    """
+    Executes single upstream round trips under the request deadline.
+
+    Calls run on a bounded thread pool so the caller can stop waiting
+    when the deadline passes instead of holding its worker thread until
+    the HTTP client gives up. Requests use the pool of their bulkhead
+    group, so a group at its limit cannot starve another of threads.
+    Idempotent reads are retried on transient errors with full-jitter
+    exponential backoff, never sleeping past the deadline. When hedging
+    is enabled, a read that has not answered by the operation's observed
+    p95 latency gets a second identical request and the first successful
+    response wins.
+
+    A read given up at the deadline is cancelled if it has not started;
+    one already running cannot be stopped and is counted as abandoned.
+    Writes are never given up: one still running could commit after the
+    caller reported a failure, and a client retry would then apply it
+    twice. A write that has started is waited for, bounded only by the
+    HTTP client's timeout, even past the deadline.
+
+    Metrics (per operation name):
+        upstream.<op>: latency of each attempt
+        upstream.<op>.attempts / .retries / .errors / .deadline_exceeded
+        upstream.<op>.abandoned: reads still running when given up
+        upstream.<op>.deadline_overrun: writes that finished past the deadline
+        upstream.<op>.hedges / .hedge_wins / .primary_wins
+    """
+
+    def __init__(
+        self,
+        pool_size: int = UPSTREAM_POOL_SIZE,
+        max_attempts: int = UPSTREAM_MAX_ATTEMPTS,
+        backoff_base: float = UPSTREAM_BACKOFF_BASE_MS / 1000.0,
+        backoff_max: float = UPSTREAM_BACKOFF_MAX_MS / 1000.0,
+        hedge: bool = HEDGE_READS,
+        group_limits: Optional[Dict[str, int]] = None,
+    ):
+        # Calls made outside a bulkhead group (background jobs, scripts)
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="upstream")
+        # One pool per bulkhead group, with a thread per admitted request (two when hedging)
+        if group_limits is None:
+            # Imported here: middleware.bulkhead imports the services package
+            from middleware.bulkhead import BULKHEAD_LIMITS
+            group_limits = BULKHEAD_LIMITS
+        per_request = 2 if hedge else 1
+        self._group_pools: Dict[str, ThreadPoolExecutor] = {
+            group: ThreadPoolExecutor(max_workers=max(1, limit * per_request), thread_name_prefix=f"upstream-{group}")
+            for group, limit in group_limits.items()
+        }
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+
+    def call(self, operation: str, fn: Callable[[], Any], idempotent: bool = False) -> Any:
+        """
+        Run fn under the current deadline.
+
+        Args:
+            operation: Metric name of the operation (e.g. ``faqs.list``)
+            fn: Callable performing one round trip
+            idempotent: Whether fn may safely be retried and hedged
+
+        Returns:
+            The result of fn
+
+        Raises:
+            DeadlineExceeded: If the budget runs out (for writes, only
+                before the write is sent)
+            Exception: The last error raised by fn
+        """
+        metrics = get_metrics()
+        attempts = self.max_attempts if idempotent else 1
+        for attempt in range(1, attempts + 1):
+            if remaining_time() <= 0:
+                metrics.incr(f"upstream.{operation}.deadline_exceeded")
+                raise DeadlineExceeded(f"No time left for {operation}")
+            metrics.incr(f"upstream.{operation}.attempts")
+            try:
+                if idempotent and self.hedge:
+                    return self._hedged_attempt(operation, fn)
+                return self._attempt(operation, fn, idempotent)
+            except DeadlineExceeded:
+                metrics.incr(f"upstream.{operation}.deadline_exceeded")
+                raise
+            except Exception as e:
+                metrics.incr(f"upstream.{operation}.errors")
+                if attempt == attempts or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+                if delay >= remaining_time():
+                    raise
+                logger.warning(f"Retrying {operation} after {str(e)} (attempt {attempt})")
+                metrics.incr(f"upstream.{operation}.retries")
+                time.sleep(delay)
+
+    def _submit(self, operation: str, fn: Callable[[], Any]) -> Future:
+        def timed():
+            start = time.monotonic()
+            try:
+                return fn()
+            finally:
+                get_metrics().observe(f"upstream.{operation}", time.monotonic() - start)
+        context = current_request_context()
+        pool = self._group_pools.get(context.route_group) if context is not None else None
+        return (pool or self._pool).submit(timed)
+
+    def _attempt(self, operation: str, fn: Callable[[], Any], idempotent: bool) -> Any:
+        future = self._submit(operation, fn)
+        if not idempotent:
+            result = future.result()
+            if remaining_time() <= 0:
+                get_metrics().incr(f"upstream.{operation}.deadline_overrun")
+            return result
+        done, _ = wait([future], timeout=max(0.0, remaining_time()))
+        if not done:
+            self._abandon(operation, [future])
+            raise DeadlineExceeded(f"{operation} did not complete within the request deadline")
+        return future.result()
+
+    def _abandon(self, operation: str, futures: Iterable[Future]) -> None:
+        """Cancel calls no longer waited for; those already running are counted."""
+        for future in futures:
+            if not future.cancel() and not future.done():
+                get_metrics().incr(f"upstream.{operation}.abandoned")
+
+    def _hedged_attempt(self, operation: str, fn: Callable[[], Any]) -> Any:
+        metrics = get_metrics()
+        primary = self._submit(operation, fn)
+        hedge_after = self._hedge_delay(operation)
+        if hedge_after is None or hedge_after >= remaining_time():
+            done, _ = wait([primary], timeout=max(0.0, remaining_time()))
+            if not done:
+                self._abandon(operation, [primary])
+                raise DeadlineExceeded(f"{operation} did not complete within the request deadline")
+            return primary.result()
+
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        metrics.incr(f"upstream.{operation}.hedges")
+        secondary = self._submit(operation, fn)
+        pending = {primary, secondary}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, remaining_time()), return_when=FIRST_COMPLETED)
+            if not done:
+                self._abandon(operation, pending)
+                raise DeadlineExceeded(f"{operation} did not complete within the request deadline")
+            for future in done:
+                if future.exception() is None:
+                    winner = "hedge_wins" if future is secondary else "primary_wins"
+                    metrics.incr(f"upstream.{operation}.{winner}")
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _hedge_delay(self, operation: str) -> Optional[float]:
+        """Return the observed latency percentile to hedge after, or None until enough samples exist."""
+        metrics = get_metrics()
+        if metrics.counter(f"upstream.{operation}.attempts") < HEDGE_MIN_SAMPLES:
+            return None
+        return metrics.percentile(f"upstream.{operation}", HEDGE_PERCENTILE)
@@ -0,0 +1,418 @@
+"""
+In-process scheduler for periodic background jobs.
+
+Started and stopped by the FastAPI lifespan. Jobs are plain functions
+(run on the default thread pool, so they may block on Supabase) or
+coroutine functions, triggered either every N seconds or by a
+five-field cron expression evaluated in UTC::
+
+    minute hour day-of-month month day-of-week
+
+Each field takes ``*``, numbers, ranges (``1-5``), lists (``1,15``) and
+steps (``*/10``, ``0-30/5``); day of week runs from 0 (Sunday) to 6.
+
+With ``uvicorn --workers N`` every worker runs its own scheduler. Jobs
+that refresh process-local state run in every worker; jobs marked
+``leader_only`` run only in the worker holding an exclusive ``flock``
+on SCHEDULER_LOCK_FILE. The other workers retry the lock periodically,
+so a new leader takes over within SCHEDULER_LEADER_RETRY_SECONDS of
+the old one exiting. The lock is per host: leader-only jobs must be
+safe to run once per host.
+
+A job never overlaps itself: a run that comes due while the previous
+one is still going is skipped. On shutdown no new runs are started and
+runs in progress get SCHEDULER_DRAIN_SECONDS to finish.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+from services.metrics import get_metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE") or os.path.join(
+    tempfile.gettempdir(),
+    f"clarifyai-scheduler-{os.getuid() if hasattr(os, 'getuid') else 0}.lock",
+)
+SCHEDULER_LEADER_RETRY_SECONDS = float(os.getenv("SCHEDULER_LEADER_RETRY_SECONDS", "30"))
+SCHEDULER_DRAIN_SECONDS = float(os.getenv("SCHEDULER_DRAIN_SECONDS", "30"))
+
+# Longest the loop sleeps, so leadership and stop requests are noticed promptly
+_MAX_SLEEP_SECONDS = 1.0
+
+
+class CronSchedule:
+    """A parsed five-field cron expression."""
+
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: {expression!r}")
+        self.expression = expression
+        values = [
+            _parse_cron_field(part, low, high, name)
+            for part, (name, low, high) in zip(parts, self._FIELDS)
+        ]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        # Both 0 and 7 mean Sunday
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        First matching minute strictly after moment.
+
+        Args:
+            moment: Naive UTC datetime
+
+        Returns:
+            Naive UTC datetime of the next run
+
+        Raises:
+            ValueError: If nothing matches within four years (e.g. 31 February)
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=4 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                year = candidate.year + (candidate.month == 12)
+                candidate = datetime(year, month, 1)
+            elif not self._day_matches(candidate):
+                candidate = datetime(candidate.year, candidate.month, candidate.day) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # Python's weekday() has Monday as 0, cron has Sunday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        # As in cron, a restricted day of month and day of week match either
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+
+def _parse_cron_field(field: str, low: int, high: int, name: str) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        spec, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start_text, end_text = spec.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(spec)
+            end = high if step_text else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Invalid cron {name} field: {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Job:
+    """A registered job and its run state."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval: Optional[float] = None,
+        cron: Optional[CronSchedule] = None,
+        jitter: float = 0.0,
+        leader_only: bool = False,
+        run_at_start: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        self.leader_only = leader_only
+        self.run_at_start = run_at_start
+        self.next_run = 0.0
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def schedule_next(self, now: float) -> None:
+        """Set next_run (epoch seconds) to the next trigger after now, plus jitter."""
+        if self.cron is not None:
+            due = self.cron.next_after(datetime.utcfromtimestamp(now)) - datetime(1970, 1, 1)
+            self.next_run = due.total_seconds()
+        else:
+            self.next_run = now + self.interval
+        if self.jitter:
+            self.next_run += random.uniform(0, self.jitter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trigger": self.cron.expression if self.cron is not None else f"every {self.interval:g}s",
+            "leader_only": self.leader_only,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "next_run": datetime.utcfromtimestamp(self.next_run).isoformat() if self.next_run else None,
+            "last_started": datetime.utcfromtimestamp(self.last_started).isoformat() if self.last_started else None,
+            "last_duration_ms": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """Runs registered jobs on an asyncio task until stopped."""
+
+    def __init__(self, lock_path: str = SCHEDULER_LOCK_FILE):
+        self.lock_path = lock_path
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._lock_fd: Optional[int] = None
+        self._next_leader_attempt = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def add_interval_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        seconds: float,
+        jitter: float = 0.0,
+        leader_only: bool = False,
+        run_at_start: bool = False
+    ) -> Job:
+        """
+        Run func every seconds.
+
+        Args:
+            name: Unique job name, used in logs and metrics
+            func: Function or coroutine function taking no arguments
+            seconds: Time between runs
+            jitter: Up to this many seconds are added to each run, so
+                workers started together do not run in lockstep
+            leader_only: Only run in the worker holding the leader lock
+            run_at_start: Run once as soon as the scheduler starts
+
+        Returns:
+            The registered job
+
+        Raises:
+            ValueError: If seconds is not positive
+        """
+        if seconds <= 0:
+            raise ValueError(f"Interval of job {name} must be positive")
+        return self._add(Job(name, func, interval=seconds, jitter=jitter,
+                             leader_only=leader_only, run_at_start=run_at_start))
+
+    def add_cron_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        expression: str,
+        jitter: float = 0.0,
+        leader_only: bool = False
+    ) -> Job:
+        """
+        Run func at the minutes matching a cron expression (UTC).
+
+        Args:
+            name: Unique job name, used in logs and metrics
+            func: Function or coroutine function taking no arguments
+            expression: Five-field cron expression
+            jitter: Up to this many seconds are added to each run
+            leader_only: Only run in the worker holding the leader lock
+
+        Returns:
+            The registered job
+
+        Raises:
+            ValueError: If the expression is invalid
+        """
+        return self._add(Job(name, func, cron=CronSchedule(expression), jitter=jitter, leader_only=leader_only))
+
+    def _add(self, job: Job) -> Job:
+        if job.name in self._jobs:
+            raise ValueError(f"Job {job.name} is already registered")
+        self._jobs[job.name] = job
+        if self._task is not None:
+            self._arm(job, time.time())
+        return job
+
+    def start(self) -> None:
+        """Start the scheduling loop on the running event loop."""
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        now = time.time()
+        for job in self._jobs.values():
+            self._arm(job, now)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="scheduler")
+        logger.info(f"Scheduler started with {len(self._jobs)} jobs")
+
+    async def stop(self, drain_seconds: float = SCHEDULER_DRAIN_SECONDS) -> None:
+        """
+        Stop starting new runs and wait for runs in progress.
+
+        Runs still going after drain_seconds are abandoned (a job running
+        on a thread cannot be interrupted; it finishes in the background).
+        """
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        if self._in_flight:
+            names = [task.get_name() for task in self._in_flight]
+            logger.info(f"Scheduler draining {len(names)} running jobs: {', '.join(names)}")
+            _, pending = await asyncio.wait(self._in_flight, timeout=drain_seconds)
+            for task in pending:
+                logger.warning(f"Scheduler job {task.get_name()} did not finish within {drain_seconds:g}s")
+                task.cancel()
+        self._release_leadership()
+        logger.info("Scheduler stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """Leadership and per-job run state, for the /metrics endpoint."""
+        return {
+            "running": self._task is not None,
+            "leader": self.is_leader,
+            "jobs": {name: job.stats() for name, job in self._jobs.items()},
+        }
+
+    def _arm(self, job: Job, now: float) -> None:
+        if job.run_at_start:
+            job.next_run = now + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        else:
+            job.schedule_next(now)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            now = time.time()
+            if not self.is_leader and now >= self._next_leader_attempt:
+                self._try_leadership(now)
+            for job in self._jobs.values():
+                if job.next_run <= now:
+                    self._dispatch(job, now)
+            next_due = min((job.next_run for job in self._jobs.values()), default=now + _MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(
+                    self._stopping.wait(), timeout=min(_MAX_SLEEP_SECONDS, max(0.0, next_due - time.time()))
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, job: Job, now: float) -> None:
+        metrics = get_metrics()
+        due = job.next_run
+        job.schedule_next(now)
+        if job.leader_only and not self.is_leader:
+            return
+        if job.running:
+            metrics.incr(f"scheduler.{job.name}.skipped")
+            logger.warning(f"Scheduler job {job.name} still running; skipping this run")
+            return
+        # Time between the run's due time and its start, e.g. from a busy event loop
+        metrics.observe(f"scheduler.{job.name}.lag", max(0.0, now - due))
+        job.running = True
+        task = asyncio.get_running_loop().create_task(self._execute(job), name=job.name)
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _execute(self, job: Job) -> None:
+        metrics = get_metrics()
+        job.last_started = time.time()
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await job.func()
+            else:
+                await asyncio.to_thread(job.func)
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            metrics.incr(f"scheduler.{job.name}.failures")
+            logger.error(f"Scheduler job {job.name} failed: {str(e)}", exc_info=True)
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_duration = time.perf_counter() - started
+            metrics.incr(f"scheduler.{job.name}.runs")
+            metrics.observe(f"scheduler.{job.name}", job.last_duration)
+
+    def _try_leadership(self, now: float) -> None:
+        self._next_leader_attempt = now + SCHEDULER_LEADER_RETRY_SECONDS
+        if fcntl is None:
+            # No flock: every worker leads
+            self._lock_fd = -1
+            return
+        fd = None
+        try:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            if fd is not None:
+                os.close(fd)
+            if not isinstance(e, BlockingIOError):
+                logger.error(f"Failed to open scheduler lock {self.lock_path}: {str(e)}")
+            return
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        self._lock_fd = fd
+        get_metrics().incr("scheduler.leader_elected")
+        logger.info(f"Scheduler leadership acquired by pid {os.getpid()} ({self.lock_path})")
+
+    def _release_leadership(self) -> None:
+        if self._lock_fd is not None and self._lock_fd >= 0:
+            # Closing the descriptor releases the flock
+            os.close(self._lock_fd)
+        self._lock_fd = None
+
+
+# Singleton instance
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Get or create the singleton Scheduler instance.
+
+    Returns:
+        Scheduler instance
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
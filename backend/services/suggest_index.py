@@ -0,0 +1,275 @@
+"""
+Typeahead completions for FAQ questions.
+
+Words from FAQ questions and tags are kept in a sorted vocabulary, and
+each word has a posting list of FAQs ordered by view count. The
+completions for a partial word are the most viewed FAQs across the
+vocabulary range sharing that prefix. They come from a k-way merge of
+those postings, memoised per short prefix, so a keystroke costs a
+bisect and a small slice.
+
+Words typed before the partial one must all appear in a suggested FAQ.
+The most selective of them, or the partial word's own postings, drives
+a scan in view order that stops as soon as enough completions are
+found.
+
+The index is maintained incrementally as a FAQCatalog listener.
+"""
+
+import heapq
+import os
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from services.fuzzy_index import STOPWORDS, tokenize
+
+SUGGEST_DEPTH = int(os.getenv("SUGGEST_DEPTH", "20"))
+SUGGEST_CACHED_PREFIX_CHARS = int(os.getenv("SUGGEST_CACHED_PREFIX_CHARS", "4"))
+SUGGEST_MAX_SCAN = int(os.getenv("SUGGEST_MAX_SCAN", "2000"))
+SUGGEST_MERGE_MAX_WORDS = int(os.getenv("SUGGEST_MERGE_MAX_WORDS", "64"))
+
+# Posting entries sort by (-view_count, slot), most viewed first
+_Entry = Tuple[int, int]
+
+
+class SuggestIndex:
+    """Most-viewed FAQs by word prefix, for per-keystroke suggestions."""
+
+    def __init__(self, depth: int = SUGGEST_DEPTH):
+        self.depth = depth
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_weights: List[int] = []
+        self._doc_words: List[FrozenSet[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+        self._vocabulary: List[str] = []
+        self._postings: Dict[str, List[_Entry]] = {}
+        self._prefix_cache: Dict[str, List[_Entry]] = {}
+
+    # ------------------------------------------------------------------
+    # Catalog listener interface
+    # ------------------------------------------------------------------
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._clear()
+            postings: Dict[str, List[_Entry]] = {}
+            for row in rows:
+                slot, words = self._new_slot(row)
+                for word in words:
+                    postings.setdefault(word, []).append((-self._doc_weights[slot], slot))
+            for posting in postings.values():
+                posting.sort()
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        faq_id = str(row["id"])
+        with self._lock:
+            slot = self._slots.get(faq_id)
+            if slot is not None and self._doc_words[slot] == _words(row):
+                self._reweight(slot, int(row.get("view_count") or 0))
+                return
+            self._discard(faq_id)
+            slot, words = self._new_slot(row)
+            entry = (-self._doc_weights[slot], slot)
+            for word in words:
+                posting = self._postings.get(word)
+                if posting is None:
+                    self._postings[word] = [entry]
+                    insort(self._vocabulary, word)
+                else:
+                    insort(posting, entry)
+            self._forget_prefixes(words)
+
+    def remove(self, faq_id: str) -> None:
+        with self._lock:
+            self._discard(str(faq_id))
+
+    def reweight(self, faq_id: str, view_count: int) -> None:
+        with self._lock:
+            slot = self._slots.get(str(faq_id))
+            if slot is not None:
+                self._reweight(slot, view_count)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def suggest(self, text: str, limit: int = 8) -> List[str]:
+        """
+        Return the IDs of the most viewed FAQs completing text.
+
+        The last word is treated as a prefix unless text ends in a
+        space or punctuation.
+
+        Args:
+            text: What the user has typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            FAQ IDs, most viewed first
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        prefix: Optional[str] = None
+        if text[-1:].isalnum():
+            prefix = tokens.pop()
+        required = [token for token in tokens if token not in STOPWORDS]
+
+        with self._lock:
+            if not required:
+                if prefix is None:
+                    return []
+                return [self._doc_ids[slot] for _, slot in self._top_for_prefix(prefix)[:limit]]
+
+            postings = []
+            for word in required:
+                posting = self._postings.get(word)
+                if not posting:
+                    return []
+                postings.append(posting)
+            driver = min(postings, key=len)
+            others = [word for word, posting in zip(required, postings) if posting is not driver]
+
+            # A selective prefix drives the scan better than common typed words
+            if prefix is not None:
+                low, high = self._prefix_range(prefix)
+                if high - low <= SUGGEST_MERGE_MAX_WORDS:
+                    ranged = [self._postings[word] for word in self._vocabulary[low:high]]
+                    if sum(len(posting) for posting in ranged) < len(driver):
+                        return self._scan(heapq.merge(*ranged), required, None, limit)
+            return self._scan(iter(driver), others, prefix, limit)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._slots),
+                "vocabulary": len(self._vocabulary),
+                "postings": sum(len(posting) for posting in self._postings.values()),
+                "cached_prefixes": len(self._prefix_cache),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        low = bisect_left(self._vocabulary, prefix)
+        return low, bisect_left(self._vocabulary, prefix + "\uffff", low)
+
+    def _scan(self, entries: Iterator[_Entry], required: Iterable[str], prefix: Optional[str], limit: int) -> List[str]:
+        """Walk entries in view order, keeping FAQs with every required word and the prefix."""
+        results: List[str] = []
+        seen = set()
+        required_words = frozenset(required)
+        doc_words = self._doc_words
+        for _, slot in islice(entries, SUGGEST_MAX_SCAN):
+            words = doc_words[slot]
+            if not required_words <= words or slot in seen:
+                continue
+            seen.add(slot)
+            if prefix is not None and prefix not in words and not any(word.startswith(prefix) for word in words):
+                continue
+            results.append(self._doc_ids[slot])
+            if len(results) >= limit:
+                break
+        return results
+
+    def _top_for_prefix(self, prefix: str) -> List[_Entry]:
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+        low, high = self._prefix_range(prefix)
+        top: List[_Entry] = []
+        seen = set()
+        for entry in heapq.merge(*(self._postings[word] for word in self._vocabulary[low:high])):
+            if entry[1] in seen:
+                continue
+            seen.add(entry[1])
+            top.append(entry)
+            if len(top) >= self.depth:
+                break
+        if len(prefix) <= SUGGEST_CACHED_PREFIX_CHARS:
+            self._prefix_cache[prefix] = top
+        return top
+
+    def _forget_prefixes(self, words: Iterable[str]) -> None:
+        for word in words:
+            for end in range(1, min(len(word), SUGGEST_CACHED_PREFIX_CHARS) + 1):
+                self._prefix_cache.pop(word[:end], None)
+
+    def _reweight(self, slot: int, weight: int) -> None:
+        """Move an FAQ within its postings after a view count change."""
+        old_entry = (-self._doc_weights[slot], slot)
+        new_entry = (-weight, slot)
+        if old_entry == new_entry:
+            return
+        self._doc_weights[slot] = weight
+        words = self._doc_words[slot]
+        for word in words:
+            posting = self._postings[word]
+            del posting[bisect_left(posting, old_entry)]
+            insort(posting, new_entry)
+
+        if new_entry > old_entry:
+            # Fewer views: the next best FAQ is unknown, recompute lazily
+            self._forget_prefixes(words)
+            return
+        # More views can only move the FAQ up within cached top lists
+        prefixes = {word[:end] for word in words for end in range(1, min(len(word), SUGGEST_CACHED_PREFIX_CHARS) + 1)}
+        for prefix in prefixes:
+            top = self._prefix_cache.get(prefix)
+            if top is None:
+                continue
+            if old_entry in top:
+                top.remove(old_entry)
+            elif len(top) >= self.depth and new_entry > top[-1]:
+                continue
+            insort(top, new_entry)
+            del top[self.depth:]
+
+    def _new_slot(self, row: Dict[str, Any]) -> Tuple[int, FrozenSet[str]]:
+        faq_id = str(row["id"])
+        words = _words(row)
+        weight = int(row.get("view_count") or 0)
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._doc_ids[slot] = faq_id
+            self._doc_weights[slot] = weight
+            self._doc_words[slot] = words
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(faq_id)
+            self._doc_weights.append(weight)
+            self._doc_words.append(words)
+        self._slots[faq_id] = slot
+        return slot, words
+
+    def _discard(self, faq_id: str) -> None:
+        slot = self._slots.pop(faq_id, None)
+        if slot is None:
+            return
+        entry = (-self._doc_weights[slot], slot)
+        words = self._doc_words[slot]
+        for word in words:
+            posting = self._postings[word]
+            del posting[bisect_left(posting, entry)]
+            if not posting:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+        self._forget_prefixes(words)
+        self._doc_ids[slot] = None
+        self._doc_words[slot] = frozenset()
+        self._free_slots.append(slot)
+
+
+def _words(row: Dict[str, Any]) -> FrozenSet[str]:
+    return frozenset(tokenize(" ".join([row.get("question") or ""] + list(row.get("tags") or []))))
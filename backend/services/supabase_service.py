@@ -7,13 +7,39 @@ database tables including FAQs, Announcements, and Chat Logs.
 
 import logging
 import os
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from datetime import datetime
 
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from postgrest.exceptions import APIError
 
+from middleware.request_context import DB_TIMING_PREFIX, mark_stale, record_timing
+from models.database import FAQ_FIELDS
+from services.announcement_stream import AnnouncementBroker
+from services.announcement_store import (
+    AnnouncementStore, ANNOUNCEMENT_STORE_ENABLED, ANNOUNCEMENT_STORE_MAX_ROWS, ANNOUNCEMENT_STORE_PAGE_SIZE
+)
+from services.chat_history_cache import CHAT_HISTORY_CACHE_ENABLED, ChatHistoryCache
+from services.compact_store import parse_timestamp
+from services.dedup import DuplicateIndex
+from services.faq_catalog import FAQCatalog, FAQ_CATALOG_MAX_ROWS, FAQ_CATALOG_PAGE_SIZE
+from services.fuzzy_index import FuzzyIndex
+from services.index_snapshot import FAQ_SNAPSHOT_DIR, FAQ_SNAPSHOT_KEEP, Snapshot
+from services.suggest_index import SuggestIndex
+from services.invalidation import get_invalidation_bus
+from services.local_store import LocalStore
+from services.metrics import get_metrics
+from services.process_pool import (
+    PROCESS_POOL_MIN_FAQS,
+    PROCESS_POOL_MIN_QUESTIONS,
+    Scores,
+    build_index_snapshot,
+    get_cpu_pool,
+)
+from services.resilience import ResilientReader, CircuitOpenError, UpstreamCaller, breaker_states
+
 # Load environment variables
 load_dotenv()
 
@@ -21,6 +47,33 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# IDs per ``in`` filter, keeping batch lookups well under URL length limits
+FAQ_BATCH_QUERY_CHUNK = int(os.getenv("FAQ_BATCH_QUERY_CHUNK", "100"))
+# FAQ search backend: "memory" ranks with the in-process fuzzy index,
+# "postgres" with the search_faqs() full-text function of setup_database.sql
+FAQ_SEARCH_BACKEND = os.getenv("FAQ_SEARCH_BACKEND", "memory").lower()
+# Chat log archiving: logs per archive_chat_logs() call, pause between calls,
+# and how long one run may take before leaving the rest for the next run
+CHAT_LOG_ARCHIVE_BATCH = int(os.getenv("CHAT_LOG_ARCHIVE_BATCH", "1000"))
+CHAT_LOG_ARCHIVE_PAUSE_MS = float(os.getenv("CHAT_LOG_ARCHIVE_PAUSE_MS", "200"))
+CHAT_LOG_ARCHIVE_MAX_SECONDS = float(os.getenv("CHAT_LOG_ARCHIVE_MAX_SECONDS", "600"))
+
+
+# FAQ columns read by default: every one but the generated search_vector
+_FAQ_COLUMNS = ",".join(FAQ_FIELDS)
+
+
+def _column_list(columns: Optional[Sequence[str]]) -> str:
+    """PostgREST select list for columns (all when None)."""
+    return ",".join(columns) if columns else "*"
+
+
+def _project(row: Dict[str, Any], columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Row restricted to columns, for results answered from memory."""
+    if not columns:
+        return row
+    return {column: row.get(column) for column in columns}
+
 
 class SupabaseService:
     """
@@ -34,17 +87,110 @@ class SupabaseService:
         """Initialize Supabase client with environment credentials."""
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+        # "supabase" (default) or "local" for the in-memory stand-in
+        self.backend = os.getenv("SUPABASE_BACKEND", "supabase").lower()
         
-        if not self.supabase_url or not self.supabase_key:
-            logger.error("Supabase credentials not found in environment variables")
-            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
-        
+        if self.backend == "local":
+            # In-memory stand-in for load tests and offline replay
+            self.client = LocalStore()
+            logger.warning("Using the in-memory local storage backend; data is not persisted")
+        else:
+            if not self.supabase_url or not self.supabase_key:
+                logger.error("Supabase credentials not found in environment variables")
+                raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+            
+            try:
+                # Echoed into NOTIFY payloads, so listeners can skip the writes the bus already broadcast
+                options = ClientOptions()
+                options.headers["X-Cache-Origin"] = get_invalidation_bus().origin
+                self.client: Client = create_client(self.supabase_url, self.supabase_key, options)
+                logger.info("Supabase client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Supabase client: {str(e)}")
+                raise
+
+        # Breaker-guarded readers with last known good fallback
+        self.readers: Dict[str, ResilientReader] = {
+            name: ResilientReader(name)
+            for name in ("faqs.list", "faqs.get", "faqs.search", "announcements.list", "announcements.get")
+        }
+        self.upstream = UpstreamCaller()
+        self.announcement_store = AnnouncementStore(self._load_upcoming_announcements, self.get_announcement_by_id)
+        self.announcement_stream = AnnouncementBroker(self.get_announcement_by_id)
+
+        # CPU-bound index builds and batch scoring run here when the pool is started
+        self.cpu_pool = get_cpu_pool()
+        self._scoring_snapshot: Optional[Tuple[int, str]] = None
+
+        # In-memory FAQ corpus feeding the search indexes
+        self.faq_catalog = FAQCatalog(
+            self._load_all_faqs,
+            self._load_faq,
+            changed_since=self._load_faqs_changed_since,
+            snapshot_dir=FAQ_SNAPSHOT_DIR,
+            builder=self._build_search_snapshot
+        )
+        self.faq_search = FuzzyIndex()
+        self.faq_suggest = SuggestIndex()
+        self.faq_catalog.add_listener(self.faq_search)
+        self.faq_duplicates = DuplicateIndex()
+        self.faq_catalog.add_listener(self.faq_suggest)
+        self.faq_catalog.add_listener(self.faq_duplicates)
+
+        # Recent chat history of active users, kept current by our own writes
+        self.chat_history = ChatHistoryCache() if CHAT_HISTORY_CACHE_ENABLED else None
+
+        # Cross-worker cache invalidation
+        self.bus = get_invalidation_bus()
+        self.bus.subscribe("announcements", self.announcement_store.apply_event)
+        self.bus.subscribe("announcements", self.announcement_stream.apply_event)
+        self.bus.subscribe("faqs", self.faq_catalog.apply_event)
+        if self.chat_history is not None:
+            self.bus.subscribe("chat_logs", self.chat_history.apply_event)
+
+    def _execute(self, operation: str, query, idempotent: bool = False):
+        """
+        Execute a PostgREST query under the current request deadline.
+
+        Args:
+            operation: Metric name of the operation (e.g. ``faqs.list``)
+            query: Built PostgREST request
+            idempotent: True for reads, which may be retried and hedged
+
+        Returns:
+            PostgREST API response
+        """
+        started = time.perf_counter()
         try:
-            self.client: Client = create_client(self.supabase_url, self.supabase_key)
-            logger.info("Supabase client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {str(e)}")
-            raise
+            return self.upstream.call(operation, query.execute, idempotent=idempotent)
+        finally:
+            record_timing(DB_TIMING_PREFIX + operation, time.perf_counter() - started)
+
+    def _guarded_read(self, reader_name: str, key: tuple, fetch, use_last_good: bool = True) -> Any:
+        """
+        Run a read through its circuit breaker.
+
+        Falls back to the last known good result when the upstream fails
+        or the breaker is open, and flags the current request as stale.
+
+        Args:
+            reader_name: Name of the reader (table and operation)
+            key: Cache key identifying the query
+            fetch: Callable performing the read; raises on error
+            use_last_good: False to raise instead of falling back
+
+        Returns:
+            The fresh or stale result
+        """
+        data, stale = self.readers[reader_name].read(key, fetch, use_last_good)
+        if stale:
+            logger.warning(f"Serving stale {reader_name} result")
+            mark_stale(reader_name.split(".")[0])
+        return data
+
+    def breaker_states(self) -> Dict[str, str]:
+        """Return the circuit breaker state of every guarded read."""
+        return breaker_states(self.readers)
 
     # ========================================================================
     # FAQ Operations
@@ -53,29 +199,46 @@ class SupabaseService:
     def get_all_faqs(
         self, 
         category: Optional[str] = None, 
-        limit: int = 100
+        limit: int = 100,
+        columns: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve all active FAQs, optionally filtered by category.
         
+        Answered from the in-memory FAQ catalog once it has loaded;
+        Supabase is only queried when the catalog is unavailable.
+        
         Args:
             category: Optional category filter
             limit: Maximum number of FAQs to return (default: 100)
+            columns: Columns to fetch (default: all)
             
         Returns:
-            List of FAQ dictionaries
+            List of FAQ dictionaries, newest first
         """
-        try:
-            query = self.client.table("faqs").select("*").eq("is_active", True)
+        if self.faq_catalog.ensure_loaded():
+            self.bus.poll()
+            data = [_project(record.to_row(), columns) for record in self.faq_catalog.query(category=category, limit=limit)]
+            logger.info(f"Retrieved {len(data)} FAQs from catalog")
+            return data
+
+        def fetch() -> List[Dict[str, Any]]:
+            query = self.client.table("faqs").select(_column_list(columns or FAQ_FIELDS)).eq("is_active", True)
             
             if category:
                 query = query.eq("category", category)
             
             query = query.limit(limit).order("created_at", desc=True)
             
-            response = query.execute()
-            logger.info(f"Retrieved {len(response.data)} FAQs")
-            return response.data
+            return self._execute("faqs.list", query, idempotent=True).data
+
+        try:
+            data = self._guarded_read("faqs.list", (category, limit, _column_list(columns)), fetch)
+            logger.info(f"Retrieved {len(data)} FAQs")
+            return data
+        except CircuitOpenError as e:
+            logger.error(f"Skipping get_all_faqs: {str(e)}")
+            return []
         except APIError as e:
             logger.error(f"Supabase API error in get_all_faqs: {str(e)}")
             return []
@@ -83,25 +246,34 @@ class SupabaseService:
             logger.error(f"Unexpected error in get_all_faqs: {str(e)}")
             return []
 
-    def get_faq_by_id(self, faq_id: str) -> Optional[Dict[str, Any]]:
+    def get_faq_by_id(self, faq_id: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
         """
         Retrieve a single FAQ by its ID.
         
         Args:
             faq_id: UUID of the FAQ
+            fresh: Never answer with a last known good result; for the
+                checks that authorize a write
             
         Returns:
             FAQ dictionary or None if not found
         """
+        def fetch() -> List[Dict[str, Any]]:
+            query = self.client.table("faqs").select(_FAQ_COLUMNS).eq("id", faq_id)
+            return self._execute("faqs.get", query, idempotent=True).data
+
         try:
-            response = self.client.table("faqs").select("*").eq("id", faq_id).execute()
+            data = self._guarded_read("faqs.get", (faq_id,), fetch, use_last_good=not fresh)
             
-            if response.data and len(response.data) > 0:
+            if data and len(data) > 0:
                 logger.info(f"Retrieved FAQ with ID: {faq_id}")
-                return response.data[0]
+                return data[0]
             else:
                 logger.warning(f"FAQ not found with ID: {faq_id}")
                 return None
+        except CircuitOpenError as e:
+            logger.error(f"Skipping get_faq_by_id: {str(e)}")
+            return None
         except APIError as e:
             logger.error(f"Supabase API error in get_faq_by_id: {str(e)}")
             return None
@@ -109,6 +281,341 @@ class SupabaseService:
             logger.error(f"Unexpected error in get_faq_by_id: {str(e)}")
             return None
 
+    def get_faqs_by_ids(self, faq_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Retrieve several FAQs by ID.
+
+        Active FAQs come from the in-memory catalog; the rest (inactive,
+        or not yet in the catalog) are fetched with one ``in`` query per
+        FAQ_BATCH_QUERY_CHUNK IDs.
+
+        Args:
+            faq_ids: UUIDs of the FAQs
+
+        Returns:
+            Dictionary of found FAQs keyed by ID, or None on error
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        if self.faq_catalog.ensure_loaded():
+            self.bus.poll()
+            for faq_id in faq_ids:
+                row = self.faq_catalog.get(faq_id)
+                if row is not None:
+                    found[faq_id] = row
+        remaining = [faq_id for faq_id in faq_ids if faq_id not in found]
+
+        try:
+            for start in range(0, len(remaining), FAQ_BATCH_QUERY_CHUNK):
+                chunk = remaining[start:start + FAQ_BATCH_QUERY_CHUNK]
+                query = self.client.table("faqs").select(_FAQ_COLUMNS).in_("id", chunk)
+                for row in self._execute("faqs.get_many", query, idempotent=True).data:
+                    found[str(row["id"])] = row
+        except CircuitOpenError as e:
+            logger.error(f"Skipping get_faqs_by_ids: {str(e)}")
+            return None
+        except APIError as e:
+            logger.error(f"Supabase API error in get_faqs_by_ids: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in get_faqs_by_ids: {str(e)}")
+            return None
+
+        logger.info(f"Retrieved {len(found)} of {len(faq_ids)} FAQs ({len(faq_ids) - len(remaining)} from catalog)")
+        return found
+
+    def search_faqs(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 100,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search active FAQs.
+        
+        With FAQ_SEARCH_BACKEND=postgres, ranking and highlighting run in
+        the database (see search_faqs_full_text). Otherwise ranked results
+        come from the in-memory fuzzy index, which tolerates misspelled
+        words; when the FAQ catalog cannot be loaded, falls back to a
+        substring match over the regular list query.
+        
+        Args:
+            query: Free text search
+            category: Optional category filter
+            limit: Maximum number of FAQs to return (default: 100)
+            columns: Columns to return (default: all)
+            
+        Returns:
+            List of FAQ dictionaries, best match first
+        """
+        if FAQ_SEARCH_BACKEND == "postgres":
+            return self.search_faqs_full_text(query, category=category, limit=limit, columns=columns)
+
+        if self.faq_catalog.ensure_loaded():
+            self.bus.poll()
+            hits = self.faq_search.search(query, limit=limit, category=category)
+            data = [
+                _project(row, columns)
+                for row in (self.faq_catalog.get(faq_id) for faq_id, _ in hits) if row is not None
+            ]
+            logger.info(f"Fuzzy search returned {len(data)} FAQs")
+            return data
+
+        # The fallback matches on these, so they are fetched even when not returned
+        search_lower = query.lower()
+        fetched = None if columns is None else sorted(set(columns) | {"question", "answer", "tags"})
+        return [
+            _project(faq, columns) for faq in self.get_all_faqs(category=category, limit=limit, columns=fetched)
+            if search_lower in faq.get("question", "").lower() or
+               search_lower in faq.get("answer", "").lower() or
+               search_lower in " ".join(faq.get("tags", [])).lower()
+        ]
+
+    def search_faqs_full_text(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 100,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search active FAQs with Postgres full-text search.
+        
+        Calls search_faqs() (setup_database.sql), which matches the query
+        in web search syntax against the GIN-indexed search_vector of
+        each FAQ and returns only the best ``limit`` rows, ranked with
+        ts_rank. Words are stemmed but not corrected for typos.
+        
+        Args:
+            query: Free text search
+            category: Optional category filter
+            limit: Maximum number of FAQs to return (default: 100)
+            columns: Columns to return (default: all)
+            
+        Returns:
+            List of FAQ dictionaries, best match first, each with a
+            ``rank`` and ``highlights`` (``question`` and ``answer``
+            excerpts with the matched words in ``<mark>`` tags)
+        """
+        def fetch() -> List[Dict[str, Any]]:
+            params = {"search_query": query, "category_filter": category, "result_limit": limit}
+            return self._execute("faqs.search", self.client.rpc("search_faqs", params), idempotent=True).data or []
+
+        try:
+            rows = self._guarded_read("faqs.search", (query, category, limit), fetch)
+        except CircuitOpenError as e:
+            logger.error(f"Skipping search_faqs_full_text: {str(e)}")
+            return []
+        except APIError as e:
+            logger.error(f"Supabase API error in search_faqs_full_text: {str(e)}")
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error in search_faqs_full_text: {str(e)}")
+            return []
+
+        # Rows may be the reader's cached last known good result; copy before reshaping
+        returned = None if columns is None else [*columns, "rank", "highlights"]
+        data = []
+        for row in rows:
+            row = dict(row)
+            row["highlights"] = {
+                "question": row.pop("question_highlight", None) or row.get("question", ""),
+                "answer": row.pop("answer_highlight", None) or "",
+            }
+            data.append(_project(row, returned))
+        logger.info(f"Full-text search returned {len(data)} FAQs")
+        return data
+
+    def suggest_faqs(self, text: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """
+        Suggest FAQs completing a partially typed question.
+        
+        Answered from the in-memory suggestion index only; returns an
+        empty list while the FAQ catalog is unavailable rather than
+        querying Supabase on every keystroke.
+        
+        Args:
+            text: What the user has typed so far
+            limit: Maximum number of suggestions (default: 8)
+            
+        Returns:
+            List of FAQ dictionaries, most viewed first
+        """
+        if not self.faq_catalog.ensure_loaded():
+            return []
+        return [
+            row for row in (self.faq_catalog.get(faq_id) for faq_id in self.faq_suggest.suggest(text, limit=limit))
+            if row is not None
+        ]
+
+    def find_duplicate_faqs(
+        self,
+        question: str,
+        answer: str = "",
+        exclude_id: Optional[str] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Find active FAQs that are likely near-duplicates of the given text.
+        
+        Args:
+            question: FAQ question
+            answer: FAQ answer
+            exclude_id: Optional ID of the FAQ being checked, excluded from results
+            limit: Maximum number of matches (default: 5)
+            
+        Returns:
+            List of FAQ dictionaries with an added ``similarity`` key, most
+            similar first; empty while the FAQ catalog is unavailable
+        """
+        if not self.faq_catalog.ensure_loaded():
+            return []
+        duplicates = []
+        for faq_id, score in self.faq_duplicates.find_similar(question, answer, exclude_id=exclude_id, limit=limit):
+            row = self.faq_catalog.get(faq_id)
+            if row is not None:
+                duplicates.append({**row, "similarity": score})
+        return duplicates
+
+    def score_questions(
+        self,
+        questions: List[str],
+        limit: int = 5,
+        category: Optional[str] = None
+    ) -> Scores:
+        """
+        Match many questions against the active FAQs at once.
+        
+        Batches of PROCESS_POOL_MIN_QUESTIONS or more are scored in the
+        process pool against a snapshot of the current catalog, built
+        once per catalog change; smaller batches use the in-memory index.
+        
+        Args:
+            questions: Questions to match
+            limit: Matches per question (default: 5)
+            category: Optional category filter
+            
+        Returns:
+            (faq_id, score) matches per question, best first; empty
+            lists while the FAQ catalog is unavailable
+        """
+        if not self.faq_catalog.ensure_loaded():
+            return [[] for _ in questions]
+        self.bus.poll()
+        if self.cpu_pool.running and len(questions) >= PROCESS_POOL_MIN_QUESTIONS:
+            try:
+                generation = self.faq_catalog.generation
+                if self._scoring_snapshot is None or self._scoring_snapshot[0] != generation:
+                    snapshot = self.cpu_pool.build_index_snapshot(self.faq_catalog.rows())
+                    self._scoring_snapshot = (generation, snapshot.path)
+                return self.cpu_pool.score(self._scoring_snapshot[1], questions, limit, category)
+            except Exception as e:
+                logger.error(f"Offloaded scoring failed, scoring inline: {str(e)}")
+        return [self.faq_search.search(question, limit=limit, category=category) for question in questions]
+
+    def _build_search_snapshot(self, rows: List[Dict[str, Any]]) -> Optional[Snapshot]:
+        """Catalog builder: index large FAQ sets in the process pool."""
+        if not self.cpu_pool.running or len(rows) < PROCESS_POOL_MIN_FAQS:
+            return None
+        return self.cpu_pool.build_index_snapshot(rows)
+
+    def _load_all_faqs(self) -> List[Dict[str, Any]]:
+        """
+        Fetch every active FAQ, page by page.
+        
+        Used to fill the FAQ catalog; raises on failure.
+        
+        Returns:
+            List of FAQ dictionaries
+        """
+        rows: List[Dict[str, Any]] = []
+        while len(rows) < FAQ_CATALOG_MAX_ROWS:
+            start = len(rows)
+            end = min(start + FAQ_CATALOG_PAGE_SIZE, FAQ_CATALOG_MAX_ROWS) - 1
+            query = (
+                self.client.table("faqs")
+                .select(_FAQ_COLUMNS)
+                .eq("is_active", True)
+                .order("id")
+                .range(start, end)
+            )
+            page = self._execute("faqs.load_catalog", query, idempotent=True).data
+            rows.extend(page)
+            if len(page) < end - start + 1:
+                break
+        return rows
+
+    def _load_faq(self, faq_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one FAQ straight from Supabase, active or not.
+
+        Used by the FAQ catalog to refetch FAQs changed by other
+        workers; raises on failure, so a failed read is not mistaken
+        for a deleted FAQ.
+
+        Args:
+            faq_id: UUID of the FAQ
+
+        Returns:
+            FAQ dictionary, or None if it does not exist
+        """
+        query = self.client.table("faqs").select(_FAQ_COLUMNS).eq("id", faq_id)
+        data = self._execute("faqs.get", query, idempotent=True).data
+        return data[0] if data else None
+
+    def _load_faqs_changed_since(self, since: str) -> List[Dict[str, Any]]:
+        """
+        Fetch every FAQ updated at or after since, including deactivated ones.
+        
+        Used to catch the FAQ catalog up after restoring a snapshot;
+        raises on failure.
+        
+        Args:
+            since: ISO timestamp (UTC)
+            
+        Returns:
+            List of FAQ dictionaries, oldest change first
+        """
+        rows: List[Dict[str, Any]] = []
+        while True:
+            start = len(rows)
+            end = start + FAQ_CATALOG_PAGE_SIZE - 1
+            query = (
+                self.client.table("faqs")
+                .select(_FAQ_COLUMNS)
+                .gte("updated_at", since)
+                .order("updated_at")
+                .order("id")
+                .range(start, end)
+            )
+            page = self._execute("faqs.catch_up", query, idempotent=True).data
+            rows.extend(page)
+            if len(page) < end - start + 1:
+                break
+        return rows
+
+    def build_faq_snapshot(self, directory: str, keep: int = FAQ_SNAPSHOT_KEEP) -> str:
+        """
+        Scan every active FAQ, index it and publish a snapshot.
+        
+        The watermark is the newest updated_at among the scanned rows
+        (or the scan start for an empty table). Raises on failure.
+        
+        Args:
+            directory: Snapshot directory
+            keep: Number of snapshots to keep
+            
+        Returns:
+            Path of the published snapshot
+        """
+        scan_started = datetime.utcnow()
+        rows = self._load_all_faqs()
+        newest = max((parse_timestamp(row["updated_at"]) for row in rows if row.get("updated_at")), default=None)
+        watermark = datetime.utcfromtimestamp(newest) if newest is not None else scan_started
+        path = self.cpu_pool.run(build_index_snapshot, directory, rows, watermark.isoformat(), keep)
+        logger.info(f"Published FAQ snapshot {path} with {len(rows)} FAQs")
+        return path
+
     def create_faq(
         self, 
         faq_data: Dict[str, Any], 
@@ -131,10 +638,11 @@ class SupabaseService:
             faq_data["updated_at"] = datetime.utcnow().isoformat()
             faq_data["view_count"] = 0
             
-            response = self.client.table("faqs").insert(faq_data).execute()
+            response = self._execute("faqs.create", self.client.table("faqs").insert(faq_data))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"Created FAQ with ID: {response.data[0].get('id')}")
+                self.bus.publish("faqs", str(response.data[0].get("id")), "create", response.data[0])
                 return response.data[0]
             else:
                 logger.error("Failed to create FAQ: No data returned")
@@ -165,7 +673,7 @@ class SupabaseService:
         """
         try:
             # Check if FAQ exists and user is the creator
-            existing_faq = self.get_faq_by_id(faq_id)
+            existing_faq = self.get_faq_by_id(faq_id, fresh=True)
             if not existing_faq:
                 logger.warning(f"Cannot update: FAQ not found with ID: {faq_id}")
                 return None
@@ -177,10 +685,11 @@ class SupabaseService:
             # Add update timestamp
             faq_data["updated_at"] = datetime.utcnow().isoformat()
             
-            response = self.client.table("faqs").update(faq_data).eq("id", faq_id).execute()
+            response = self._execute("faqs.update", self.client.table("faqs").update(faq_data).eq("id", faq_id))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"Updated FAQ with ID: {faq_id}")
+                self.bus.publish("faqs", faq_id, "update", response.data[0])
                 return response.data[0]
             else:
                 logger.error(f"Failed to update FAQ: {faq_id}")
@@ -205,7 +714,7 @@ class SupabaseService:
         """
         try:
             # Check if FAQ exists and user is the creator
-            existing_faq = self.get_faq_by_id(faq_id)
+            existing_faq = self.get_faq_by_id(faq_id, fresh=True)
             if not existing_faq:
                 logger.warning(f"Cannot delete: FAQ not found with ID: {faq_id}")
                 return False
@@ -215,13 +724,14 @@ class SupabaseService:
                 return False
             
             # Soft delete
-            response = self.client.table("faqs").update({
+            response = self._execute("faqs.delete", self.client.table("faqs").update({
                 "is_active": False,
                 "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", faq_id).execute()
+            }).eq("id", faq_id))
             
             if response.data:
                 logger.info(f"Soft deleted FAQ with ID: {faq_id}")
+                self.bus.publish("faqs", faq_id, "delete")
                 return True
             else:
                 logger.error(f"Failed to delete FAQ: {faq_id}")
@@ -244,22 +754,7 @@ class SupabaseService:
             True if successful, False otherwise
         """
         try:
-            # Get current view count
-            faq = self.get_faq_by_id(faq_id)
-            if not faq:
-                return False
-            
-            current_views = faq.get("view_count", 0)
-            
-            response = self.client.table("faqs").update({
-                "view_count": current_views + 1
-            }).eq("id", faq_id).execute()
-            
-            if response.data:
-                logger.info(f"Incremented view count for FAQ: {faq_id}")
-                return True
-            else:
-                return False
+            return self._increment_views([faq_id]) > 0
         except APIError as e:
             logger.error(f"Supabase API error in increment_faq_views: {str(e)}")
             return False
@@ -267,6 +762,43 @@ class SupabaseService:
             logger.error(f"Unexpected error in increment_faq_views: {str(e)}")
             return False
 
+    def increment_views_of(self, faqs: List[Dict[str, Any]]) -> int:
+        """
+        Increment the view count of FAQs that were already fetched.
+
+        All FAQs are counted in one increment_faq_views() call; the
+        counts in the given rows are not used.
+
+        Args:
+            faqs: FAQ dictionaries
+
+        Returns:
+            Number of FAQs updated
+        """
+        if not faqs:
+            return 0
+        try:
+            return self._increment_views([str(faq["id"]) for faq in faqs])
+        except APIError as e:
+            logger.error(f"Supabase API error in increment_views_of: {str(e)}")
+            return 0
+        except Exception as e:
+            logger.error(f"Unexpected error in increment_views_of: {str(e)}")
+            return 0
+
+    def _increment_views(self, faq_ids: List[str]) -> int:
+        # view_count = view_count + 1 runs in the database, so concurrent views are never lost
+        response = self._execute(
+            "faqs.increment_views",
+            self.client.rpc("increment_faq_views", {"faq_ids": faq_ids})
+        )
+        rows = response.data or []
+        for row in rows:
+            logger.info(f"Incremented view count for FAQ: {row.get('id')}")
+            # View counts rank suggestions; not broadcast, as they change on every read
+            self.faq_catalog.update_views(row)
+        return len(rows)
+
     # ========================================================================
     # Announcement Operations
     # ========================================================================
@@ -274,30 +806,63 @@ class SupabaseService:
     def get_all_announcements(
         self, 
         limit: int = 50, 
-        upcoming_only: bool = True
+        upcoming_only: bool = True,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve announcements, optionally filtered to upcoming only.
         
+        Upcoming announcements are answered from the in-memory
+        announcement store once it has loaded; Supabase is only queried
+        for past announcements or when the store is unavailable.
+        
         Args:
             limit: Maximum number of announcements to return (default: 50)
             upcoming_only: If True, only return future announcements
+            category: Optional category filter
+            priority: Optional priority filter
+            columns: Columns to fetch (default: all)
             
         Returns:
             List of announcement dictionaries
         """
-        try:
-            query = self.client.table("announcements").select("*").eq("is_active", True)
+        if upcoming_only and ANNOUNCEMENT_STORE_ENABLED and self.announcement_store.ensure_loaded():
+            self.bus.poll()
+            data = [
+                _project(row, columns)
+                for row in self.announcement_store.query(limit=limit, category=category, priority=priority)
+            ]
+            logger.info(f"Retrieved {len(data)} announcements from store")
+            return data
+
+        def fetch() -> List[Dict[str, Any]]:
+            query = self.client.table("announcements").select(_column_list(columns)).eq("is_active", True)
             
             if upcoming_only:
                 current_time = datetime.utcnow().isoformat()
                 query = query.gte("date", current_time)
             
+            if category:
+                query = query.eq("category", category)
+            
+            if priority:
+                query = query.eq("priority", priority)
+            
             query = query.limit(limit).order("date", desc=False)
             
-            response = query.execute()
-            logger.info(f"Retrieved {len(response.data)} announcements")
-            return response.data
+            return self._execute("announcements.list", query, idempotent=True).data
+
+        try:
+            data = self._guarded_read(
+                "announcements.list", (limit, upcoming_only, category, priority, _column_list(columns)), fetch
+            )
+            logger.info(f"Retrieved {len(data)} announcements")
+            return data
+        except CircuitOpenError as e:
+            logger.error(f"Skipping get_all_announcements: {str(e)}")
+            return []
         except APIError as e:
             logger.error(f"Supabase API error in get_all_announcements: {str(e)}")
             return []
@@ -305,25 +870,65 @@ class SupabaseService:
             logger.error(f"Unexpected error in get_all_announcements: {str(e)}")
             return []
 
-    def get_announcement_by_id(self, announcement_id: str) -> Optional[Dict[str, Any]]:
+    def _load_upcoming_announcements(self) -> List[Dict[str, Any]]:
+        """
+        Fetch every active announcement whose date has not passed, page by page.
+        
+        Used to fill the announcement store; raises on failure. Stops
+        one row past ANNOUNCEMENT_STORE_MAX_ROWS, so the store can tell
+        that it would not hold them all.
+        
+        Returns:
+            List of announcement dictionaries ordered by date
+        """
+        now = datetime.utcnow().isoformat()
+        rows: List[Dict[str, Any]] = []
+        while len(rows) <= ANNOUNCEMENT_STORE_MAX_ROWS:
+            start = len(rows)
+            end = min(start + ANNOUNCEMENT_STORE_PAGE_SIZE, ANNOUNCEMENT_STORE_MAX_ROWS + 1) - 1
+            query = (
+                self.client.table("announcements")
+                .select("*")
+                .eq("is_active", True)
+                .gte("date", now)
+                .order("date", desc=False)
+                .order("id")
+                .range(start, end)
+            )
+            page = self._execute("announcements.load_upcoming", query, idempotent=True).data
+            rows.extend(page)
+            if len(page) < end - start + 1:
+                break
+        return rows
+
+    def get_announcement_by_id(self, announcement_id: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
         """
         Retrieve a single announcement by its ID.
         
         Args:
             announcement_id: UUID of the announcement
+            fresh: Never answer with a last known good result; for the
+                checks that authorize a write
             
         Returns:
             Announcement dictionary or None if not found
         """
+        def fetch() -> List[Dict[str, Any]]:
+            query = self.client.table("announcements").select("*").eq("id", announcement_id)
+            return self._execute("announcements.get", query, idempotent=True).data
+
         try:
-            response = self.client.table("announcements").select("*").eq("id", announcement_id).execute()
+            data = self._guarded_read("announcements.get", (announcement_id,), fetch, use_last_good=not fresh)
             
-            if response.data and len(response.data) > 0:
+            if data and len(data) > 0:
                 logger.info(f"Retrieved announcement with ID: {announcement_id}")
-                return response.data[0]
+                return data[0]
             else:
                 logger.warning(f"Announcement not found with ID: {announcement_id}")
                 return None
+        except CircuitOpenError as e:
+            logger.error(f"Skipping get_announcement_by_id: {str(e)}")
+            return None
         except APIError as e:
             logger.error(f"Supabase API error in get_announcement_by_id: {str(e)}")
             return None
@@ -353,10 +958,11 @@ class SupabaseService:
             announcement_data["updated_at"] = datetime.utcnow().isoformat()
             announcement_data["is_active"] = True
             
-            response = self.client.table("announcements").insert(announcement_data).execute()
+            response = self._execute("announcements.create", self.client.table("announcements").insert(announcement_data))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"Created announcement with ID: {response.data[0].get('id')}")
+                self.bus.publish("announcements", str(response.data[0].get("id")), "create", response.data[0])
                 return response.data[0]
             else:
                 logger.error("Failed to create announcement: No data returned")
@@ -387,7 +993,7 @@ class SupabaseService:
         """
         try:
             # Check if announcement exists and user is the creator
-            existing_announcement = self.get_announcement_by_id(announcement_id)
+            existing_announcement = self.get_announcement_by_id(announcement_id, fresh=True)
             if not existing_announcement:
                 logger.warning(f"Cannot update: Announcement not found with ID: {announcement_id}")
                 return None
@@ -399,10 +1005,11 @@ class SupabaseService:
             # Add update timestamp
             announcement_data["updated_at"] = datetime.utcnow().isoformat()
             
-            response = self.client.table("announcements").update(announcement_data).eq("id", announcement_id).execute()
+            response = self._execute("announcements.update", self.client.table("announcements").update(announcement_data).eq("id", announcement_id))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"Updated announcement with ID: {announcement_id}")
+                self.bus.publish("announcements", announcement_id, "update", response.data[0])
                 return response.data[0]
             else:
                 logger.error(f"Failed to update announcement: {announcement_id}")
@@ -427,7 +1034,7 @@ class SupabaseService:
         """
         try:
             # Check if announcement exists and user is the creator
-            existing_announcement = self.get_announcement_by_id(announcement_id)
+            existing_announcement = self.get_announcement_by_id(announcement_id, fresh=True)
             if not existing_announcement:
                 logger.warning(f"Cannot delete: Announcement not found with ID: {announcement_id}")
                 return False
@@ -437,13 +1044,14 @@ class SupabaseService:
                 return False
             
             # Soft delete
-            response = self.client.table("announcements").update({
+            response = self._execute("announcements.delete", self.client.table("announcements").update({
                 "is_active": False,
                 "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", announcement_id).execute()
+            }).eq("id", announcement_id))
             
             if response.data:
                 logger.info(f"Soft deleted announcement with ID: {announcement_id}")
+                self.bus.publish("announcements", announcement_id, "delete")
                 return True
             else:
                 logger.error(f"Failed to delete announcement: {announcement_id}")
@@ -455,6 +1063,36 @@ class SupabaseService:
             logger.error(f"Unexpected error in delete_announcement: {str(e)}")
             return False
 
+    def expire_announcements(self, older_than_days: float) -> int:
+        """
+        Soft delete announcements whose date passed more than older_than_days ago.
+
+        Args:
+            older_than_days: Age past the announcement date at which it expires
+
+        Returns:
+            Number of announcements expired
+        """
+        cutoff = datetime.utcfromtimestamp(time.time() - older_than_days * 86400).isoformat()
+        try:
+            response = self._execute("announcements.expire", self.client.table("announcements").update({
+                "is_active": False,
+                "updated_at": datetime.utcnow().isoformat()
+            }).eq("is_active", True).lt("date", cutoff))
+
+            expired = len(response.data or [])
+            if expired:
+                logger.info(f"Expired {expired} announcements dated before {cutoff}")
+                for row in response.data:
+                    self.bus.publish("announcements", str(row["id"]), "delete")
+            return expired
+        except APIError as e:
+            logger.error(f"Supabase API error in expire_announcements: {str(e)}")
+            return 0
+        except Exception as e:
+            logger.error(f"Unexpected error in expire_announcements: {str(e)}")
+            return 0
+
     # ========================================================================
     # Chat Log Operations
     # ========================================================================
@@ -470,13 +1108,13 @@ class SupabaseService:
             Created chat log dictionary or None on error
         """
         try:
-            # Add timestamp
-            log_data["created_at"] = datetime.utcnow().isoformat()
-            
-            response = self.client.table("chat_logs").insert(log_data).execute()
+            # created_at/updated_at are left to the column defaults: NOW() is the
+            # same clock as the updated_at trigger, so sync watermarks only move forward
+            response = self._execute("chat_logs.create", self.client.table("chat_logs").insert(log_data))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"Created chat log with ID: {response.data[0].get('id')}")
+                self.bus.publish("chat_logs", response.data[0].get("user_id"), "create", response.data[0])
                 return response.data[0]
             else:
                 logger.error("Failed to create chat log: No data returned")
@@ -496,25 +1134,275 @@ class SupabaseService:
         """
         Retrieve chat logs for a specific user.
         
+        Served from the chat history cache for users read before; a
+        miss reads at least CHAT_HISTORY_CACHE_PER_USER logs, so that
+        the user's next reads are served from memory.
+        
         Args:
             user_id: ID of the user
             limit: Maximum number of logs to return (default: 50)
             
         Returns:
-            List of chat log dictionaries
+            List of chat log dictionaries, newest first
         """
+        cache = self.chat_history
+        if cache is not None:
+            self.bus.poll()
+            cached = cache.get(user_id, limit)
+            if cached is not None:
+                logger.info(f"Retrieved {len(cached)} chat logs for user {user_id} from cache")
+                return cached
+            cache.begin_load(user_id)
+
         try:
-            response = self.client.table("chat_logs").select("*").eq("user_id", user_id).limit(limit).order("created_at", desc=True).execute()
+            fetched = max(limit, cache.per_user) if cache is not None else limit
+            query = self.client.table("chat_logs").select("*").eq("user_id", user_id).limit(fetched).order("created_at", desc=True)
+            response = self._execute("chat_logs.list_user", query, idempotent=True)
+            if cache is not None:
+                cache.finish_load(user_id, response.data)
             
             logger.info(f"Retrieved {len(response.data)} chat logs for user: {user_id}")
-            return response.data
+            return response.data[:limit]
         except APIError as e:
             logger.error(f"Supabase API error in get_user_chat_logs: {str(e)}")
+            if cache is not None:
+                cache.abort_load(user_id)
             return []
         except Exception as e:
             logger.error(f"Unexpected error in get_user_chat_logs: {str(e)}")
+            if cache is not None:
+                cache.abort_load(user_id)
             return []
 
+    def get_user_chat_log(self, user_id: str, log_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve one of a user's chat logs.
+        
+        Args:
+            user_id: ID of the user
+            log_id: UUID of the chat log
+            
+        Returns:
+            Chat log dictionary, or None if the user has no such log or on error
+        """
+        if self.chat_history is not None:
+            self.bus.poll()
+            cached = self.chat_history.find(user_id, log_id)
+            if cached is not None:
+                return cached
+
+        try:
+            query = self.client.table("chat_logs").select("*").eq("id", log_id).eq("user_id", user_id)
+            rows = self._execute("chat_logs.get_user", query, idempotent=True).data
+            return rows[0] if rows else None
+        except APIError as e:
+            logger.error(f"Supabase API error in get_user_chat_log: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in get_user_chat_log: {str(e)}")
+            return None
+
+    def rematch_chat_logs(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Re-score the most recent logged questions against the current FAQs.
+        
+        Shows which questions would now be answered by a different FAQ,
+        e.g. after FAQs were added or reworded.
+        
+        Args:
+            limit: Number of most recent chat logs to re-score (default: 5000)
+            
+        Returns:
+            Per chat log: id, question, matched_faq_id and confidence as
+            logged, and best_faq_id and score as matched now
+        """
+        try:
+            query = (
+                self.client.table("chat_logs")
+                .select("id,question,matched_faq_id,confidence")
+                .limit(limit)
+                .order("created_at", desc=True)
+            )
+            logs = self._execute("chat_logs.rematch", query, idempotent=True).data
+        except APIError as e:
+            logger.error(f"Supabase API error in rematch_chat_logs: {str(e)}")
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error in rematch_chat_logs: {str(e)}")
+            return []
+
+        matches = self.score_questions([log["question"] for log in logs], limit=1)
+        for log, best in zip(logs, matches):
+            log["best_faq_id"] = best[0][0] if best else None
+            log["score"] = best[0][1] if best else None
+        logger.info(f"Re-scored {len(logs)} chat logs")
+        return logs
+
+    def get_user_chat_log_changes(
+        self,
+        user_id: str,
+        since_time: Optional[str] = None,
+        since_id: Optional[str] = None,
+        limit: int = 200
+    ) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Retrieve a user's chat logs created or changed after a watermark.
+
+        Logs are ordered by (updated_at, id) and the watermark is applied
+        as the keyset condition (updated_at, id) > (since_time, since_id)
+        in the query itself, before the limit, so a page boundary falling
+        between logs with the same timestamp neither repeats nor skips any.
+
+        Args:
+            user_id: ID of the user
+            since_time: updated_at of the last log already synced, or None for all
+            since_id: ID of the last log already synced (required with since_time)
+            limit: Maximum number of logs to return
+
+        Returns:
+            Tuple of (logs, has_more), or None on error
+        """
+        try:
+            query = self.client.table("chat_logs").select("*").eq("user_id", user_id)
+            if since_time:
+                # Quoted: timestamps contain the reserved characters ":" and "."
+                query = query.or_(
+                    f'updated_at.gt."{since_time}",'
+                    f'and(updated_at.eq."{since_time}",id.gt.{since_id})'
+                )
+            # One extra row tells whether another page follows
+            query = query.order("updated_at").order("id").limit(limit + 1)
+            rows = self._execute("chat_logs.sync_user", query, idempotent=True).data
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            logger.info(f"Synced {len(rows)} chat logs for user: {user_id}")
+            return rows, has_more
+        except APIError as e:
+            logger.error(f"Supabase API error in get_user_chat_log_changes: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in get_user_chat_log_changes: {str(e)}")
+            return None
+
+    def update_chat_feedback(self, log_id: str, was_helpful: bool) -> Optional[Dict[str, Any]]:
+        """
+        Record whether a chat response was helpful.
+        
+        Args:
+            log_id: UUID of the chat log
+            was_helpful: User feedback value
+            
+        Returns:
+            Updated chat log dictionary or None on error
+        """
+        try:
+            # updated_at is set by the update_chat_logs_updated_at trigger
+            query = self.client.table("chat_logs").update({
+                "was_helpful": was_helpful
+            }).eq("id", log_id)
+            response = self._execute("chat_logs.update_feedback", query)
+            
+            if response.data and len(response.data) > 0:
+                logger.info(f"Updated feedback for chat log: {log_id}")
+                self.bus.publish("chat_logs", response.data[0].get("user_id"), "update", response.data[0])
+                return response.data[0]
+            else:
+                logger.error(f"Failed to update feedback for chat log: {log_id}")
+                return None
+        except APIError as e:
+            logger.error(f"Supabase API error in update_chat_feedback: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in update_chat_feedback: {str(e)}")
+            return None
+
+    def archive_chat_logs(
+        self,
+        older_than_days: float,
+        batch_size: int = CHAT_LOG_ARCHIVE_BATCH,
+        max_seconds: float = CHAT_LOG_ARCHIVE_MAX_SECONDS
+    ) -> int:
+        """
+        Move chat logs older than older_than_days to chat_logs_archive.
+        
+        Calls archive_chat_logs() (setup_database.sql) batch by batch,
+        pausing between batches, until no old logs remain or max_seconds
+        have passed. Each batch commits on its own, so a run that stops
+        early is simply continued by the next one.
+        
+        Args:
+            older_than_days: Age at which logs leave the hot table
+            batch_size: Logs moved per call
+            max_seconds: Time budget of this run
+            
+        Returns:
+            Number of logs archived
+        """
+        cutoff = datetime.utcfromtimestamp(time.time() - older_than_days * 86400).isoformat()
+        deadline = time.monotonic() + max_seconds
+        archived = 0
+        try:
+            while True:
+                response = self._execute(
+                    "chat_logs.archive",
+                    self.client.rpc("archive_chat_logs", {"cutoff": cutoff, "batch_size": batch_size})
+                )
+                moved = response.data or 0
+                archived += moved
+                get_metrics().incr("chat_logs.archived", moved)
+                if moved < batch_size:
+                    break
+                if time.monotonic() >= deadline:
+                    logger.info(f"Chat log archiving paused after {archived} logs; continuing next run")
+                    break
+                time.sleep(CHAT_LOG_ARCHIVE_PAUSE_MS / 1000.0)
+        except APIError as e:
+            logger.error(f"Supabase API error in archive_chat_logs: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error in archive_chat_logs: {str(e)}")
+        if archived:
+            logger.info(f"Archived {archived} chat logs created before {cutoff}")
+            # Cached histories may still hold archived logs
+            self.bus.publish("chat_logs", None, "flush")
+        return archived
+
+    def get_user_archived_chat_logs(
+        self,
+        user_id: str,
+        before: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retrieve archived chat logs for a specific user.
+        
+        Args:
+            user_id: ID of the user
+            before: Only logs created before this timestamp (for paging)
+            limit: Maximum number of logs to return (default: 50)
+            
+        Returns:
+            List of chat log dictionaries, newest first, or None on failure
+        """
+        try:
+            query = self.client.table("chat_logs_archive").select(
+                "id,user_id,question,matched_faq_id,confidence,was_helpful,created_at,updated_at"
+            ).eq("user_id", user_id)
+            if before:
+                query = query.lt("created_at", before)
+            response = self._execute(
+                "chat_logs.list_archive",
+                query.order("created_at", desc=True).limit(limit),
+                idempotent=True
+            )
+            logger.info(f"Retrieved {len(response.data)} archived chat logs for user: {user_id}")
+            return response.data
+        except APIError as e:
+            logger.error(f"Supabase API error in get_user_archived_chat_logs: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in get_user_archived_chat_logs: {str(e)}")
+            return None
+
 
 # Singleton instance
 _supabase_service: Optional[SupabaseService] = None
@@ -11,6 +11,15 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- FAQs Table
 -- ============================================================================
 
+-- Full-text document of an FAQ: question (weight A), tags (B) and answer (C).
+-- IMMUTABLE so it can feed the generated search_vector column.
+CREATE OR REPLACE FUNCTION faq_search_document(question TEXT, answer TEXT, tags TEXT[])
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('english', COALESCE(question, '')), 'A')
+        || setweight(to_tsvector('english', COALESCE(array_to_string(tags, ' '), '')), 'B')
+        || setweight(to_tsvector('english', COALESCE(answer, '')), 'C');
+$$ LANGUAGE sql IMMUTABLE;
+
 CREATE TABLE IF NOT EXISTS faqs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     question TEXT NOT NULL CHECK (char_length(question) >= 5 AND char_length(question) <= 500),
@@ -24,15 +33,29 @@ CREATE TABLE IF NOT EXISTS faqs (
     created_by TEXT NOT NULL,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
-    view_count INTEGER DEFAULT 0 CHECK (view_count >= 0)
+    view_count INTEGER DEFAULT 0 CHECK (view_count >= 0),
+    search_vector TSVECTOR GENERATED ALWAYS AS (faq_search_document(question, answer, tags)) STORED
 );
 
--- Create indexes for FAQs
-CREATE INDEX IF NOT EXISTS idx_faqs_category ON faqs(category);
-CREATE INDEX IF NOT EXISTS idx_faqs_is_active ON faqs(is_active);
+-- Existing deployments (rewrites the table; see migrations/002_faq_full_text_search.sql)
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (faq_search_document(question, answer, tags)) STORED;
+
+-- Create indexes for FAQs, matched to the API's queries (see migrations/001_query_plan_indexes.sql)
+-- Newest active FAQs, overall and per category
+CREATE INDEX IF NOT EXISTS idx_faqs_active_created ON faqs(created_at DESC) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_faqs_active_category_created ON faqs(category, created_at DESC) WHERE is_active = TRUE;
+-- FAQs changed since a snapshot watermark
+CREATE INDEX IF NOT EXISTS idx_faqs_updated ON faqs(updated_at, id);
 CREATE INDEX IF NOT EXISTS idx_faqs_created_by ON faqs(created_by);
-CREATE INDEX IF NOT EXISTS idx_faqs_created_at ON faqs(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_faqs_tags ON faqs USING GIN(tags);
+-- Full-text search (search_faqs below)
+CREATE INDEX IF NOT EXISTS idx_faqs_search ON faqs USING GIN(search_vector);
+
+-- Existing deployments: superseded by the indexes above
+DROP INDEX IF EXISTS idx_faqs_category;
+DROP INDEX IF EXISTS idx_faqs_is_active;
+DROP INDEX IF EXISTS idx_faqs_created_at;
 
 -- Enable Row Level Security
 ALTER TABLE faqs ENABLE ROW LEVEL SECURITY;
@@ -50,6 +73,73 @@ CREATE POLICY "Users can update their own FAQs" ON faqs
 CREATE POLICY "Users can delete their own FAQs" ON faqs
     FOR DELETE USING (auth.uid()::text = created_by);
 
+-- Ranked full-text search over active FAQs, for FAQ_SEARCH_BACKEND=postgres.
+-- search_query takes web search syntax ("quoted phrases", or, -exclude);
+-- highlights mark the matched words with <mark> tags and are only computed
+-- for the returned rows.
+CREATE OR REPLACE FUNCTION search_faqs(
+    search_query TEXT,
+    category_filter TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE (
+    id UUID,
+    question TEXT,
+    answer TEXT,
+    category TEXT,
+    tags TEXT[],
+    is_active BOOLEAN,
+    created_by TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    view_count INTEGER,
+    rank REAL,
+    question_highlight TEXT,
+    answer_highlight TEXT
+) AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', search_query) AS q
+    ), ranked AS (
+        SELECT f.*, ts_rank(f.search_vector, query.q) AS rank
+        FROM faqs f, query
+        WHERE f.search_vector @@ query.q
+          AND f.is_active = TRUE
+          AND (category_filter IS NULL OR f.category = category_filter)
+        ORDER BY rank DESC, f.view_count DESC
+        LIMIT result_limit
+    )
+    SELECT
+        r.id, r.question, r.answer, r.category, r.tags, r.is_active,
+        r.created_by, r.created_at, r.updated_at, r.view_count, r.rank,
+        ts_headline('english', r.question, query.q, 'HighlightAll=true, StartSel=<mark>, StopSel=</mark>'),
+        ts_headline('english', r.answer, query.q, 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10')
+    FROM ranked r, query
+    ORDER BY r.rank DESC, r.view_count DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Add one view to each of faq_ids and return the updated FAQs. The count is
+-- incremented in the UPDATE itself, so concurrent viewers never overwrite
+-- each other's views (see migrations/003_faq_view_increments.sql). Returns
+-- the API's columns only, not search_vector (migrations/008_faq_view_columns.sql).
+CREATE OR REPLACE FUNCTION increment_faq_views(faq_ids UUID[])
+RETURNS TABLE (
+    id UUID,
+    question TEXT,
+    answer TEXT,
+    category TEXT,
+    tags TEXT[],
+    is_active BOOLEAN,
+    created_by TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    view_count INTEGER
+) AS $$
+    UPDATE faqs SET view_count = faqs.view_count + 1
+    WHERE faqs.id = ANY(faq_ids)
+    RETURNING faqs.id, faqs.question, faqs.answer, faqs.category, faqs.tags, faqs.is_active,
+        faqs.created_by, faqs.created_at, faqs.updated_at, faqs.view_count;
+$$ LANGUAGE sql;
+
 -- ============================================================================
 -- Announcements Table
 -- ============================================================================
@@ -70,13 +160,19 @@ CREATE TABLE IF NOT EXISTS announcements (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Create indexes for Announcements
-CREATE INDEX IF NOT EXISTS idx_announcements_category ON announcements(category);
-CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date);
-CREATE INDEX IF NOT EXISTS idx_announcements_priority ON announcements(priority);
-CREATE INDEX IF NOT EXISTS idx_announcements_is_active ON announcements(is_active);
+-- Create indexes for Announcements: active announcements by date, overall,
+-- per category and per priority
+CREATE INDEX IF NOT EXISTS idx_announcements_active_date ON announcements(date) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_announcements_active_category_date ON announcements(category, date) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_announcements_active_priority_date ON announcements(priority, date) WHERE is_active = TRUE;
 CREATE INDEX IF NOT EXISTS idx_announcements_created_by ON announcements(created_by);
 
+-- Existing deployments: superseded by the indexes above
+DROP INDEX IF EXISTS idx_announcements_category;
+DROP INDEX IF EXISTS idx_announcements_date;
+DROP INDEX IF EXISTS idx_announcements_priority;
+DROP INDEX IF EXISTS idx_announcements_is_active;
+
 -- Enable Row Level Security
 ALTER TABLE announcements ENABLE ROW LEVEL SECURITY;
 
@@ -104,13 +200,26 @@ CREATE TABLE IF NOT EXISTS chat_logs (
     matched_faq_id UUID REFERENCES faqs(id) ON DELETE SET NULL,
     confidence DECIMAL(3, 2) CHECK (confidence >= 0.0 AND confidence <= 1.0),
     was_helpful BOOLEAN,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Existing deployments (migrations/005_chat_log_sync.sql): feedback changes move
+-- updated_at, which drives history sync. Added without a default so existing logs
+-- keep their own created_at rather than one shared NOW().
+ALTER TABLE chat_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+UPDATE chat_logs SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE chat_logs ALTER COLUMN updated_at SET DEFAULT NOW();
+
 -- Create indexes for Chat Logs
-CREATE INDEX IF NOT EXISTS idx_chat_logs_user_id ON chat_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_logs_created_at ON chat_logs(created_at DESC);
+-- Per-user history, newest first
+CREATE INDEX IF NOT EXISTS idx_chat_logs_user_created ON chat_logs(user_id, created_at DESC);
+-- Per-user delta sync: (updated_at, id) > watermark
+CREATE INDEX IF NOT EXISTS idx_chat_logs_user_updated ON chat_logs(user_id, updated_at, id);
 CREATE INDEX IF NOT EXISTS idx_chat_logs_matched_faq_id ON chat_logs(matched_faq_id);
+-- Existing deployments: a prefix of idx_chat_logs_user_created
+DROP INDEX IF EXISTS idx_chat_logs_user_id;
 
 -- Enable Row Level Security
 ALTER TABLE chat_logs ENABLE ROW LEVEL SECURITY;
@@ -125,6 +234,107 @@ CREATE POLICY "Users can create their own chat logs" ON chat_logs
 CREATE POLICY "Users can update their own chat logs" ON chat_logs
     FOR UPDATE USING (auth.uid()::text = user_id);
 
+-- ============================================================================
+-- Chat Log Retention
+-- ============================================================================
+-- Logs older than CHAT_LOG_RETENTION_DAYS are moved out of chat_logs by
+-- archive_chat_logs(), called in batches by the API's scheduler. Each call
+-- is one short transaction that removes the oldest logs from chat_logs,
+-- copies them to chat_logs_archive and adds them to the daily rollups, so
+-- an interrupted run loses nothing and the next run carries on (existing
+-- deployments: migrations/006_chat_log_archive.sql).
+
+CREATE TABLE IF NOT EXISTS chat_logs_archive (
+    id UUID PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    matched_faq_id UUID,
+    confidence DECIMAL(3, 2),
+    was_helpful BOOLEAN,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Archived history per user, newest first
+CREATE INDEX IF NOT EXISTS idx_chat_logs_archive_user_created ON chat_logs_archive(user_id, created_at DESC);
+
+ALTER TABLE chat_logs_archive ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own archived chat logs" ON chat_logs_archive
+    FOR SELECT USING (auth.uid()::text = user_id);
+
+-- Questions per day (UTC) and matched FAQ; NULL matched_faq_id counts unmatched questions
+CREATE TABLE IF NOT EXISTS chat_log_rollups (
+    day DATE NOT NULL,
+    matched_faq_id UUID,
+    questions INTEGER NOT NULL DEFAULT 0,
+    helpful INTEGER NOT NULL DEFAULT 0,
+    unhelpful INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT chat_log_rollups_day_faq UNIQUE NULLS NOT DISTINCT (day, matched_faq_id)
+);
+
+-- Service role only
+ALTER TABLE chat_log_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Move up to batch_size logs created before cutoff; returns the number moved.
+-- SKIP LOCKED leaves logs being written (e.g. feedback) for the next batch.
+CREATE OR REPLACE FUNCTION archive_chat_logs(cutoff TIMESTAMPTZ, batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM chat_logs
+        WHERE created_at < cutoff
+        ORDER BY created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM chat_logs c USING batch WHERE c.id = batch.id
+        RETURNING c.*
+    ), archived AS (
+        INSERT INTO chat_logs_archive (id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at)
+        SELECT id, user_id, question, matched_faq_id, confidence, was_helpful, created_at, updated_at FROM removed
+        ON CONFLICT (id) DO NOTHING
+    ), rolled_up AS (
+        INSERT INTO chat_log_rollups AS r
+            (day, matched_faq_id, questions, helpful, unhelpful, confidence_sum, confidence_count)
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::DATE,
+            matched_faq_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE was_helpful),
+            COUNT(*) FILTER (WHERE NOT was_helpful),
+            COALESCE(SUM(confidence), 0),
+            COUNT(confidence)
+        FROM removed
+        GROUP BY 1, 2
+        ON CONFLICT ON CONSTRAINT chat_log_rollups_day_faq DO UPDATE SET
+            questions = r.questions + EXCLUDED.questions,
+            helpful = r.helpful + EXCLUDED.helpful,
+            unhelpful = r.unhelpful + EXCLUDED.unhelpful,
+            confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+            confidence_count = r.confidence_count + EXCLUDED.confidence_count
+    )
+    SELECT COUNT(*) INTO moved FROM removed;
+    IF moved > 0 THEN
+        -- Cached chat histories on every host may hold the moved logs
+        PERFORM pg_notify(
+            'cache_invalidation',
+            json_build_object(
+                'table', 'chat_logs',
+                'op', 'FLUSH',
+                'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+            )::text
+        );
+    END IF;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================================================
 -- Functions and Triggers
 -- ============================================================================
@@ -149,6 +359,72 @@ CREATE TRIGGER update_announcements_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_chat_logs_updated_at
+    BEFORE UPDATE ON chat_logs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Function to broadcast row changes for API cache invalidation
+-- (used when CACHE_BUS_PG_NOTIFY=true). origin is the X-Cache-Origin
+-- header PostgREST exposes for API writes, NULL for other writers; the
+-- API skips its own events, which its bus has already broadcast. Chat
+-- logs are cached per user, so their events carry the user ID.
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed RECORD;
+    row_key TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    IF TG_TABLE_NAME = 'chat_logs' THEN
+        row_key := changed.user_id;
+    ELSE
+        row_key := changed.id::text;
+    END IF;
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_key,
+            'origin', NULLIF(current_setting('request.headers', TRUE), '')::json->>'x-cache-origin'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers for cache invalidation. FAQ updates only notify when a cached
+-- column changes: view counting updates every viewed FAQ and would
+-- otherwise send every worker a refetch per view (existing deployments:
+-- migrations/004_cache_notify_filters.sql).
+CREATE TRIGGER notify_faqs_cache_invalidation
+    AFTER INSERT OR DELETE ON faqs
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
+
+CREATE TRIGGER notify_faqs_update_cache_invalidation
+    AFTER UPDATE ON faqs
+    FOR EACH ROW
+    WHEN ((OLD.question, OLD.answer, OLD.category, OLD.tags, OLD.is_active)
+          IS DISTINCT FROM (NEW.question, NEW.answer, NEW.category, NEW.tags, NEW.is_active))
+    EXECUTE FUNCTION notify_cache_invalidation();
+
+CREATE TRIGGER notify_announcements_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON announcements
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
+
+-- Deletes only come from archive_chat_logs(), which notifies once per batch
+-- (existing deployments: migrations/007_chat_log_notify.sql)
+CREATE TRIGGER notify_chat_logs_cache_invalidation
+    AFTER INSERT OR UPDATE ON chat_logs
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation();
 -- ============================================================================
 -- Sample Data (Optional - for testing)
 -- ============================================================================
@@ -228,7 +504,7 @@ SELECT
     (SELECT COUNT(*) FROM information_schema.columns WHERE table_name = t.table_name) as column_count
 FROM information_schema.tables t
 WHERE table_schema = 'public' 
-    AND table_name IN ('faqs', 'announcements', 'chat_logs')
+    AND table_name IN ('faqs', 'announcements', 'chat_logs', 'chat_logs_archive', 'chat_log_rollups')
 ORDER BY table_name;
 
 -- Check sample data